@@ -0,0 +1,135 @@
+import codecs
+import logging
+import tempfile
+import time
+
+import pypdf
+
+from django.conf import settings
+from opentelemetry import metrics
+
+from files.models import File, FileChunk, IngestionStatusChoices
+from organizations_management import helpers
+
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+ingested_files = meter.create_counter('files.ingestion.files', description='Data source files ingested, by file type and status')
+ingested_bytes = meter.create_counter('files.ingestion.bytes', unit='By', description='Bytes streamed from object storage by the ingestion')
+ingested_chunks = meter.create_counter('files.ingestion.chunks', description='Text chunks stored by the ingestion')
+ingestion_duration = meter.create_histogram('files.ingestion.duration', unit='s', description='Time spent ingesting one file')
+
+
+def extract_plain_text(body):
+    # incremental, so multi-byte characters split across reads decode fine
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for data in body:
+        text = decoder.decode(data)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def extract_pdf_text(body):
+    # a pdf can't be parsed front to back (the xref table is at the end), so the body is
+    # spooled, to disk past PDF_SPOOL_MAX_MEMORY, and the text is extracted a page at a time
+    with tempfile.SpooledTemporaryFile(max_size=settings.INGESTION['PDF_SPOOL_MAX_MEMORY']) as spool:
+        for data in body:
+            spool.write(data)
+        spool.seek(0)
+        for page in pypdf.PdfReader(spool).pages:
+            text = page.extract_text()
+            if text:
+                yield text + '\n'
+
+
+EXTRACTORS = {
+    'pdf': extract_pdf_text,
+    'txt': extract_plain_text,
+    'md': extract_plain_text,
+}
+
+
+def split_chunks(pieces, size, overlap):
+    """
+    Yield (start, text) chunks of at most `size` characters from an iterable of text
+    pieces, consecutive chunks sharing `overlap` characters. A chunk ends after the last
+    whitespace of its window when there's one in the second half, so words aren't cut.
+    """
+    buffer = ''
+    offset = 0  # offset of buffer[0] in the whole text
+    emitted = 0  # characters at the start of buffer already part of a chunk
+    for piece in pieces:
+        buffer += piece
+        position = 0
+        while len(buffer) - position > size:
+            window = buffer[position:position + size]
+            cut = max(window.rfind(' '), window.rfind('\n'), window.rfind('\t'))
+            end = cut + 1 if cut >= size // 2 else size
+            if window[:end].strip():
+                yield offset + position, window[:end]
+            step = max(end - overlap, 1)
+            position += step
+            emitted = end - step
+        buffer = buffer[position:]
+        offset += position
+    if len(buffer) > emitted and buffer[emitted:].strip():
+        yield offset, buffer
+
+
+def _counted(body, stats):
+    for data in body:
+        stats['bytes'] += len(data)
+        yield data
+
+
+def ingest_file(file_id):
+    """
+    Stream the file object from its bucket, extract its text and replace the file
+    chunks with it. Safe to run again after a failure, the chunks are rewritten.
+    """
+    file = File.objects.get(id=file_id)
+    kind = file.ingestion_kind
+    if kind is None:
+        File.objects.filter(id=file.id).update(ingestion_status=IngestionStatusChoices.UNSUPPORTED)
+        return
+    File.objects.filter(id=file.id).update(ingestion_status=IngestionStatusChoices.RUNNING)
+    FileChunk.objects.filter(file=file).delete()
+
+    attributes = {'file_type': kind}
+    stats = {'bytes': 0}
+    started = time.perf_counter()
+    body = _counted(helpers.iter_object(file.bucket, file.location, settings.INGESTION['READ_CHUNK_SIZE']), stats)
+    try:
+        chunks = []
+        count = 0
+        for start, text in split_chunks(EXTRACTORS[kind](body), settings.INGESTION['CHUNK_SIZE'], settings.INGESTION['CHUNK_OVERLAP']):
+            chunks.append(FileChunk(file=file, index=count, start=start, text=text))
+            count += 1
+            if len(chunks) >= settings.INGESTION['BATCH_SIZE']:
+                FileChunk.objects.bulk_create(chunks)
+                chunks = []
+        FileChunk.objects.bulk_create(chunks)
+    except Exception:
+        ingested_files.add(1, {**attributes, 'status': 'error'})
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        ingestion_duration.record(elapsed, attributes)
+        ingested_bytes.add(stats['bytes'], attributes)
+
+    File.objects.filter(id=file.id).update(ingestion_status=IngestionStatusChoices.DONE)
+    ingested_files.add(1, {**attributes, 'status': 'done'})
+    ingested_chunks.add(count, attributes)
+    logger.info(
+        'Ingested %s (%s): %s bytes, %s chunks in %.2fs (%.2f MB/s)',
+        file.id, kind, stats['bytes'], count, elapsed, stats['bytes'] / 1e6 / elapsed if elapsed else 0,
+    )
+    return count
+
+
+def fail_file_ingestion(file_id):
+    File.objects.filter(id=file_id).update(ingestion_status=IngestionStatusChoices.FAILED)
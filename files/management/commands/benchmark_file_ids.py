@@ -0,0 +1,70 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from files.models import uuid7
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare inserts and primary key lookups for the old varchar "file-<uuid4>" '
+        'key and the uuid column holding uuid7 values, on the configured database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--lookups', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        uuid_type = connection.data_types['UUIDField']
+        layouts = [
+            ('varchar(255) file-<uuid4>', 'varchar(255)', lambda: f'file-{uuid.uuid4()}'),
+            (f'{uuid_type} uuid7', uuid_type, lambda: self._uuid_db_value(uuid7())),
+        ]
+        for label, column_type, new_id in layouts:
+            table = 'benchmark_file_ids'
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute(f'CREATE TABLE {table} (id {column_type} PRIMARY KEY, location text NOT NULL)')
+            try:
+                ids = [new_id() for _ in range(options['rows'])]
+                insert_seconds = self._insert(table, ids, options['batch_size'])
+                lookup_seconds = self._lookup(table, random.sample(ids, min(options['lookups'], len(ids))))
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            self.stdout.write(
+                f"{label:<28} insert {options['rows']} rows {insert_seconds * 1000:10.2f} ms "
+                f"({insert_seconds / options['rows'] * 1e6:6.2f} us/row)   "
+                f"lookup {lookup_seconds / options['lookups'] * 1e6:6.2f} us/row"
+            )
+
+    @staticmethod
+    def _uuid_db_value(value):
+        return value if connection.features.has_native_uuid_field else value.hex
+
+    @staticmethod
+    def _insert(table, ids, batch_size):
+        started = time.perf_counter()
+        for start in range(0, len(ids), batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {table} (id, location) VALUES (%s, %s)',
+                    [(file_id, 'user/profile.jpg') for file_id in ids[start:start + batch_size]],
+                )
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _lookup(table, ids):
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            for file_id in ids:
+                cursor.execute(f'SELECT location FROM {table} WHERE id = %s', [file_id])
+                cursor.fetchone()
+            return time.perf_counter() - started
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.uploads import reconcile_uploads
+
+
+class Command(BaseCommand):
+    help = 'Check pending and confirmed uploads with concurrent HEAD requests, marking them completed or orphaned'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Check one batch and exit')
+        parser.add_argument('--batch-size', type=int, default=settings.UPLOAD_RECONCILER['BATCH_SIZE'])
+        parser.add_argument('--poll-interval', type=float, default=settings.UPLOAD_RECONCILER['POLL_INTERVAL'])
+
+    def handle(self, *args, **options):
+        while True:
+            result = reconcile_uploads(options['batch_size'])
+            if options['once']:
+                self.stdout.write(f"Completed {result['completed']}, orphaned {result['orphaned']}, unchanged {result['unchanged']} uploads")
+                return
+            if not sum(result.values()):
+                time.sleep(options['poll_interval'])
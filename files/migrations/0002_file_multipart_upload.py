@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='part_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='part_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='upload_id',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='upload_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In progress'), ('COMPLETED', 'Completed'), ('ABORTED', 'Aborted')], default='PENDING', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='filetype',
+            field=models.CharField(choices=[('IMAGE', 'Image'), ('VIDEO', 'Video'), ('DOCUMENT', 'Document')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:57
+
+import uuid
+
+import files.models
+from django.db import migrations
+
+
+def strip_id_prefix(apps, schema_editor):
+    # 'file-<uuid>' -> '<uuid hex>', a form both the sqlite char(32) and the
+    # postgresql uuid column (through the ALTER ... USING cast) accept
+    File = apps.get_model('files', 'File')
+    for file_id in File.objects.values_list('id', flat=True).iterator():
+        File.objects.filter(id=file_id).update(id=uuid.UUID(file_id.removeprefix('file-')).hex)
+
+
+def add_id_prefix(apps, schema_editor):
+    File = apps.get_model('files', 'File')
+    for file_id in File.objects.values_list('id', flat=True).iterator():
+        File.objects.filter(id=file_id).update(id=f'file-{uuid.UUID(file_id)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0002_file_multipart_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_id_prefix, add_id_prefix),
+        migrations.AlterField(
+            model_name='file',
+            name='id',
+            field=files.models.PrefixedUUIDField(default=files.models.new_file_id, editable=False, prefix='file', primary_key=True, serialize=False),
+        ),
+    ]
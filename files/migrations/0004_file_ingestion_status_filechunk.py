@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0003_file_uuid7_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='ingestion_status',
+            field=models.CharField(choices=[('NOT_STARTED', 'Not started'), ('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed'), ('UNSUPPORTED', 'Unsupported')], default='NOT_STARTED', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='FileChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start', models.BigIntegerField()),
+                ('text', models.TextField()),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='files.file')),
+            ],
+            options={
+                'ordering': ['file', 'index'],
+                'constraints': [models.UniqueConstraint(fields=('file', 'index'), name='file_chunk_file_index_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0004_file_ingestion_status_filechunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='purpose',
+            field=models.CharField(blank=True, choices=[('PROFILE_IMAGE', 'Profile image')], max_length=50),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='upload_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='upload_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In progress'), ('UPLOADED', 'Uploaded'), ('COMPLETED', 'Completed'), ('ABORTED', 'Aborted'), ('ORPHANED', 'Orphaned')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['upload_status', 'upload_checked_at'], name='files_upload_status_check_idx'),
+        ),
+    ]
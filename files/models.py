@@ -1,12 +1,110 @@
+import os
+import threading
+import time
 import uuid
 
-from django.db import models
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
+from opentelemetry import metrics
+
+from organizations_management.helpers import generate_download_presigned_url, generate_download_presigned_urls
+from organizations_management.models import Organization, OutboxJob
+
+
+meter = metrics.get_meter(__name__)
+
+
+class PresignedUrlCache:
+    """
+    Bounded LRU of presigned urls keyed by (bucket, location, method, content_type).
+    A url is only handed out again while it still has at least
+    (1 - max_age_ratio) of the requested expiration left, so callers never get a
+    url that is about to expire, and it is dropped once it has expired.
+    """
+
+    def __init__(self, max_size=10000, max_age_ratio=0.5):
+        self.max_size = max_size
+        self.max_age_ratio = max_age_ratio
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = meter.create_counter(
+            'files.presigned_url_cache.hits', description='Presigned urls served from the cache')
+        self._misses = meter.create_counter(
+            'files.presigned_url_cache.misses', description='Presigned urls that had to be signed')
+
+    def get_many(self, keys, expiration):
+        """{key: url} for the keys with a url still valid long enough for `expiration` seconds."""
+        now = time.time()
+        min_remaining = expiration * (1 - self.max_age_ratio)
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                url, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                elif min_remaining <= expires_at - now <= expiration:
+                    self._entries.move_to_end(key)
+                    found[key] = url
+        for key in keys:
+            (self._hits if key in found else self._misses).add(1, {'method': key[2]})
+        return found
+
+    def set_many(self, urls, expiration):
+        if self.max_size <= 0 or self.max_age_ratio <= 0:
+            return
+        expires_at = time.time() + expiration
+        with self._lock:
+            for key, url in urls.items():
+                self._entries[key] = (url, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key, expiration):
+        return self.get_many([key], expiration).get(key)
+
+    def set(self, key, url, expiration):
+        self.set_many({key: url}, expiration)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
-from organizations_management.helpers import generate_download_presigned_url
+
+presigned_url_cache = PresignedUrlCache(
+    max_size=settings.PRESIGNED_URLS['CACHE_MAX_SIZE'],
+    max_age_ratio=settings.PRESIGNED_URLS['CACHE_MAX_AGE_RATIO'],
+)
+
+
+def uuid7():
+    """
+    Time ordered UUID (RFC 9562 version 7): 48 bit unix milliseconds followed by
+    random bits, so new rows land at the right edge of the primary key index.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def new_file_id():
+    return f'file-{uuid7()}'
 
 
 class PrefixedIDField(models.CharField):
+    # superseded by PrefixedUUIDField, kept because files/migrations/0001_initial.py imports it
     def __init__(self, prefix='PRE', *args, **kwargs):
         self.prefix = prefix
         kwargs['max_length'] = kwargs.get('max_length', 255)
@@ -21,17 +119,173 @@ class PrefixedIDField(models.CharField):
         return super().pre_save(model_instance, add)
 
 
+class PrefixedUUIDField(models.UUIDField):
+    """
+    Stored as a native/compact UUID column, exposed as '<prefix>-<uuid>' strings so
+    ids in urls and payloads keep their prefix.
+    """
+
+    def __init__(self, prefix='PRE', *args, **kwargs):
+        self.prefix = prefix
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['prefix'] = self.prefix
+        return name, path, args, kwargs
+
+    def to_python(self, value):
+        if value is None or value == '':
+            return value
+        if not isinstance(value, uuid.UUID):
+            value = super().to_python(str(value).removeprefix(f'{self.prefix}-'))
+        return f'{self.prefix}-{value}'
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def _to_uuid(self, value):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(self.to_python(value).removeprefix(f'{self.prefix}-'))
+
+    def get_prep_value(self, value):
+        return self._to_uuid(models.Field.get_prep_value(self, value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = self._to_uuid(value)
+        if value is None or connection.features.has_native_uuid_field:
+            return value
+        return value.hex
+
+
 class FileTypeChoices(models.TextChoices):
     IMAGE = "IMAGE", _("Image")
     VIDEO = "VIDEO", _("Video")
+    DOCUMENT = "DOCUMENT", _("Document")
+
+
+class UploadStatusChoices(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    IN_PROGRESS = "IN_PROGRESS", _("In progress")
+    # the client says the object is uploaded, the reconciler hasn't checked it yet
+    UPLOADED = "UPLOADED", _("Uploaded")
+    # the object is in the bucket
+    COMPLETED = "COMPLETED", _("Completed")
+    ABORTED = "ABORTED", _("Aborted")
+    # never showed up in the bucket
+    ORPHANED = "ORPHANED", _("Orphaned")
+
+
+class FilePurposeChoices(models.TextChoices):
+    PROFILE_IMAGE = "PROFILE_IMAGE", _("Profile image")
+
+
+class IngestionStatusChoices(models.TextChoices):
+    NOT_STARTED = "NOT_STARTED", _("Not started")
+    QUEUED = "QUEUED", _("Queued")
+    RUNNING = "RUNNING", _("Running")
+    DONE = "DONE", _("Done")
+    FAILED = "FAILED", _("Failed")
+    UNSUPPORTED = "UNSUPPORTED", _("Unsupported")
+
+
+# data sources the ingestion can extract text from, by content type or else by extension
+INGESTION_CONTENT_TYPES = {
+    'application/pdf': 'pdf',
+    'text/plain': 'txt',
+    'text/markdown': 'md',
+    'text/x-markdown': 'md',
+}
+INGESTION_EXTENSIONS = {'.pdf': 'pdf', '.txt': 'txt', '.md': 'md', '.markdown': 'md'}
+
+
+class FileQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """Files the user created or that are in the bucket of an organization they belong to."""
+        buckets = [Organization(id=organization_id).bucket_name for organization_id in Organization.objects.visible_to(user).values_list('id', flat=True)]
+        return self.filter(Q(owner_id=user.id) | Q(bucket__in=buckets))
 
 
 class File(models.Model):
-    id = PrefixedIDField(max_length=255, primary_key=True, prefix="file")
+    id = PrefixedUUIDField(primary_key=True, prefix="file", default=new_file_id, editable=False)
     filename = models.TextField()
     filetype = models.CharField(max_length=50, choices=FileTypeChoices)
     bucket = models.CharField(max_length=255)
     location = models.TextField()
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    upload_status = models.CharField(max_length=20, choices=UploadStatusChoices, default=UploadStatusChoices.PENDING)
+    # multipart upload session, upload_id is the S3 UploadId while upload_status is IN_PROGRESS
+    upload_id = models.TextField(blank=True)
+    part_size = models.BigIntegerField(null=True, blank=True)
+    part_count = models.PositiveIntegerField(null=True, blank=True)
+    ingestion_status = models.CharField(max_length=20, choices=IngestionStatusChoices, default=IngestionStatusChoices.NOT_STARTED)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='files')
+    purpose = models.CharField(max_length=50, choices=FilePurposeChoices, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # last time the upload reconciler looked for the object
+    upload_checked_at = models.DateTimeField(null=True, blank=True)
+
+    objects = FileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['upload_status', 'upload_checked_at'], name='files_upload_status_check_idx'),
+        ]
+
+    @property
+    def ingestion_kind(self):
+        content_type = self.content_type.split(';')[0].strip().lower()
+        return INGESTION_CONTENT_TYPES.get(content_type) or INGESTION_EXTENSIONS.get(os.path.splitext(self.filename)[1].lower())
+
+    def queue_ingestion(self):
+        """Queue the text extraction of an uploaded data source, files that aren't pdf/txt/md are marked unsupported."""
+        if self.ingestion_kind is None:
+            self.ingestion_status = IngestionStatusChoices.UNSUPPORTED
+            self.save(update_fields=['ingestion_status'])
+            return
+        with transaction.atomic():
+            self.ingestion_status = IngestionStatusChoices.QUEUED
+            self.save(update_fields=['ingestion_status'])
+            OutboxJob.objects.create(task=OutboxJob.INGEST_FILE, payload={'file_id': str(self.id)})
+
+    @property
+    def download_cache_key(self):
+        return (self.bucket, self.location, 'get_object', None)
 
     def generate_download_presigned_url(self, expiration=60):
-        return generate_download_presigned_url(bucket_name=self.bucket, location=self.location, expiration=expiration)
\ No newline at end of file
+        url = presigned_url_cache.get(self.download_cache_key, expiration)
+        if url is None:
+            url = generate_download_presigned_url(bucket_name=self.bucket, location=self.location, expiration=expiration)
+            if url is not None:
+                presigned_url_cache.set(self.download_cache_key, url, expiration)
+        return url
+
+    @classmethod
+    def generate_download_presigned_urls(cls, files, expiration=None):
+        """{file.id: download url} for many files, signing the ones not cached in one pass."""
+        expiration = expiration or settings.PRESIGNED_URLS['LIST_EXPIRATION']
+        cached = presigned_url_cache.get_many([file.download_cache_key for file in files], expiration)
+        missing = [file for file in files if file.download_cache_key not in cached]
+        if missing:
+            urls = generate_download_presigned_urls([(file.bucket, file.location) for file in missing], expiration=expiration)
+            signed = {file.download_cache_key: url for file, url in zip(missing, urls) if url is not None}
+            presigned_url_cache.set_many(signed, expiration)
+            cached.update(signed)
+        return {file.id: cached.get(file.download_cache_key) for file in files}
+
+
+class FileChunk(models.Model):
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    # character offset of the chunk in the extracted text
+    start = models.BigIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['file', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['file', 'index'], name='file_chunk_file_index_unique'),
+        ]
@@ -1,14 +1,33 @@
+import uuid
+
 from rest_framework import serializers
 
 from files.models import File
+from organizations_management.models import Organization
+
+
+class OrganizationBucketMixin:
+    """Only lets the request user name the bucket of an organization they belong to."""
+
+    def validate_bucket(self, value):
+        try:
+            organization_id = uuid.UUID(value.removeprefix('organization-'))
+        except ValueError:
+            organization_id = None
+        user = self.context['request'].user
+        # Organization.bucket_name
+        if value != f'organization-{organization_id}' or not Organization.objects.visible_to(user).filter(id=organization_id).exists():
+            raise serializers.ValidationError('Not the bucket of one of your organizations.')
+        return value
 
 
-class FileCreateSerializer(serializers.ModelSerializer):
+class FileCreateSerializer(OrganizationBucketMixin, serializers.ModelSerializer):
 
     class Meta:
         model = File
         fields = '__all__'
-        read_only_fields = ['id']
+        # owner is the request user, profile images only come from the users upload endpoint
+        read_only_fields = ['id', 'ingestion_status', 'upload_checked_at', 'upload_status', 'owner', 'purpose']
 
 
 class FileRetrieveSerializer(serializers.ModelSerializer):
@@ -28,7 +47,77 @@ class FileSerializer(serializers.ModelSerializer):
     class Meta:
         model = File
         fields = '__all__'
+        # where the object lives and the upload/ingestion state are set by the server, the bucket
+        # was checked against the user's organizations on create
+        read_only_fields = [
+            'upload_checked_at', 'upload_status', 'owner', 'purpose',
+            'bucket', 'location', 'upload_id', 'part_size', 'part_count', 'ingestion_status',
+        ]
+
+
+class FileWithDownloadUrlSerializer(FileSerializer):
+
+    download_presigned_url = serializers.SerializerMethodField()
+
+    def get_download_presigned_url(self, instance) -> str:
+        return self.context['download_presigned_urls'].get(instance.id)
 
 
 class DownloadPresignedUrlSerializer(serializers.Serializer):
     download_presigned_url = serializers.CharField()
+
+
+
+class MultipartUploadInitiateSerializer(OrganizationBucketMixin, serializers.ModelSerializer):
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    DEFAULT_PART_SIZE = 16 * 1024 * 1024
+    MAX_PARTS = 10000
+    MAX_SIZE = 5 * 1024 ** 4
+
+    size = serializers.IntegerField(min_value=1, max_value=MAX_SIZE)
+    part_size = serializers.IntegerField(min_value=MIN_PART_SIZE, required=False)
+
+    class Meta:
+        model = File
+        fields = ['id', 'filename', 'filetype', 'bucket', 'location', 'content_type', 'size', 'part_size', 'part_count', 'upload_id', 'upload_status', 'ingestion_status']
+        read_only_fields = ['id', 'part_count', 'upload_id', 'upload_status', 'ingestion_status']
+
+    def validate(self, attrs):
+        # S3 allows at most 10000 parts, so big files need bigger parts
+        part_size = max(attrs.get('part_size', self.DEFAULT_PART_SIZE), -(-attrs['size'] // self.MAX_PARTS))
+        attrs['part_size'] = part_size
+        attrs['part_count'] = -(-attrs['size'] // part_size)
+        return attrs
+
+
+class MultipartUploadPartsSerializer(serializers.Serializer):
+    MAX_PARTS_PER_REQUEST = 100
+
+    part_numbers = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MultipartUploadInitiateSerializer.MAX_PARTS),
+        allow_empty=False,
+        max_length=MAX_PARTS_PER_REQUEST,
+    )
+
+    def validate_part_numbers(self, value):
+        part_count = self.context['file'].part_count
+        invalid = [part_number for part_number in value if part_number > part_count]
+        if invalid:
+            raise serializers.ValidationError(f'The upload only has {part_count} parts')
+        return sorted(set(value))
+
+
+class MultipartUploadPartUrlSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField()
+    url = serializers.CharField()
+
+
+class MultipartUploadPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1)
+    etag = serializers.CharField()
+    size = serializers.IntegerField(required=False)
+
+
+class MultipartUploadCompleteSerializer(serializers.Serializer):
+    # when omitted the uploaded parts are listed from S3
+    parts = MultipartUploadPartSerializer(many=True, required=False)
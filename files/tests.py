@@ -1,3 +1,649 @@
-from django.test import TestCase
+import io
+import uuid
 
-# Create your tests here.
+from datetime import timedelta
+
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import test
+
+from files import ingestion, uploads
+from files.models import File, FileChunk, PresignedUrlCache, presigned_url_cache, uuid7
+from files.views import FileViewSet
+from organizations_management import outbox
+from organizations_management.models import Organization, OutboxJob
+from root_project.testing import QueryBudgetTestMixin
+from users.models import User
+
+
+def fake_presigned_urls(client_method, params_list, ExpiresIn):
+    return [f"https://s3.example.com/{params['Bucket']}/{params['Key']}?X-Amz-Expires={ExpiresIn}" for params in params_list]
+
+
+class FileListDownloadUrlsTestCase(QueryBudgetTestMixin, TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        presigned_url_cache.clear()
+        self.user = User.objects.get(username='string21')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.user)
+        File.objects.bulk_create([
+            File(filename=f'{index}.png', filetype='IMAGE', bucket='files-bucket', location=f'user/{index}.png', owner=self.user)
+            for index in range(5)
+        ])
+        self.url = reverse('files-list')
+
+    def test_list_without_flag_has_no_urls(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertNotIn('download_presigned_url', response.data['results'][0])
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_urls', side_effect=fake_presigned_urls)
+    def test_other_users_files_are_not_listed(self, mock_presigned_urls):
+        other = User.objects.get(username='string2')
+        private = File.objects.create(filename='private.pdf', filetype='DOCUMENT', bucket='files-bucket', location='other/private.pdf', owner=other)
+        # string21 owns organization 760ff2f6-..., its files are shared with the members
+        shared = File.objects.create(
+            filename='shared.pdf', filetype='DOCUMENT', bucket='organization-760ff2f6-2691-4183-aae4-68c82f151c57', location='shared.pdf', owner=other,
+        )
+
+        response = self.client.get(self.url, {'download_urls': 'true'})
+
+        ids = {item['id'] for item in response.data['results']}
+        self.assertIn(shared.id, ids)
+        self.assertNotIn(private.id, ids)
+        self.assertNotIn('other/private.pdf', [params['Key'] for params in mock_presigned_urls.call_args[0][1]])
+        self.assertEqual(self.client.get(reverse('files-detail', args=[private.id])).status_code, 404)
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_url', return_value='https://s3.example.com/signed')
+    def test_download_url_endpoint_reuses_the_cached_url(self, mock_presigned_url):
+        file = File.objects.get(location='user/0.png')
+        url = reverse('files-get-download-presigned-url', args=[file.id])
+
+        with patch.object(presigned_url_cache._hits, 'add') as hits:
+            responses = [self.client.get(url) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        self.assertEqual([response.data for response in responses], [{'download_presigned_url': 'https://s3.example.com/signed'}] * 2)
+        mock_presigned_url.assert_called_once()
+        hits.assert_called_once_with(1, {'method': 'get_object'})
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_url', return_value='https://s3.example.com/signed')
+    def test_download_url_endpoint_query_budget(self, mock_presigned_url):
+        file = File.objects.get(location='user/0.png')
+
+        with self.assertQueryBudget(FileViewSet, 'get_download_presigned_url'):
+            response = self.client.get(reverse('files-get-download-presigned-url', args=[file.id]))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_is_paginated(self):
+        response = self.client.get(self.url, {'page_size': 2})
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(FileViewSet.pagination_class.max_page_size, 1000)
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_urls', side_effect=fake_presigned_urls)
+    def test_list_signs_all_urls_in_one_pass(self, mock_presigned_urls):
+        with self.assertQueryBudget(FileViewSet, 'list'):
+            response = self.client.get(self.url, {'download_urls': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_presigned_urls.assert_called_once()
+        self.assertEqual(len(mock_presigned_urls.call_args[0][1]), 5)
+        for item in response.data['results']:
+            self.assertEqual(
+                item['download_presigned_url'],
+                f"https://s3.example.com/files-bucket/{item['location']}?X-Amz-Expires={settings.PRESIGNED_URLS['LIST_EXPIRATION']}",
+            )
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_urls', side_effect=fake_presigned_urls)
+    def test_cached_urls_are_not_signed_again(self, mock_presigned_urls):
+        self.client.get(self.url, {'download_urls': 'true'})
+        File.objects.create(filename='new.png', filetype='IMAGE', bucket='files-bucket', location='user/new.png', owner=self.user)
+        response = self.client.get(self.url, {'download_urls': 'true'})
+
+        self.assertEqual(mock_presigned_urls.call_count, 2)
+        # only the new file needed a signature the second time
+        self.assertEqual(mock_presigned_urls.call_args[0][1], [{'Bucket': 'files-bucket', 'Key': 'user/new.png'}])
+        self.assertEqual(len([item for item in response.data['results'] if item['download_presigned_url']]), 6)
+
+
+class PresignedUrlCacheTestCase(TestCase):
+    key = ('files-bucket', 'user/0.png', 'get_object', None)
+
+    def test_url_is_reused_while_enough_validity_is_left(self):
+        cache = PresignedUrlCache(max_size=10, max_age_ratio=0.5)
+        with patch('files.models.time.time', return_value=1000):
+            cache.set(self.key, 'url', 60)
+        with patch('files.models.time.time', return_value=1029):
+            self.assertEqual(cache.get(self.key, 60), 'url')
+        with patch('files.models.time.time', return_value=1031):
+            self.assertIsNone(cache.get(self.key, 60))
+
+    def test_expired_url_is_evicted(self):
+        cache = PresignedUrlCache(max_size=10, max_age_ratio=0.5)
+        with patch('files.models.time.time', return_value=1000):
+            cache.set(self.key, 'url', 60)
+        with patch('files.models.time.time', return_value=1060):
+            self.assertIsNone(cache.get(self.key, 60))
+        self.assertEqual(len(cache), 0)
+
+    def test_longer_lived_url_is_not_served_for_shorter_expiration(self):
+        cache = PresignedUrlCache(max_size=10, max_age_ratio=0.5)
+        cache.set(self.key, 'url', 900)
+
+        self.assertIsNone(cache.get(self.key, 60))
+        self.assertEqual(cache.get(self.key, 900), 'url')
+
+    def test_least_recently_used_url_is_evicted(self):
+        cache = PresignedUrlCache(max_size=2, max_age_ratio=0.5)
+        keys = [('files-bucket', f'user/{index}.png', 'get_object', None) for index in range(3)]
+        cache.set(keys[0], 'url-0', 60)
+        cache.set(keys[1], 'url-1', 60)
+        cache.get(keys[0], 60)
+        cache.set(keys[2], 'url-2', 60)
+
+        self.assertEqual(cache.get_many(keys, 60), {keys[0]: 'url-0', keys[2]: 'url-2'})
+
+    def test_hits_and_misses_are_counted(self):
+        cache = PresignedUrlCache(max_size=10, max_age_ratio=0.5)
+        cache.set(self.key, 'url', 60)
+        with patch.object(cache._hits, 'add') as hits, patch.object(cache._misses, 'add') as misses:
+            cache.get(self.key, 60)
+            cache.get(('files-bucket', 'other.png', 'get_object', None), 60)
+
+        hits.assert_called_once_with(1, {'method': 'get_object'})
+        misses.assert_called_once_with(1, {'method': 'get_object'})
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_url', return_value='https://s3.example.com/signed')
+    def test_file_download_url_is_signed_once(self, mock_presigned_url):
+        presigned_url_cache.clear()
+        file = File(filename='0.png', filetype='IMAGE', bucket='files-bucket', location='user/0.png')
+
+        urls = [file.generate_download_presigned_url() for _ in range(3)]
+
+        self.assertEqual(urls, ['https://s3.example.com/signed'] * 3)
+        mock_presigned_url.assert_called_once()
+
+
+def s3_object(data):
+    return {'Body': StreamingBody(io.BytesIO(data), len(data))}
+
+
+def pdf_document(*pages):
+    """A minimal pdf with one line of text per page."""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    document = b'%PDF-1.4\n'
+    offsets = []
+    for number, content in enumerate(objects, start=1):
+        offsets.append(len(document))
+        document += b'%d 0 obj\n%s\nendobj\n' % (number, content)
+    xref = len(document)
+    document += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    document += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    document += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return document
+
+
+class MultipartUploadTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+    MiB = 1024 * 1024
+    # string21 owns organization 760ff2f6-...
+    bucket = 'organization-760ff2f6-2691-4183-aae4-68c82f151c57'
+
+    def setUp(self):
+        self.user = User.objects.get(username='string21')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _initiate(self, size=40 * MiB, **data):
+        with patch('django.conf.settings.S3_CLIENT.create_multipart_upload', return_value={'UploadId': 'upload-1'}) as mock_create:
+            response = self.client.post(reverse('files-initiate-multipart-upload'), {
+                'filename': 'handbook.pdf',
+                'filetype': 'DOCUMENT',
+                'bucket': self.bucket,
+                'location': 'org/handbook.pdf',
+                'content_type': 'application/pdf',
+                'size': size,
+                **data,
+            }, format='json')
+        return response, mock_create
+
+    def test_initiate(self):
+        response, mock_create = self._initiate()
+
+        self.assertEqual(response.status_code, 201)
+        mock_create.assert_called_once_with(Bucket=self.bucket, Key='org/handbook.pdf', ContentType='application/pdf')
+        self.assertEqual(response.data['upload_status'], 'IN_PROGRESS')
+        self.assertEqual((response.data['part_size'], response.data['part_count']), (16 * self.MiB, 3))
+        file = File.objects.get(id=response.data['id'])
+        self.assertEqual((file.upload_id, file.owner), ('upload-1', self.user))
+
+    def test_initiate_requires_authentication(self):
+        self.client.force_authenticate(None)
+
+        response, mock_create = self._initiate()
+
+        self.assertEqual(response.status_code, 401)
+        mock_create.assert_not_called()
+
+    def test_only_buckets_of_the_users_organizations(self):
+        # organization 07857395-... belongs to someone else
+        for bucket in ['organization-07857395-3c68-4e16-aaae-c45e3c9d1b7d', 'user-profile-images', 'organization-not-a-uuid']:
+            with self.subTest(bucket=bucket):
+                response, mock_create = self._initiate(bucket=bucket)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('bucket', response.data)
+                mock_create.assert_not_called()
+
+    def test_other_users_cannot_use_the_upload(self):
+        response, _ = self._initiate()
+        file_id = response.data['id']
+        other = User.objects.get(username='string2')
+        self.client.force_authenticate(other)
+
+        with patch('django.conf.settings.S3_CLIENT.abort_multipart_upload') as mock_abort, \
+                patch('organizations_management.helpers.presigner.generate_presigned_urls') as mock_urls:
+            # outsiders don't see the file, members of the organization see it but can't use the upload
+            for status_code in (404, 403):
+                with self.subTest(status_code=status_code):
+                    parts = self.client.post(reverse('files-multipart-upload-parts', args=[file_id]), {'part_numbers': [1]}, format='json')
+                    abort = self.client.post(reverse('files-abort-multipart-upload', args=[file_id]))
+                    self.assertEqual((parts.status_code, abort.status_code), (status_code, status_code))
+                Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57').members.add(other)
+
+        mock_urls.assert_not_called()
+        mock_abort.assert_not_called()
+
+    def test_part_size_grows_to_stay_under_the_part_limit(self):
+        response, _ = self._initiate(size=500 * 1024 * self.MiB, part_size=5 * self.MiB)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual(response.data['part_count'], 10000)
+        self.assertGreaterEqual(response.data['part_size'] * response.data['part_count'], 500 * 1024 * self.MiB)
+
+    def test_part_urls_are_presigned_in_one_batch(self):
+        response, _ = self._initiate()
+        url = reverse('files-multipart-upload-parts', args=[response.data['id']])
+        with patch('organizations_management.helpers.presigner.generate_presigned_urls', side_effect=fake_presigned_urls) as mock_urls:
+            response = self.client.post(url, {'part_numbers': [3, 1, 2, 1]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        mock_urls.assert_called_once()
+        self.assertEqual(mock_urls.call_args[0][0], 'upload_part')
+        self.assertEqual(
+            [params['PartNumber'] for params in mock_urls.call_args[0][1]],
+            [1, 2, 3],
+        )
+        self.assertEqual([part['part_number'] for part in response.data['parts']], [1, 2, 3])
+
+    def test_part_numbers_beyond_the_upload_are_rejected(self):
+        response, _ = self._initiate()
+        url = reverse('files-multipart-upload-parts', args=[response.data['id']])
+        response = self.client.post(url, {'part_numbers': [4]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_uploaded_parts_can_be_listed_to_resume(self):
+        response, _ = self._initiate()
+        url = reverse('files-multipart-upload-parts', args=[response.data['id']])
+        paginator = MagicMock()
+        paginator.paginate.return_value = [{'Parts': [{'PartNumber': 1, 'ETag': '"a"', 'Size': 16 * self.MiB}]}]
+        with patch('django.conf.settings.S3_CLIENT.get_paginator', return_value=paginator):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['parts'], [{'part_number': 1, 'etag': '"a"', 'size': 16 * self.MiB}])
+
+    def test_complete_with_parts_from_the_client(self):
+        response, _ = self._initiate()
+        url = reverse('files-complete-multipart-upload', args=[response.data['id']])
+        parts = [{'part_number': 2, 'etag': '"b"'}, {'part_number': 1, 'etag': '"a"'}, {'part_number': 3, 'etag': '"c"'}]
+        with patch('django.conf.settings.S3_CLIENT.complete_multipart_upload') as mock_complete:
+            response = self.client.post(url, {'parts': parts}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['upload_status'], 'COMPLETED')
+        self.assertEqual(mock_complete.call_args[1]['MultipartUpload'], {'Parts': [
+            {'PartNumber': 1, 'ETag': '"a"'}, {'PartNumber': 2, 'ETag': '"b"'}, {'PartNumber': 3, 'ETag': '"c"'},
+        ]})
+        self.assertEqual(File.objects.get(id=response.data['id']).upload_id, '')
+        # the pdf is queued for ingestion
+        self.assertEqual(response.data['ingestion_status'], 'QUEUED')
+        self.assertEqual(OutboxJob.objects.get().payload, {'file_id': response.data['id']})
+
+    def test_complete_with_missing_parts_is_rejected(self):
+        response, _ = self._initiate()
+        file_id = response.data['id']
+        paginator = MagicMock()
+        paginator.paginate.return_value = [{'Parts': [{'PartNumber': 1, 'ETag': '"a"', 'Size': 1}]}]
+        with patch('django.conf.settings.S3_CLIENT.get_paginator', return_value=paginator), \
+                patch('django.conf.settings.S3_CLIENT.complete_multipart_upload') as mock_complete:
+            response = self.client.post(reverse('files-complete-multipart-upload', args=[file_id]), {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        mock_complete.assert_not_called()
+        self.assertEqual(File.objects.get(id=file_id).upload_status, 'IN_PROGRESS')
+
+    def test_abort(self):
+        response, _ = self._initiate()
+        file_id = response.data['id']
+        with patch('django.conf.settings.S3_CLIENT.abort_multipart_upload') as mock_abort:
+            response = self.client.post(reverse('files-abort-multipart-upload', args=[file_id]))
+
+        self.assertEqual(response.status_code, 200)
+        mock_abort.assert_called_once_with(Bucket=self.bucket, Key='org/handbook.pdf', UploadId='upload-1')
+        self.assertEqual(response.data['upload_status'], 'ABORTED')
+
+        # nothing left to upload parts to
+        response = self.client.post(reverse('files-multipart-upload-parts', args=[file_id]), {'part_numbers': [1]}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_storage_errors_are_reported(self):
+        with patch('django.conf.settings.S3_CLIENT.create_multipart_upload', side_effect=ClientError({'Error': {'Code': 'NoSuchBucket'}}, 'CreateMultipartUpload')):
+            response = self.client.post(reverse('files-initiate-multipart-upload'), {
+                'filename': 'a.txt', 'filetype': 'DOCUMENT', 'bucket': self.bucket, 'location': 'a.txt', 'size': 10,
+            }, format='json')
+
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(File.objects.exists())
+
+
+class FileIdTestCase(TestCase):
+    fixtures = ['users']
+
+    def setUp(self):
+        self.user = User.objects.get(username='string21')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _file(self, **kwargs):
+        return File.objects.create(filename='a.txt', filetype='DOCUMENT', bucket='files-bucket', location='a.txt', owner=self.user, **kwargs)
+
+    def test_id_is_prefixed_uuid7(self):
+        file = self._file()
+
+        self.assertTrue(file.id.startswith('file-'))
+        self.assertEqual(uuid.UUID(file.id.removeprefix('file-')).version, 7)
+        self.assertEqual(File.objects.get(id=file.id).id, file.id)
+
+    def test_ids_are_time_ordered(self):
+        ids = []
+        for milliseconds in (1_700_000_000_000, 1_700_000_000_001, 1_800_000_000_000):
+            with patch('files.models.time.time_ns', return_value=milliseconds * 1_000_000):
+                ids.append(uuid7())
+
+        self.assertEqual(sorted(ids), ids)
+
+    def test_id_column_stores_the_uuid_without_prefix(self):
+        file = self._file()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM files_file')
+            stored = cursor.fetchone()[0]
+
+        self.assertEqual(uuid.UUID(str(stored)), uuid.UUID(file.id.removeprefix('file-')))
+
+    def test_invalid_id_is_not_found(self):
+        response = self.client.get(reverse('files-detail', args=['file-not-a-uuid']))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_retrieve_by_prefixed_id(self):
+        file = self._file()
+        with patch('organizations_management.helpers.presigner.generate_presigned_url', return_value='https://s3.example.com/signed'):
+            response = self.client.get(reverse('files-detail', args=[file.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], file.id)
+
+
+@override_settings(INGESTION={**settings.INGESTION, 'READ_CHUNK_SIZE': 7, 'CHUNK_SIZE': 40, 'CHUNK_OVERLAP': 10, 'BATCH_SIZE': 2})
+class FileIngestionTestCase(TestCase):
+    TEXT = 'Ingestion streams the object and splits its text into overlapping chunks, façade and naïve included. ' * 5
+
+    def _file(self, filename='notes.txt', content_type='text/plain'):
+        return File.objects.create(
+            filename=filename, filetype='DOCUMENT', bucket='files-bucket', location=f'org/{filename}',
+            content_type=content_type, upload_status='COMPLETED',
+        )
+
+    def test_split_chunks_does_not_depend_on_how_the_text_is_read(self):
+        whole = list(ingestion.split_chunks([self.TEXT], 40, 10))
+        pieces = list(ingestion.split_chunks([self.TEXT[i:i + 3] for i in range(0, len(self.TEXT), 3)], 40, 10))
+
+        self.assertEqual(whole, pieces)
+        for start, text in whole:
+            self.assertLessEqual(len(text), 40)
+            self.assertEqual(self.TEXT[start:start + len(text)], text)
+        # every character is in a chunk and consecutive chunks overlap
+        self.assertEqual(whole[0][0], 0)
+        self.assertEqual(whole[-1][0] + len(whole[-1][1]), len(self.TEXT))
+        for (start, text), (next_start, _) in zip(whole, whole[1:]):
+            self.assertLess(next_start, start + len(text))
+
+    def test_plain_text_is_decoded_incrementally(self):
+        data = self.TEXT.encode()
+        # 1 byte reads split the multi-byte characters
+        text = ''.join(ingestion.extract_plain_text(data[i:i + 1] for i in range(len(data))))
+
+        self.assertEqual(text, self.TEXT)
+
+    def test_pdf_text_is_extracted_per_page(self):
+        data = pdf_document('First page', 'Second page')
+        pages = list(ingestion.extract_pdf_text(data[i:i + 64] for i in range(0, len(data), 64)))
+
+        self.assertEqual([page.strip() for page in pages], ['First page', 'Second page'])
+
+    def test_ingest_streams_and_stores_chunks(self):
+        file = self._file()
+        with patch('django.conf.settings.S3_CLIENT.get_object', return_value=s3_object(self.TEXT.encode())) as mock_get, \
+                patch.object(StreamingBody, 'iter_chunks', autospec=True, side_effect=StreamingBody.iter_chunks) as mock_iter:
+            ingestion.ingest_file(file.id)
+
+        mock_get.assert_called_once_with(Bucket='files-bucket', Key='org/notes.txt')
+        self.assertEqual(mock_iter.call_args[0][1], 7)
+        chunks = list(file.chunks.all())
+        self.assertEqual([(chunk.start, chunk.text) for chunk in chunks], list(ingestion.split_chunks([self.TEXT], 40, 10)))
+        self.assertEqual([chunk.index for chunk in chunks], list(range(len(chunks))))
+        file.refresh_from_db()
+        self.assertEqual(file.ingestion_status, 'DONE')
+
+    def test_ingesting_again_replaces_the_chunks(self):
+        file = self._file()
+        for _ in range(2):
+            with patch('django.conf.settings.S3_CLIENT.get_object', return_value=s3_object(self.TEXT.encode())):
+                ingestion.ingest_file(file.id)
+
+        self.assertEqual(FileChunk.objects.count(), len(list(ingestion.split_chunks([self.TEXT], 40, 10))))
+
+    def test_queued_file_is_ingested_by_the_outbox_worker(self):
+        file = self._file(filename='handbook.pdf', content_type='application/pdf')
+        file.queue_ingestion()
+        with patch('django.conf.settings.S3_CLIENT.get_object', return_value=s3_object(pdf_document('Handbook'))):
+            self.assertEqual(outbox.process_outbox(), 1)
+
+        file.refresh_from_db()
+        self.assertEqual(file.ingestion_status, 'DONE')
+        self.assertEqual(file.chunks.get().text.strip(), 'Handbook')
+        self.assertEqual(OutboxJob.objects.get().status, 'DONE')
+
+    def test_ingestion_is_marked_failed_once_the_job_gives_up(self):
+        file = self._file()
+        file.queue_ingestion()
+        with patch('django.conf.settings.S3_CLIENT.get_object', side_effect=ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')), \
+                override_settings(OUTBOX={**settings.OUTBOX, 'MAX_ATTEMPTS': 1}):
+            outbox.process_outbox()
+
+        file.refresh_from_db()
+        self.assertEqual(file.ingestion_status, 'FAILED')
+
+    def test_unsupported_files_are_not_queued(self):
+        file = self._file(filename='photo.png', content_type='image/png')
+        file.queue_ingestion()
+
+        self.assertEqual(file.ingestion_status, 'UNSUPPORTED')
+        self.assertFalse(OutboxJob.objects.exists())
+
+
+def fake_head_object(objects):
+    """head_object answering from a {key: (size, content type) or ClientError code}, other keys are missing."""
+    def head_object(Bucket, Key):
+        if Key not in objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        if isinstance(objects[Key], str):
+            raise ClientError({'Error': {'Code': objects[Key]}}, 'HeadObject')
+        size, content_type = objects[Key]
+        return {'ContentLength': size, 'ContentType': content_type}
+    return head_object
+
+
+class UploadReconcilerTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        self.user = User.objects.get(username='string21')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _file(self, filename, **kwargs):
+        return File.objects.create(filename=filename, filetype='DOCUMENT', bucket='files-bucket', location=f'org/{filename}', owner=self.user, **kwargs)
+
+    def test_created_file_cannot_claim_another_owner_or_purpose(self):
+        victim = User.objects.get(username='string2')
+        data = {
+            'filename': 'a.png', 'filetype': 'IMAGE', 'location': 'a.png',
+            'bucket': 'organization-760ff2f6-2691-4183-aae4-68c82f151c57',
+            'owner': str(victim.id), 'purpose': 'PROFILE_IMAGE', 'upload_status': 'COMPLETED',
+        }
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(reverse('files-list'), data, format='json').status_code, 401)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('files-list'), data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        file = File.objects.get(id=response.data['id'])
+        self.assertEqual((file.owner, file.purpose, file.upload_status), (self.user, '', 'PENDING'))
+
+    def test_file_cannot_be_created_in_a_foreign_bucket(self):
+        response = self.client.post(reverse('files-list'), {
+            'filename': 'a.png', 'filetype': 'IMAGE', 'location': 'a.png', 'bucket': 'user-profile-images',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(File.objects.exists())
+
+    def test_update_cannot_move_the_file_to_another_bucket(self):
+        file = self._file('a.png')
+
+        response = self.client.patch(reverse('files-detail', args=[file.id]), {
+            'filename': 'renamed.png',
+            'bucket': 'organization-07857395-3c68-4e16-aaae-c45e3c9d1b7d', 'location': 'secret.pdf',
+            'upload_id': 'upload-1', 'part_count': 3, 'ingestion_status': 'DONE',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        file.refresh_from_db()
+        self.assertEqual(file.filename, 'renamed.png')
+        self.assertEqual(
+            (file.bucket, file.location, file.upload_id, file.part_count, file.ingestion_status),
+            ('files-bucket', 'org/a.png', '', None, 'NOT_STARTED'),
+        )
+
+    def test_only_the_owner_can_confirm(self):
+        file = self._file('a.png', purpose='PROFILE_IMAGE')
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(reverse('files-confirm', args=[file.id])).status_code, 401)
+        # not the owner and not in an organization of the bucket, the file isn't even visible
+        self.client.force_authenticate(User.objects.get(username='string2'))
+        self.assertEqual(self.client.post(reverse('files-confirm', args=[file.id])).status_code, 404)
+
+        file.refresh_from_db()
+        self.assertEqual(file.upload_status, 'PENDING')
+
+    def test_confirm_does_not_call_s3(self):
+        file = self._file('a.png')
+        with patch('django.conf.settings.S3_CLIENT.head_object') as mock_head:
+            response = self.client.post(reverse('files-confirm', args=[file.id]))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['upload_status'], 'UPLOADED')
+        mock_head.assert_not_called()
+        # confirming twice is fine
+        self.assertEqual(self.client.post(reverse('files-confirm', args=[file.id])).status_code, 202)
+
+    def test_aborted_upload_cannot_be_confirmed(self):
+        file = self._file('a.png', upload_status='ABORTED')
+
+        response = self.client.post(reverse('files-confirm', args=[file.id]))
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_reconcile_marks_files_completed_or_orphaned(self):
+        confirmed = self._file('confirmed.png', upload_status='UPLOADED')
+        waiting = self._file('waiting.png')
+        abandoned = self._file('abandoned.png')
+        File.objects.filter(id=abandoned.id).update(created_at=timezone.now() - timedelta(days=1))
+        forbidden = self._file('forbidden.png', upload_status='UPLOADED')
+        multipart = self._file('multipart.bin', upload_status='IN_PROGRESS')
+        objects = {'org/confirmed.png': (2048, 'image/png'), 'org/forbidden.png': '403'}
+
+        with patch('django.conf.settings.S3_CLIENT.head_object', side_effect=fake_head_object(objects)) as mock_head:
+            result = uploads.reconcile_uploads()
+
+        self.assertEqual(result, {'completed': 1, 'orphaned': 1, 'unchanged': 2})
+        self.assertEqual(mock_head.call_count, 4)
+        statuses = dict(File.objects.values_list('id', 'upload_status'))
+        self.assertEqual(statuses, {
+            confirmed.id: 'COMPLETED', waiting.id: 'PENDING', abandoned.id: 'ORPHANED',
+            forbidden.id: 'UPLOADED', multipart.id: 'IN_PROGRESS',
+        })
+        confirmed.refresh_from_db()
+        self.assertEqual((confirmed.size, confirmed.content_type), (2048, 'image/png'))
+
+        # the files left are not checked again before RECHECK_INTERVAL
+        with patch('django.conf.settings.S3_CLIENT.head_object') as mock_head:
+            self.assertEqual(uploads.reconcile_uploads(), {'completed': 0, 'orphaned': 0, 'unchanged': 0})
+        mock_head.assert_not_called()
+
+    def test_completed_data_source_is_queued_for_ingestion(self):
+        file = self._file('notes.md', upload_status='UPLOADED')
+        with patch('django.conf.settings.S3_CLIENT.head_object', side_effect=fake_head_object({'org/notes.md': (10, 'text/markdown')})):
+            uploads.reconcile_uploads()
+
+        file.refresh_from_db()
+        self.assertEqual(file.ingestion_status, 'QUEUED')
+        self.assertEqual(OutboxJob.objects.get().payload, {'file_id': file.id})
+
+    def test_reconcile_command(self):
+        self._file('confirmed.png', upload_status='UPLOADED')
+        stdout = io.StringIO()
+        with patch('django.conf.settings.S3_CLIENT.head_object', side_effect=fake_head_object({'org/confirmed.png': (1, 'image/png')})):
+            call_command('reconcile_uploads', '--once', stdout=stdout)
+
+        self.assertIn('Completed 1, orphaned 0, unchanged 0 uploads', stdout.getvalue())
@@ -0,0 +1,94 @@
+import logging
+
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from files.models import File, FilePurposeChoices, UploadStatusChoices
+from organizations_management import helpers
+from users.authentication.user_cache import token_user_cache
+from users.models import User
+
+
+logger = logging.getLogger(__name__)
+
+UNVERIFIED_STATUSES = [UploadStatusChoices.PENDING, UploadStatusChoices.UPLOADED]
+
+
+def claim_unverified_files(batch_size):
+    """
+    Lease up to batch_size files waiting for their object to this reconciler,
+    a file is looked at again at most every RECHECK_INTERVAL seconds.
+    """
+    now = timezone.now()
+    recheck_before = now - timedelta(seconds=settings.UPLOAD_RECONCILER['RECHECK_INTERVAL'])
+    with transaction.atomic():
+        files = list(
+            File.objects.select_for_update(skip_locked=True)
+            .filter(Q(upload_checked_at__isnull=True) | Q(upload_checked_at__lte=recheck_before), upload_status__in=UNVERIFIED_STATUSES)
+            # confirmed uploads first, then oldest first (ids are time ordered)
+            .order_by('-upload_status', 'id')[:batch_size]
+        )
+        File.objects.filter(id__in=[file.id for file in files]).update(upload_checked_at=now)
+    return files
+
+
+def reconcile_uploads(batch_size=None):
+    """
+    HEAD one batch of pending/confirmed files concurrently. Files whose object exists
+    are marked completed (profile images become their owner's picture, data sources
+    are queued for ingestion), the ones still missing after PENDING_TTL are orphaned.
+    Returns {'completed': n, 'orphaned': n, 'unchanged': n}.
+    """
+    files = claim_unverified_files(batch_size or settings.UPLOAD_RECONCILER['BATCH_SIZE'])
+    heads = helpers.head_objects(
+        [(file.bucket, file.location) for file in files],
+        max_workers=settings.UPLOAD_RECONCILER['CONCURRENCY'],
+    )
+
+    orphan_before = timezone.now() - timedelta(seconds=settings.UPLOAD_RECONCILER['PENDING_TTL'])
+    completed, orphaned = [], []
+    for file, head in zip(files, heads):
+        if isinstance(head, ClientError):
+            logger.warning('Could not check the object of %s (%s/%s): %r', file.id, file.bucket, file.location, head)
+        elif head is not None:
+            file.upload_status = UploadStatusChoices.COMPLETED
+            file.size = head.get('ContentLength', file.size)
+            file.content_type = head.get('ContentType') or file.content_type
+            completed.append(file)
+        elif file.created_at <= orphan_before:
+            file.upload_status = UploadStatusChoices.ORPHANED
+            orphaned.append(file)
+
+    with transaction.atomic():
+        # a file aborted or deleted meanwhile is left alone
+        current = set(
+            File.objects.filter(id__in=[file.id for file in completed + orphaned], upload_status__in=UNVERIFIED_STATUSES)
+            .values_list('id', flat=True)
+        )
+        completed = [file for file in completed if file.id in current]
+        orphaned = [file for file in orphaned if file.id in current]
+        File.objects.bulk_update(completed, ['upload_status', 'size', 'content_type'])
+        File.objects.filter(id__in=[file.id for file in orphaned]).update(upload_status=UploadStatusChoices.ORPHANED)
+        update_profile_images([file for file in completed if file.purpose == FilePurposeChoices.PROFILE_IMAGE])
+        for file in completed:
+            if file.ingestion_kind is not None:
+                file.queue_ingestion()
+
+    return {'completed': len(completed), 'orphaned': len(orphaned), 'unchanged': len(files) - len(completed) - len(orphaned)}
+
+
+def update_profile_images(files):
+    # ids are time ordered, so the newest image of a user wins
+    urls = {file.owner_id: helpers.object_url(file.bucket, file.location) for file in sorted(files, key=lambda file: file.id) if file.owner_id}
+    users = list(User.objects.filter(id__in=urls))
+    for user in users:
+        user.main_profile_image_url = urls[user.id]
+    User.objects.bulk_update(users, ['main_profile_image_url'])
+    # bulk_update doesn't send post_save
+    for user in users:
+        token_user_cache.invalidate(user.id)
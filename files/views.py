@@ -1,25 +1,214 @@
+from botocore.exceptions import ClientError
+from django.db import transaction
 from django.shortcuts import render
-from rest_framework import decorators, response, viewsets
+from rest_framework import decorators, exceptions, pagination, permissions, response, status, viewsets
 
 from files import models
 from files import serializers
+from organizations_management import helpers
+
+
+class ObjectStorageError(exceptions.APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = 'The object storage request failed.'
+    default_code = 'object_storage_error'
+
+
+class UploadNotInProgress(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The file has no multipart upload in progress.'
+    default_code = 'upload_not_in_progress'
+
+
+class UploadNotPending(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The file upload is not pending.'
+    default_code = 'upload_not_pending'
+
+
+class FilePagination(pagination.PageNumberPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
 
 
 class FileViewSet(viewsets.ModelViewSet):
     queryset =  models.File.objects.all()
+    permission_classes = [permissions.IsAuthenticated]
+    # bounds how many download urls one list request signs
+    pagination_class = FilePagination
+    # actions only the user who created the file may run
+    owner_actions = {
+        'update', 'partial_update', 'destroy', 'confirm',
+        'multipart_upload_parts', 'complete_multipart_upload', 'abort_multipart_upload',
+    }
+    # max queries per request, see root_project.middlewares.QueryBudgetMiddleware
+    query_budgets = {
+        'list': 4,
+        'create': 3,
+        'retrieve': 3,
+        'update': 4,
+        'partial_update': 4,
+        'destroy': 5,
+        'get_download_presigned_url': 3,
+        'initiate_multipart_upload': 3,
+        'multipart_upload_parts': 3,
+        'complete_multipart_upload': 9,
+        'abort_multipart_upload': 4,
+        'confirm': 4,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            # only files the caller created or their organizations' files
+            queryset = queryset.visible_to(self.request.user)
+        return queryset.order_by('id')
 
     def get_serializer_class(self):
         if self.action == 'create':
             return serializers.FileCreateSerializer
         if self.action == 'retrieve':
             return serializers.FileRetrieveSerializer
-        if self.action == 'download_presigned_url':
+        if self.action == 'get_download_presigned_url':
             return serializers.DownloadPresignedUrlSerializer
+        if self.action == 'initiate_multipart_upload':
+            return serializers.MultipartUploadInitiateSerializer
+        if self.action == 'multipart_upload_parts':
+            return serializers.MultipartUploadPartsSerializer
+        if self.action == 'complete_multipart_upload':
+            return serializers.MultipartUploadCompleteSerializer
+        if self.action == 'list' and self.with_download_urls:
+            return serializers.FileWithDownloadUrlSerializer
         return serializers.FileSerializer
 
+    @property
+    def with_download_urls(self):
+        return self.request.query_params.get('download_urls', '').lower() in ('1', 'true')
+
+    def list(self, request, *args, **kwargs):
+        if not self.with_download_urls:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        files = list(page if page is not None else queryset)
+        serializer = self.get_serializer(
+            files,
+            many=True,
+            context={**self.get_serializer_context(), 'download_presigned_urls': models.File.generate_download_presigned_urls(files)},
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return response.Response(serializer.data)
+
     @decorators.action(detail=True, methods=['GET'], name='Get file download presigned url')
     def get_download_presigned_url(self, request, *args, **kwargs):
         instance = self.get_object()
         url = instance.generate_download_presigned_url()
         serializer = self.get_serializer({'download_presigned_url': url})
         return response.Response(serializer.data)
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.action in self.owner_actions and instance.owner_id != self.request.user.id:
+            raise exceptions.PermissionDenied()
+        return instance
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def get_upload_in_progress(self):
+        instance = self.get_object()
+        if instance.upload_status != models.UploadStatusChoices.IN_PROGRESS:
+            raise UploadNotInProgress()
+        return instance
+
+    @decorators.action(detail=False, methods=['POST'], url_path='multipart', name='Initiate multipart upload')
+    def initiate_multipart_upload(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            upload_id = helpers.create_multipart_upload(data['bucket'], data['location'], data.get('content_type'))
+        except ClientError as e:
+            raise ObjectStorageError(str(e))
+        serializer.save(upload_id=upload_id, upload_status=models.UploadStatusChoices.IN_PROGRESS, owner=request.user)
+        return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @decorators.action(detail=True, methods=['GET', 'POST'], url_path='multipart/parts', name='Multipart upload parts')
+    def multipart_upload_parts(self, request, *args, **kwargs):
+        """
+        GET lists the parts S3 already has, so an interrupted upload can resume.
+        POST presigns upload urls for a batch of part numbers.
+        """
+        instance = self.get_upload_in_progress()
+        if request.method == 'GET':
+            try:
+                parts = helpers.list_multipart_upload_parts(instance.bucket, instance.location, instance.upload_id)
+            except ClientError as e:
+                raise ObjectStorageError(str(e))
+            parts = [{'part_number': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']} for part in parts]
+            return response.Response({'parts': serializers.MultipartUploadPartSerializer(parts, many=True).data})
+
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), 'file': instance})
+        serializer.is_valid(raise_exception=True)
+        part_numbers = serializer.validated_data['part_numbers']
+        urls = helpers.generate_upload_part_presigned_urls(instance.bucket, instance.location, instance.upload_id, part_numbers)
+        parts = [{'part_number': part_number, 'url': url} for part_number, url in zip(part_numbers, urls)]
+        return response.Response({'parts': serializers.MultipartUploadPartUrlSerializer(parts, many=True).data})
+
+    @decorators.action(detail=True, methods=['POST'], url_path='multipart/complete', name='Complete multipart upload')
+    def complete_multipart_upload(self, request, *args, **kwargs):
+        instance = self.get_upload_in_progress()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            if 'parts' in serializer.validated_data:
+                parts = [(part['part_number'], part['etag']) for part in serializer.validated_data['parts']]
+            else:
+                parts = [
+                    (part['PartNumber'], part['ETag'])
+                    for part in helpers.list_multipart_upload_parts(instance.bucket, instance.location, instance.upload_id)
+                ]
+            missing = sorted(set(range(1, instance.part_count + 1)) - {part_number for part_number, _ in parts})
+            if missing:
+                raise exceptions.ValidationError({'parts': f'Missing parts: {missing[:20]}'})
+            helpers.complete_multipart_upload(instance.bucket, instance.location, instance.upload_id, parts)
+        except ClientError as e:
+            raise ObjectStorageError(str(e))
+
+        with transaction.atomic():
+            instance.upload_status = models.UploadStatusChoices.COMPLETED
+            instance.upload_id = ''
+            instance.save(update_fields=['upload_status', 'upload_id'])
+            instance.queue_ingestion()
+        return response.Response(serializers.FileSerializer(instance).data)
+
+    @decorators.action(detail=True, methods=['POST'], name='Confirm upload')
+    def confirm(self, request, *args, **kwargs):
+        """
+        The client finished its presigned PUT. The object is checked later by the
+        upload reconciler (files.uploads), not in the request.
+        """
+        instance = self.get_object()
+        if instance.upload_status == models.UploadStatusChoices.PENDING:
+            # confirmed files are checked first, right away
+            instance.upload_status = models.UploadStatusChoices.UPLOADED
+            instance.upload_checked_at = None
+            instance.save(update_fields=['upload_status', 'upload_checked_at'])
+        elif instance.upload_status not in (models.UploadStatusChoices.UPLOADED, models.UploadStatusChoices.COMPLETED):
+            raise UploadNotPending()
+        return response.Response(serializers.FileSerializer(instance).data, status=status.HTTP_202_ACCEPTED)
+
+    @decorators.action(detail=True, methods=['POST'], url_path='multipart/abort', name='Abort multipart upload')
+    def abort_multipart_upload(self, request, *args, **kwargs):
+        instance = self.get_upload_in_progress()
+        try:
+            helpers.abort_multipart_upload(instance.bucket, instance.location, instance.upload_id)
+        except ClientError as e:
+            raise ObjectStorageError(str(e))
+
+        instance.upload_status = models.UploadStatusChoices.ABORTED
+        instance.upload_id = ''
+        instance.save(update_fields=['upload_status', 'upload_id'])
+        return response.Response(serializers.FileSerializer(instance).data)
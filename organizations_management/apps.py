@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OrganizationsManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organizations_management'
+
+    def ready(self):
+        from organizations_management import signals  # noqa: F401
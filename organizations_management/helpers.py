@@ -1,12 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
 from django.conf import settings
 
+from organizations_management.presigner import S3Presigner
+
+
+presigner = S3Presigner(settings.S3_CLIENT)
+
 
 def create_bucket(bucket_name: str):
     settings.S3_CLIENT.create_bucket(Bucket=bucket_name)
 
 def generate_upload_presigned_url(bucket_name, location, content_type, expiration=3600):
     try:
-        url = settings.S3_CLIENT.generate_presigned_url(
+        url = presigner.generate_presigned_url(
             'put_object',
             Params={'Bucket': bucket_name, 'Key': location, 'ContentType': content_type},
             ExpiresIn=expiration
@@ -18,7 +27,7 @@ def generate_upload_presigned_url(bucket_name, location, content_type, expiratio
 
 def generate_download_presigned_url(bucket_name, location, expiration=3600):
     try:
-        url = settings.S3_CLIENT.generate_presigned_url(
+        url = presigner.generate_presigned_url(
             'get_object',
             Params={'Bucket': bucket_name, 'Key': location},
             ExpiresIn=expiration
@@ -26,4 +35,81 @@ def generate_download_presigned_url(bucket_name, location, expiration=3600):
     except Exception as e:
         print(f"Error generating presigned URL: {e}")
         return None
-    return url
\ No newline at end of file
+    return url
+def generate_download_presigned_urls(objects, expiration=3600):
+    """objects is a list of (bucket_name, location), returns the urls in the same order."""
+    try:
+        return presigner.generate_presigned_urls(
+            'get_object',
+            [{'Bucket': bucket_name, 'Key': location} for bucket_name, location in objects],
+            ExpiresIn=expiration
+        )
+    except Exception as e:
+        print(f"Error generating presigned URLs: {e}")
+        return [None] * len(objects)
+
+def create_multipart_upload(bucket_name, location, content_type=None):
+    params = {'Bucket': bucket_name, 'Key': location}
+    if content_type:
+        params['ContentType'] = content_type
+    return settings.S3_CLIENT.create_multipart_upload(**params)['UploadId']
+
+def generate_upload_part_presigned_urls(bucket_name, location, upload_id, part_numbers, expiration=3600):
+    return presigner.generate_presigned_urls(
+        'upload_part',
+        [{'Bucket': bucket_name, 'Key': location, 'UploadId': upload_id, 'PartNumber': part_number} for part_number in part_numbers],
+        ExpiresIn=expiration
+    )
+
+def list_multipart_upload_parts(bucket_name, location, upload_id):
+    paginator = settings.S3_CLIENT.get_paginator('list_parts')
+    parts = []
+    for page in paginator.paginate(Bucket=bucket_name, Key=location, UploadId=upload_id):
+        parts.extend(page.get('Parts', []))
+    return parts
+
+def complete_multipart_upload(bucket_name, location, upload_id, parts):
+    """parts is a list of (part_number, etag)."""
+    settings.S3_CLIENT.complete_multipart_upload(
+        Bucket=bucket_name,
+        Key=location,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [{'PartNumber': part_number, 'ETag': etag} for part_number, etag in sorted(parts)]},
+    )
+
+def abort_multipart_upload(bucket_name, location, upload_id):
+    settings.S3_CLIENT.abort_multipart_upload(Bucket=bucket_name, Key=location, UploadId=upload_id)
+
+def iter_object(bucket_name, location, chunk_size=64 * 1024):
+    """Stream an object body chunk_size bytes at a time, without reading it whole into memory."""
+    body = settings.S3_CLIENT.get_object(Bucket=bucket_name, Key=location)['Body']
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+def object_url(bucket_name, location):
+    return f'{settings.S3_CLIENT.meta.endpoint_url}/{bucket_name}/{quote(location)}'
+
+def head_object(bucket_name, location):
+    """The head_object response, None when there is no such object."""
+    try:
+        return settings.S3_CLIENT.head_object(Bucket=bucket_name, Key=location)
+    except ClientError as error:
+        if error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+def head_objects(objects, max_workers=10):
+    """
+    HEAD many (bucket_name, location) objects concurrently. Returns in the same order
+    the head_object response, None for a missing object or the ClientError it raised.
+    """
+    def head(obj):
+        try:
+            return head_object(*obj)
+        except ClientError as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(head, objects))
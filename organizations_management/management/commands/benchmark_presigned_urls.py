@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from organizations_management.presigner import S3Presigner
+
+
+class Command(BaseCommand):
+    help = 'Compare botocore generate_presigned_url with the local SigV4 presigner on settings.S3_CLIENT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--bucket', default='benchmark-bucket')
+
+    def handle(self, *args, **options):
+        client = settings.S3_CLIENT
+        presigner = S3Presigner(client)
+        cases = [
+            ('get_object', {'Bucket': options['bucket'], 'Key': 'benchmark/profile.jpg'}),
+            ('put_object', {'Bucket': options['bucket'], 'Key': 'benchmark/profile.jpg', 'ContentType': 'image/jpeg'}),
+        ]
+        for client_method, params in cases:
+            # resolves the bucket endpoint outside the timed loop
+            presigner.generate_presigned_url(client_method, Params=params, ExpiresIn=900)
+            for label, signer in (('botocore', client), ('local presigner', presigner)):
+                best = min(self._time(signer, client_method, params, options['urls']) for _ in range(options['repeat']))
+                self.stdout.write(
+                    f"{client_method:<12} {label:<16} {best * 1000:10.2f} ms  {best / options['urls'] * 1e6:8.2f} us/url"
+                )
+
+    @staticmethod
+    def _time(signer, client_method, params, urls):
+        started = time.perf_counter()
+        for _ in range(urls):
+            signer.generate_presigned_url(client_method, Params=params, ExpiresIn=900)
+        return time.perf_counter() - started
@@ -0,0 +1,52 @@
+import multiprocessing
+import time
+
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+import django
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from organizations_management.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Run pending outbox jobs (organization bucket provisioning, file ingestion) with retries and backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the due jobs once and exit')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX['BATCH_SIZE'])
+        parser.add_argument('--poll-interval', type=float, default=settings.OUTBOX['POLL_INTERVAL'])
+        parser.add_argument('--workers', type=int, default=settings.OUTBOX['WORKERS'], help='Worker processes, 0 runs the jobs in this process')
+
+    def create_executor(self, workers):
+        if not workers:
+            return None
+        # spawned rather than forked, so the workers don't share this process database connections
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def handle(self, *args, **options):
+        executor = self.create_executor(options['workers'])
+        try:
+            while True:
+                try:
+                    processed = process_outbox(options['batch_size'], executor)
+                except BrokenExecutor as error:
+                    # a worker died, the jobs it left are claimed again once their lease runs out
+                    self.stderr.write(f'Outbox worker pool broke ({error!r}), starting a new one')
+                    executor.shutdown(wait=False)
+                    executor = self.create_executor(options['workers'])
+                    processed = 0
+                if options['once']:
+                    self.stdout.write(f'Processed {processed} outbox jobs')
+                    return
+                if not processed:
+                    time.sleep(options['poll_interval'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
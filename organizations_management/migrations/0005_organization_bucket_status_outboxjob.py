@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_buckets_ready(apps, schema_editor):
+    # organizations created before the outbox got their bucket synchronously
+    Organization = apps.get_model('organizations_management', 'Organization')
+    Organization.objects.update(bucket_status='READY')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations_management', '0004_organization_admins'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='bucket_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_buckets_ready, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='OutboxJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx')],
+            },
+        ),
+    ]
@@ -1,19 +1,55 @@
 import uuid
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-from organizations_management.helpers import create_bucket
 from users.models import User
 
 
-class OrganizationManager(models.Manager):
+class OrganizationQuerySet(models.QuerySet):
+
+    def visible_to(self, user):
+        """Organizations the user owns, administers or belongs to."""
+        admins = Organization.admins.through.objects.filter(organization_id=OuterRef('id'), user_id=user.id)
+        members = Organization.members.through.objects.filter(organization_id=OuterRef('id'), user_id=user.id)
+        return self.filter(Q(owner_id=user.id) | Exists(admins) | Exists(members))
+
+    def with_member_counts(self):
+        """Annotate member_count and admin_count, counted in subqueries instead of joining both m2m tables."""
+        return self.annotate(
+            member_count=self._through_count(Organization.members.through),
+            admin_count=self._through_count(Organization.admins.through),
+        )
+
+    @staticmethod
+    def _through_count(through):
+        counts = through.objects.filter(organization_id=OuterRef('id')).order_by().values('organization_id').annotate(count=Count('*'))
+        return Coalesce(Subquery(counts.values('count')), 0)
+
+
+class OrganizationManager(models.Manager.from_queryset(OrganizationQuerySet)):
 
     def create(self, **kwargs):
-        organization =  super().create(**kwargs)
-        create_bucket(f'organization-{organization.id}')
+        # the bucket is created by the outbox worker (manage.py process_outbox), the job row
+        # is written in the same transaction so it exists exactly when the organization does
+        with transaction.atomic(using=self.db):
+            organization = super().create(**kwargs)
+            OutboxJob.objects.using(self.db).create(
+                task=OutboxJob.CREATE_ORGANIZATION_BUCKET,
+                payload={'organization_id': str(organization.id)},
+            )
         return organization
 
 
+class BucketStatusChoices(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    READY = "READY", _("Ready")
+    FAILED = "FAILED", _("Failed")
+
+
 # Create your models here.
 class Organization(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -23,9 +59,14 @@ class Organization(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organizations_ownership')
     admins = models.ManyToManyField(User, blank=True, related_name='organizations_administratorship')
     members = models.ManyToManyField(User, blank=True, related_name='organizations_membership')
+    bucket_status = models.CharField(max_length=20, choices=BucketStatusChoices, default=BucketStatusChoices.PENDING)
 
     objects = OrganizationManager()
 
+    @property
+    def bucket_name(self):
+        return f'organization-{self.id}'
+
 
 # TODO: check ways of performing soft on_delete
 class Project(models.Model):
@@ -34,3 +75,31 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='projects')
+
+
+
+class OutboxJobStatusChoices(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    RUNNING = "RUNNING", _("Running")
+    DONE = "DONE", _("Done")
+    FAILED = "FAILED", _("Failed")
+
+
+class OutboxJob(models.Model):
+    CREATE_ORGANIZATION_BUCKET = 'create_organization_bucket'
+    INGEST_FILE = 'ingest_file'
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=OutboxJobStatusChoices, default=OutboxJobStatusChoices.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # next time the job may run: retry backoff while pending, lease expiry while running
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+        ]
@@ -0,0 +1,134 @@
+import logging
+import random
+
+from concurrent.futures import BrokenExecutor, as_completed
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from files import ingestion
+from organizations_management import helpers
+from organizations_management.models import BucketStatusChoices, Organization, OutboxJob, OutboxJobStatusChoices
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_organization_bucket(payload):
+    try:
+        helpers.create_bucket(f"organization-{payload['organization_id']}")
+    except ClientError as error:
+        # a retry after a lost response finds the bucket already there
+        if error.response.get('Error', {}).get('Code') != 'BucketAlreadyOwnedByYou':
+            raise
+    Organization.objects.filter(id=payload['organization_id']).update(bucket_status=BucketStatusChoices.READY)
+
+
+def fail_organization_bucket(payload):
+    Organization.objects.filter(id=payload['organization_id']).update(bucket_status=BucketStatusChoices.FAILED)
+
+
+def ingest_file(payload):
+    ingestion.ingest_file(payload['file_id'])
+
+
+def fail_file_ingestion(payload):
+    ingestion.fail_file_ingestion(payload['file_id'])
+
+
+# task -> (handler, called once the job gave up)
+TASKS = {
+    OutboxJob.CREATE_ORGANIZATION_BUCKET: (create_organization_bucket, fail_organization_bucket),
+    OutboxJob.INGEST_FILE: (ingest_file, fail_file_ingestion),
+}
+
+
+def backoff_delay(attempts):
+    """
+    Exponential backoff with equal jitter: half the delay is kept, the other half
+    is random, capped at OUTBOX['BACKOFF_MAX'] seconds.
+    """
+    ceiling = min(settings.OUTBOX['BACKOFF_MAX'], settings.OUTBOX['BACKOFF_BASE'] * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_jobs(batch_size):
+    """
+    Lease up to batch_size due jobs to this worker. Running jobs whose lease
+    ran out (the worker died) are due again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            OutboxJob.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutboxJobStatusChoices.PENDING, OutboxJobStatusChoices.RUNNING], available_at__lte=now)
+            .order_by('available_at')[:batch_size]
+        )
+        OutboxJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=OutboxJobStatusChoices.RUNNING,
+            available_at=now + timedelta(seconds=settings.OUTBOX['LEASE_SECONDS']),
+            updated_at=now,
+        )
+    return jobs
+
+
+def run_job(job):
+    job.attempts += 1
+    if job.task not in TASKS:
+        # no worker will ever know how to run it, don't keep retrying
+        logger.error('Outbox job %s has an unknown task %r', job.id, job.task)
+        job.status = OutboxJobStatusChoices.FAILED
+        job.last_error = f'Unknown task {job.task!r}'
+        job.save(update_fields=['status', 'attempts', 'last_error', 'updated_at'])
+        return job.status
+
+    handler, on_failure = TASKS[job.task]
+    try:
+        handler(job.payload)
+    except Exception as error:
+        job.last_error = repr(error)
+        if job.attempts >= settings.OUTBOX['MAX_ATTEMPTS']:
+            logger.error('Outbox job %s (%s) failed after %s attempts: %r', job.id, job.task, job.attempts, error)
+            job.status = OutboxJobStatusChoices.FAILED
+            on_failure(job.payload)
+        else:
+            logger.warning('Outbox job %s (%s) attempt %s failed: %r', job.id, job.task, job.attempts, error)
+            job.status = OutboxJobStatusChoices.PENDING
+            job.available_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+    else:
+        job.status = OutboxJobStatusChoices.DONE
+        job.last_error = ''
+    job.save(update_fields=['status', 'attempts', 'available_at', 'last_error', 'updated_at'])
+    return job.status
+
+
+def process_outbox(batch_size=None, executor=None):
+    """
+    Run one batch of due jobs, returns how many were claimed. With an executor (a
+    process pool, see the process_outbox command) the jobs of the batch run in
+    parallel. A job its worker couldn't run stays leased and is claimed again once
+    the lease runs out; BrokenExecutor is raised after the batch when the pool died,
+    so the caller can replace it.
+    """
+    jobs = claim_jobs(batch_size or settings.OUTBOX['BATCH_SIZE'])
+    if executor is None:
+        for job in jobs:
+            run_job(job)
+        return len(jobs)
+
+    futures = {executor.submit(run_job, job): job for job in jobs}
+    broken = None
+    for future in as_completed(futures):
+        job = futures[future]
+        try:
+            future.result()
+        except Exception as error:
+            logger.error('Outbox job %s (%s) could not be run by a worker: %r', job.id, job.task, error)
+            if isinstance(error, BrokenExecutor):
+                broken = error
+    if broken is not None:
+        raise broken
+    return len(jobs)
@@ -1,20 +1,30 @@
-from django.shortcuts import get_object_or_404
 from rest_framework import permissions
 
-from organizations_management import models
+from organizations_management import roles
 
 
 class OrganizationOwnerPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.owner
+        return roles.get_organization_role(request, obj) == roles.OWNER
 
 
 class OrganizationAdminPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user in obj.admins.all() or request.user == obj.owner
+        return roles.get_organization_role(request, obj) in roles.ADMIN_ROLES
  
 
 class OrganizationMemberPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user in obj.members.all() or request.user in obj.admins.all() or request.user == obj.admin
- 
\ No newline at end of file
+        return roles.get_organization_role(request, obj) in roles.MEMBER_ROLES
+
+
+class ProjectPermission(permissions.BasePermission):
+    """
+    Members of the organization in the url can read its projects, owner and
+    admins can also change them. Answered from the cached role map.
+    """
+    def has_permission(self, request, view):
+        role = roles.get_organization_role(request, view.organization_id)
+        if request.method in permissions.SAFE_METHODS:
+            return role in roles.MEMBER_ROLES
+        return role in roles.ADMIN_ROLES
@@ -0,0 +1,148 @@
+import hashlib
+import hmac
+import threading
+
+from collections import OrderedDict
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from botocore.compat import get_current_datetime
+
+
+SIGV4_TIMESTAMP = '%Y%m%dT%H%M%SZ'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+# client method -> (http method, [(Params key, query string name)])
+OPERATIONS = {
+    'get_object': ('GET', []),
+    'head_object': ('HEAD', []),
+    'put_object': ('PUT', []),
+    'delete_object': ('DELETE', []),
+    'upload_part': ('PUT', [('PartNumber', 'partNumber'), ('UploadId', 'uploadId')]),
+}
+SUPPORTED_PARAMS = {'Bucket', 'Key', 'ContentType', 'PartNumber', 'UploadId'}
+
+
+def _quote(value, safe='-_.~'):
+    return quote(str(value), safe=safe)
+
+
+class S3Presigner:
+    """
+    SigV4 query string signer for S3 presigned urls that does the same work as
+    client.generate_presigned_url without botocore's request pipeline.
+
+    Endpoint resolution (host, addressing style, signing region) is left to the
+    client: the first url signed for a bucket is generated by botocore and its
+    prefix and credential scope are reused for that bucket afterwards. The
+    per-day signing key is derived once per date, region and secret. Anything
+    this signer doesn't handle (other methods or params, non SigV4 clients)
+    goes through the client.
+    """
+
+    def __init__(self, client, max_buckets=1024):
+        self.client = client
+        self.max_buckets = max_buckets
+        self._endpoints = OrderedDict()
+        self._signing_keys = {}
+        self._lock = threading.Lock()
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600):
+        return self.generate_presigned_urls(ClientMethod, [Params], ExpiresIn=ExpiresIn)[0]
+
+    def generate_presigned_urls(self, ClientMethod, ParamsList, ExpiresIn=3600):
+        """
+        Sign one url per Params in ParamsList. The batch shares a single
+        credentials lookup, timestamp and signing key.
+        """
+        urls = []
+        credentials = timestamp = None
+        for params in ParamsList:
+            params = params or {}
+            endpoint = None
+            if ClientMethod in OPERATIONS and set(params) <= SUPPORTED_PARAMS and 'Bucket' in params:
+                endpoint = self._endpoint(params['Bucket'])
+            if endpoint is None:
+                urls.append(self.client.generate_presigned_url(ClientMethod, Params=params, ExpiresIn=ExpiresIn))
+                continue
+            if credentials is None:
+                credentials = self.client._request_signer._credentials.get_frozen_credentials()
+                timestamp = get_current_datetime().strftime(SIGV4_TIMESTAMP)
+            urls.append(self._sign(ClientMethod, params, ExpiresIn, endpoint, credentials, timestamp))
+        return urls
+
+    def _sign(self, ClientMethod, params, ExpiresIn, endpoint, credentials, timestamp):
+        base_url, host, path_prefix, region, service = endpoint
+        datestamp = timestamp[:8]
+        scope = f'{datestamp}/{region}/{service}/aws4_request'
+
+        method, query_params = OPERATIONS[ClientMethod]
+        path = path_prefix + _quote(params.get('Key', ''), safe='/~')
+        headers = [('host', host)]
+        if params.get('ContentType') is not None:
+            headers.insert(0, ('content-type', ' '.join(str(params['ContentType']).split())))
+        signed_headers = ';'.join(name for name, _ in headers)
+
+        operation_query = [(name, _quote(params[key])) for key, name in query_params if key in params]
+        auth_query = [
+            ('X-Amz-Algorithm', 'AWS4-HMAC-SHA256'),
+            ('X-Amz-Credential', _quote(f'{credentials.access_key}/{scope}')),
+            ('X-Amz-Date', timestamp),
+            ('X-Amz-Expires', str(ExpiresIn)),
+            ('X-Amz-SignedHeaders', _quote(signed_headers)),
+        ]
+        if credentials.token is not None:
+            auth_query.append(('X-Amz-Security-Token', _quote(credentials.token)))
+
+        canonical_query = '&'.join(f'{name}={value}' for name, value in sorted(operation_query + auth_query))
+        canonical_request = '\n'.join([
+            method,
+            path,
+            canonical_query,
+            ''.join(f'{name}:{value}\n' for name, value in headers),
+            signed_headers,
+            UNSIGNED_PAYLOAD,
+        ])
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256',
+            timestamp,
+            scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ])
+        signing_key = self._signing_key(credentials.secret_key, datestamp, region, service)
+        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        query = '&'.join(f'{name}={value}' for name, value in operation_query + auth_query)
+        return f'{base_url}{path}?{query}&X-Amz-Signature={signature}'
+
+    def _signing_key(self, secret_key, datestamp, region, service):
+        cache_key = (secret_key, datestamp, region, service)
+        signing_key = self._signing_keys.get(cache_key)
+        if signing_key is None:
+            signing_key = f'AWS4{secret_key}'.encode('utf-8')
+            for part in (datestamp, region, service, 'aws4_request'):
+                signing_key = hmac.new(signing_key, part.encode('utf-8'), hashlib.sha256).digest()
+            # keys from previous days are no use anymore
+            self._signing_keys = {cache_key: signing_key}
+        return signing_key
+
+    def _endpoint(self, bucket):
+        with self._lock:
+            if bucket in self._endpoints:
+                self._endpoints.move_to_end(bucket)
+                return self._endpoints[bucket]
+
+        probe = self.client.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': 'k'}, ExpiresIn=60)
+        url = urlsplit(probe)
+        credential = dict(parse_qsl(url.query)).get('X-Amz-Credential')
+        if credential is None or not url.path.endswith('/k'):
+            # not a SigV4 client, urls for this bucket go through botocore
+            endpoint = None
+        else:
+            _, _, region, service, _ = credential.split('/')
+            endpoint = (f'{url.scheme}://{url.netloc}', url.netloc, url.path[:-1], region, service)
+
+        with self._lock:
+            self._endpoints[bucket] = endpoint
+            while len(self._endpoints) > self.max_buckets:
+                self._endpoints.popitem(last=False)
+        return endpoint
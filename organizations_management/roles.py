@@ -0,0 +1,129 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Exists, OuterRef, Q
+
+from organizations_management import models
+
+
+OWNER = 'owner'
+ADMIN = 'admin'
+MEMBER = 'member'
+
+ADMIN_ROLES = (OWNER, ADMIN)
+MEMBER_ROLES = (OWNER, ADMIN, MEMBER)
+
+
+class OrganizationRoleCache:
+    """
+    Maps a user to {organization_id: role} for every organization the user owns,
+    administers or belongs to. The map is built with one query and stored in a
+    Django cache under a per-user version, invalidating a user bumps the version.
+
+    With a shared backend (redis, memcached, database) every process stops reading
+    the old map at once. A process local backend (LocMemCache) only sees the bumps
+    of its own process, so there the maps are kept for at most local_timeout seconds
+    and other workers can use a revoked role for that long.
+    """
+    key_prefix = 'org-roles'
+
+    def __init__(self, cache_alias='default', timeout=300, local_timeout=5):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+
+    @property
+    def enabled(self):
+        return bool(self.cache_alias) and self.roles_timeout > 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def shared(self):
+        return not isinstance(self.cache, LocMemCache)
+
+    @property
+    def roles_timeout(self):
+        if not self.cache_alias or self.shared:
+            return self.timeout
+        return min(self.timeout, self.local_timeout)
+
+    def get_roles(self, user_id):
+        if not self.enabled:
+            return self.build_roles(user_id)
+        key = self._roles_key(user_id)
+        roles = self.cache.get(key)
+        if roles is None:
+            roles = self.build_roles(user_id)
+            self.cache.set(key, roles, timeout=self.roles_timeout)
+        return roles
+
+    def invalidate(self, user_ids):
+        if not self.enabled:
+            return
+        generation = time.time_ns()
+        self.cache.set_many({self._version_key(user_id): generation for user_id in set(map(str, user_ids))}, timeout=None)
+
+    @staticmethod
+    def build_roles(user_id):
+        admins = models.Organization.admins.through.objects.filter(organization_id=OuterRef('id'), user_id=user_id)
+        members = models.Organization.members.through.objects.filter(organization_id=OuterRef('id'), user_id=user_id)
+        rows = models.Organization.objects.filter(
+            Q(owner_id=user_id) | Exists(admins) | Exists(members)
+        ).values_list('id', 'owner_id', Exists(admins), Exists(members))
+
+        roles = {}
+        for organization_id, owner_id, is_admin, is_member in rows:
+            if str(owner_id) == str(user_id):
+                roles[str(organization_id)] = OWNER
+            elif is_admin:
+                roles[str(organization_id)] = ADMIN
+            elif is_member:
+                roles[str(organization_id)] = MEMBER
+        return roles
+
+    def _version_key(self, user_id):
+        return f'{self.key_prefix}-version:{user_id}'
+
+    def _roles_key(self, user_id):
+        version = self.cache.get(self._version_key(user_id), 0)
+        return f'{self.key_prefix}:{user_id}:{version}'
+
+
+organization_role_cache = OrganizationRoleCache(
+    cache_alias=settings.ORGANIZATION_ROLE_CACHE['CACHE_ALIAS'],
+    timeout=settings.ORGANIZATION_ROLE_CACHE['TIMEOUT'],
+    local_timeout=settings.ORGANIZATION_ROLE_CACHE['LOCAL_TIMEOUT'],
+)
+
+
+def get_user_roles(request):
+    """
+    {organization_id: role} for request.user, read from the role cache once and
+    kept on the request for any further permission checks.
+    """
+    user = request.user
+    if not user or not user.is_authenticated:
+        return {}
+    roles = request.__dict__.get('_organization_roles')
+    if roles is None:
+        roles = request.__dict__['_organization_roles'] = organization_role_cache.get_roles(user.id)
+    return roles
+
+
+def get_organization_role(request, organization):
+    """
+    Role of request.user in the organization (OWNER, ADMIN, MEMBER or None).
+    Accepts an Organization or its id, ownership of a loaded organization is
+    answered from the row itself.
+    """
+    if isinstance(organization, models.Organization):
+        user = request.user
+        if user and user.is_authenticated and organization.owner_id == user.id:
+            return OWNER
+        organization = organization.id
+    return get_user_roles(request).get(str(organization))
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from organizations_management import models
+from organizations_management.roles import organization_role_cache
+
+
+# sent by the bulk member endpoints, which write the through table directly and
+# so never trigger m2m_changed. Provides `organization` and `user_ids`.
+organization_members_changed = Signal()
+
+
+def invalidate_roles(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    organization_role_cache.invalidate(user_ids)
+    # and again once committed, in case another request rebuilt a map from the old rows meanwhile
+    transaction.on_commit(lambda: organization_role_cache.invalidate(user_ids))
+
+
+def organization_user_ids(organization_id):
+    admins = models.Organization.admins.through.objects.filter(organization_id=organization_id).values_list('user_id', flat=True)
+    members = models.Organization.members.through.objects.filter(organization_id=organization_id).values_list('user_id', flat=True)
+    return set(admins.union(members))
+
+
+@receiver(organization_members_changed)
+def invalidate_changed_members(sender, organization, user_ids, **kwargs):
+    invalidate_roles(user_ids)
+
+
+@receiver(m2m_changed, sender=models.Organization.admins.through)
+@receiver(m2m_changed, sender=models.Organization.members.through)
+def invalidate_m2m_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # user.organizations_membership.add(...), the instance is the user
+        invalidate_roles([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_roles(organization_user_ids(instance.pk))
+    else:
+        invalidate_roles(pk_set)
+
+
+@receiver(pre_save, sender=models.Organization)
+def invalidate_previous_owner(sender, instance, raw, **kwargs):
+    if raw or instance._state.adding:
+        return
+    previous_owner_id = models.Organization.objects.filter(id=instance.id).values_list('owner_id', flat=True).first()
+    if previous_owner_id is not None and previous_owner_id != instance.owner_id:
+        invalidate_roles([previous_owner_id])
+
+
+@receiver(post_save, sender=models.Organization)
+def invalidate_owner(sender, instance, **kwargs):
+    invalidate_roles([instance.owner_id])
+
+
+@receiver(pre_delete, sender=models.Organization)
+def invalidate_deleted_organization(sender, instance, **kwargs):
+    invalidate_roles(organization_user_ids(instance.id) | {instance.owner_id})
@@ -1,25 +1,42 @@
 from rest_framework import serializers
 
 from organizations_management import models
+from users.models import User
 
 
 class OrganizationCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Organization
         exclude = ['created_at', 'updated_at', 'owner', 'members', 'admins']
+        read_only_fields = ['bucket_status']
 
 
 class OrganizationUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Organization
         exclude = ['created_at', 'updated_at', 'owner']
+        read_only_fields = ['bucket_status']
 
 
-class OrganizationAddRemoveMemberSerializer(serializers.ModelSerializer):
+class OrganizationBulkMembersSerializer(serializers.Serializer):
+    MAX_MEMBERS = 1000
 
-    class Meta:
-        model = models.Organization
-        fields = ['members']
+    members = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_MEMBERS)
+
+    def validate_members(self, value):
+        # keep the order of the request but drop repeated ids
+        return list(dict.fromkeys(value))
+
+
+class OrganizationAddMembersSerializer(OrganizationBulkMembersSerializer):
+
+    def validate_members(self, value):
+        value = super().validate_members(value)
+        existing = set(User.objects.filter(id__in=value).values_list('id', flat=True))
+        missing = [str(user_id) for user_id in value if user_id not in existing]
+        if missing:
+            raise serializers.ValidationError(f'Users not found: {", ".join(missing)}')
+        return value
 
 
 class OrganizationSerializer(serializers.ModelSerializer):
@@ -28,6 +45,16 @@ class OrganizationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class OrganizationListSerializer(serializers.ModelSerializer):
+    # annotated by OrganizationQuerySet.with_member_counts
+    member_count = serializers.IntegerField(read_only=True)
+    admin_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = models.Organization
+        fields = ['id', 'name', 'created_at', 'updated_at', 'owner', 'bucket_status', 'member_count', 'admin_count']
+
+
 class ProjectCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Project
@@ -43,4 +70,14 @@ class ProjectUpdateSerializer(serializers.ModelSerializer):
 class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Project
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class ProjectBulkUpdateSerializer(serializers.ModelSerializer):
+    # the project to update, the other fields are optional
+    id = serializers.UUIDField()
+
+    class Meta:
+        model = models.Project
+        fields = ['id', 'name']
+        extra_kwargs = {'name': {'required': False}}
\ No newline at end of file
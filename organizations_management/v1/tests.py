@@ -1,16 +1,32 @@
 import datetime
+import io
+import time
 import uuid
 
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
 from uuid import UUID
 
+from botocore.exceptions import ClientError, EndpointConnectionError
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import test
 
-from organizations_management.models import Organization
-from organizations_management.v1.views import OrganizationViewSet
+from organizations_management import outbox, permissions
+from organizations_management import roles
+from organizations_management.models import Organization, OutboxJob, Project
+from organizations_management.v1.views import OrganizationViewSet, ProjectViewSet
+from root_project.testing import QueryBudgetTestMixin, captured_sql
 from users.models import User
 
 
@@ -38,12 +54,689 @@ class OrganizationObjectsTestCase(TestCase):
         test.force_authenticate(request, user)
         response = OrganizationViewSet.as_view({'get': 'list'})(request)
             
-        expected_response_data = [
-            {'id': '760ff2f6-2691-4183-aae4-68c82f151c57', 'name': 'string1', 'created_at': '2025-08-23T22:58:48.781000Z', 'updated_at': '2025-08-24T00:26:27.397000Z', 'owner': UUID('05bad384-852c-430b-8e73-a68d5822dd9c'), 'admins': [], 'members': []}, 
-            {'id': 'e24f3b51-b037-49cd-b91e-04401b39434e', 'name': 'string2', 'created_at': '2025-08-23T23:05:48.485000Z', 'updated_at': '2025-08-23T23:05:48.485000Z', 'owner': UUID('05bad384-852c-430b-8e73-a68d5822dd9c'), 'admins': [], 'members': []},
-            {'id': '07857395-3c68-4e16-aaae-c45e3c9d1b7d', 'name': 'string3', 'created_at': '2025-08-23T23:04:28.449000Z', 'updated_at': '2025-08-23T23:04:28.449000Z', 'owner': UUID('0b6751d3-0e20-49fb-81b0-bf7f4f6d84bb'), 'admins': [], 'members': []}
-        ]
+        expected_response_data = {
+            'count': 3,
+            'next': None,
+            'previous': None,
+            'results': [
+                {'id': '760ff2f6-2691-4183-aae4-68c82f151c57', 'name': 'string1', 'created_at': '2025-08-23T22:58:48.781000Z', 'updated_at': '2025-08-24T00:26:27.397000Z', 'owner': UUID('05bad384-852c-430b-8e73-a68d5822dd9c'), 'bucket_status': 'READY', 'member_count': 0, 'admin_count': 0},
+                {'id': '07857395-3c68-4e16-aaae-c45e3c9d1b7d', 'name': 'string3', 'created_at': '2025-08-23T23:04:28.449000Z', 'updated_at': '2025-08-23T23:04:28.449000Z', 'owner': UUID('0b6751d3-0e20-49fb-81b0-bf7f4f6d84bb'), 'bucket_status': 'READY', 'member_count': 0, 'admin_count': 0},
+                {'id': 'e24f3b51-b037-49cd-b91e-04401b39434e', 'name': 'string2', 'created_at': '2025-08-23T23:05:48.485000Z', 'updated_at': '2025-08-23T23:05:48.485000Z', 'owner': UUID('05bad384-852c-430b-8e73-a68d5822dd9c'), 'bucket_status': 'READY', 'member_count': 0, 'admin_count': 0},
+            ],
+        }
         
         self.assertEqual(response.data, expected_response_data)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(request.user, user)
+
+
+class OrganizationListTestCase(QueryBudgetTestMixin, TestCase):
+    fixtures = ['users']
+
+    def setUp(self):
+        self.user = User.objects.get(username='admin')
+        self.user.is_staff = False
+        self.user.save()
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.user)
+        self.other_users = list(User.objects.exclude(id=self.user.id)[:10])
+
+    def _organizations(self, count, owner):
+        organizations = Organization.objects.bulk_create([
+            Organization(name=f'organization {index}', owner=owner, bucket_status='READY') for index in range(count)
+        ])
+        Organization.members.through.objects.bulk_create([
+            Organization.members.through(organization_id=organization.id, user_id=user.id)
+            for organization in organizations for user in self.other_users[:3]
+        ])
+        Organization.admins.through.objects.bulk_create([
+            Organization.admins.through(organization_id=organization.id, user_id=self.other_users[3].id)
+            for organization in organizations
+        ])
+        return organizations
+
+    def _list(self, **params):
+        with CaptureQueriesContext(connection) as context, self.assertQueryBudget(OrganizationViewSet, 'list'):
+            response = self.client.get(reverse('organizations-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, captured_sql(context)
+
+    def test_list_is_scoped_to_the_caller_memberships(self):
+        owned = self._organizations(1, self.user)[0]
+        administered, member_of, _ = self._organizations(3, self.other_users[5])
+        administered.admins.add(self.user)
+        member_of.members.add(self.user)
+
+        response, _ = self._list()
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual({item['id'] for item in response.data['results']}, {str(owned.id), str(administered.id), str(member_of.id)})
+        counts = {item['id']: (item['member_count'], item['admin_count']) for item in response.data['results']}
+        self.assertEqual(counts[str(owned.id)], (3, 1))
+        self.assertEqual(counts[str(member_of.id)], (4, 1))
+        self.assertEqual(counts[str(administered.id)], (3, 2))
+        self.assertNotIn('members', response.data['results'][0])
+
+    def test_list_query_count_does_not_grow_with_organizations(self):
+        self._organizations(5, self.user)
+        _, small = self._list(page_size=1000)
+        self._organizations(995, self.user)
+        response, large = self._list(page_size=1000)
+
+        self.assertEqual(len(response.data['results']), 1000)
+        self.assertEqual(len(small), len(large))
+
+    def test_list_is_paginated(self):
+        self._organizations(150, self.user)
+
+        response, _ = self._list()
+
+        self.assertEqual(response.data['count'], 150)
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_project_list_stays_within_the_query_budget(self):
+        cache.clear()
+        organization = self._organizations(1, self.user)[0]
+        Project.objects.bulk_create([Project(name=f'project {index}', organization=organization) for index in range(20)])
+
+        with self.assertQueryBudget(ProjectViewSet, 'list'):
+            response = self.client.get(reverse('projects-list', kwargs={'organization_id': organization.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+
+
+class OrganizationBulkMembersTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.organization.owner)
+        self.user_ids = [str(user_id) for user_id in User.objects.exclude(id=self.organization.owner_id).values_list('id', flat=True)]
+
+    def test_add_members(self):
+        url = reverse('organizations-add-member', args=[self.organization.id])
+        response = self.client.put(url, {'members': self.user_ids[:3] + self.user_ids[:1]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'added': 3, 'already_members': 0})
+        self.assertEqual(self.organization.members.count(), 3)
+
+        response = self.client.put(url, {'members': self.user_ids[:5]}, format='json')
+        self.assertEqual(response.data, {'added': 2, 'already_members': 3})
+        self.assertEqual(self.organization.members.count(), 5)
+
+    def test_add_members_query_count_does_not_grow_with_members(self):
+        url = reverse('organizations-add-member', args=[self.organization.id])
+        self.client.put(url, {'members': self.user_ids[:2]}, format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.client.put(url, {'members': self.user_ids[2:4]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.put(url, {'members': self.user_ids[4:]}, format='json')
+
+        self.assertEqual(len(captured_sql(small)), len(captured_sql(large)))
+        self.assertEqual(self.organization.members.count(), len(self.user_ids))
+
+    def test_add_unknown_member_is_rejected(self):
+        url = reverse('organizations-add-member', args=[self.organization.id])
+        response = self.client.put(url, {'members': [self.user_ids[0], str(uuid.uuid4())]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.organization.members.count(), 0)
+
+    def test_remove_members(self):
+        self.organization.members.add(*self.user_ids[:4])
+        url = reverse('organizations-remove-member', args=[self.organization.id])
+        response = self.client.put(url, {'members': self.user_ids[:2] + [self.user_ids[10]]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'removed': 2, 'not_members': 1})
+        self.assertEqual(set(str(user_id) for user_id in self.organization.members.values_list('id', flat=True)), set(self.user_ids[2:4]))
+
+    def test_members_change_bumps_updated_at(self):
+        updated_at = self.organization.updated_at
+        url = reverse('organizations-add-member', args=[self.organization.id])
+        self.client.put(url, {'members': self.user_ids[:1]}, format='json')
+
+        self.organization.refresh_from_db()
+        self.assertGreater(self.organization.updated_at, updated_at)
+
+    def test_non_admin_cannot_add_members(self):
+        self.client.force_authenticate(User.objects.get(id=self.user_ids[0]))
+        url = reverse('organizations-add-member', args=[self.organization.id])
+        response = self.client.put(url, {'members': self.user_ids[:1]}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.organization.members.count(), 0)
+
+
+class OrganizationPermissionTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        users = User.objects.exclude(id=self.organization.owner_id)
+        self.admin, self.member, self.outsider = users[:3]
+        self.organization.admins.add(self.admin)
+        self.organization.members.add(self.member)
+        cache.clear()
+
+    def _request(self, user):
+        request = test.APIRequestFactory().get('/')
+        request.user = user
+        return request
+
+    def _allowed(self, permission_class, request):
+        return permission_class().has_object_permission(request, None, self.organization)
+
+    def test_roles(self):
+        cases = [
+            (self.organization.owner, True, True, True),
+            (self.admin, False, True, True),
+            (self.member, False, False, True),
+            (self.outsider, False, False, False),
+        ]
+        for user, owner, admin, member in cases:
+            with self.subTest(user=user.username):
+                request = self._request(user)
+                self.assertEqual(self._allowed(permissions.OrganizationOwnerPermission, request), owner)
+                self.assertEqual(self._allowed(permissions.OrganizationAdminPermission, request), admin)
+                self.assertEqual(self._allowed(permissions.OrganizationMemberPermission, request), member)
+
+    def test_permission_checks_share_one_query_per_request(self):
+        request = self._request(self.member)
+        with CaptureQueriesContext(connection) as context:
+            self._allowed(permissions.OrganizationAdminPermission, request)
+            self._allowed(permissions.OrganizationMemberPermission, request)
+            self._allowed(permissions.OrganizationOwnerPermission, request)
+
+        queries = captured_sql(context)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('EXISTS', queries[0])
+
+    def test_owner_needs_no_query(self):
+        request = self._request(self.organization.owner)
+        with CaptureQueriesContext(connection) as context:
+            self._allowed(permissions.OrganizationAdminPermission, request)
+
+        self.assertEqual(captured_sql(context), [])
+
+
+class OrganizationRoleCacheTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        users = User.objects.exclude(id=self.organization.owner_id)
+        self.admin, self.member, self.outsider = users[:3]
+        self.organization.admins.add(self.admin)
+        self.organization.members.add(self.member)
+        self.client = test.APIClient()
+
+    def _role(self, user):
+        request = test.APIRequestFactory().get('/')
+        request.user = user
+        return roles.get_organization_role(request, self.organization.id)
+
+    def test_role_map(self):
+        self.assertEqual(roles.organization_role_cache.build_roles(self.organization.owner_id), {
+            '760ff2f6-2691-4183-aae4-68c82f151c57': roles.OWNER,
+            'e24f3b51-b037-49cd-b91e-04401b39434e': roles.OWNER,
+        })
+        self.assertEqual(self._role(self.admin), roles.ADMIN)
+        self.assertEqual(self._role(self.member), roles.MEMBER)
+        self.assertIsNone(self._role(self.outsider))
+
+    def test_cached_role_needs_no_query(self):
+        self._role(self.member)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self._role(self.member), roles.MEMBER)
+
+        self.assertEqual(captured_sql(context), [])
+
+    def test_process_local_cache_keeps_roles_briefly(self):
+        role_cache = roles.OrganizationRoleCache(cache_alias='default', timeout=300, local_timeout=5)
+
+        self.assertFalse(role_cache.shared)
+        self.assertEqual(role_cache.roles_timeout, 5)
+        with patch.object(cache, 'set', wraps=cache.set) as mock_set:
+            role_cache.get_roles(self.member.id)
+        self.assertEqual(mock_set.call_args[1]['timeout'], 5)
+
+        with patch.object(roles.OrganizationRoleCache, 'shared', True):
+            self.assertEqual(role_cache.roles_timeout, 300)
+
+    def test_bulk_member_endpoints_invalidate_roles(self):
+        self.assertIsNone(self._role(self.outsider))
+        self.client.force_authenticate(self.admin)
+
+        self.client.put(reverse('organizations-add-member', args=[self.organization.id]), {'members': [str(self.outsider.id)]}, format='json')
+        self.assertEqual(self._role(self.outsider), roles.MEMBER)
+
+        self.client.put(reverse('organizations-remove-member', args=[self.organization.id]), {'members': [str(self.outsider.id)]}, format='json')
+        self.assertIsNone(self._role(self.outsider))
+
+    def test_organization_update_invalidates_roles(self):
+        self.assertEqual(self._role(self.member), roles.MEMBER)
+        self.client.force_authenticate(self.organization.owner)
+
+        response = self.client.put(
+            reverse('organizations-detail', args=[self.organization.id]),
+            {'name': 'renamed', 'admins': [str(self.admin.id), str(self.member.id)], 'members': []},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._role(self.member), roles.ADMIN)
+
+    def test_project_permissions(self):
+        Project.objects.create(name='project', organization=self.organization)
+        url = reverse('projects-list', kwargs={'organization_id': self.organization.id})
+        cases = [
+            (self.member, 200, 403),
+            (self.admin, 200, 201),
+            (self.outsider, 403, 403),
+        ]
+        for user, list_status, create_status in cases:
+            with self.subTest(user=user.username):
+                self.client.force_authenticate(user)
+                self.assertEqual(self.client.get(url).status_code, list_status)
+                self.assertEqual(self.client.post(url, {'name': 'new project'}, format='json').status_code, create_status)
+
+    def test_project_list_authorization_needs_no_query_once_cached(self):
+        self.client.force_authenticate(self.member)
+        url = reverse('projects-list', kwargs={'organization_id': self.organization.id})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        # the conditional get validators and the page, no role lookup
+        queries = captured_sql(context)
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertIn('organizations_management_project', query)
+            self.assertNotIn('organizations_management_organization_members', query)
+
+
+class ProjectViewSetTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.organization.owner)
+        self.url = reverse('projects-list', kwargs={'organization_id': self.organization.id})
+        # warm the role cache
+        self.client.get(self.url)
+
+    def test_create_is_one_read_and_one_insert(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'name': 'new project'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Project.objects.get(id=response.data['id']).organization_id, self.organization.id)
+        queries = captured_sql(context)
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(queries[0].startswith('SELECT'))
+        self.assertTrue(queries[1].startswith('INSERT'))
+
+    def test_reads_join_the_organization(self):
+        project = Project.objects.create(name='project', organization=self.organization)
+        Project.objects.create(name='elsewhere', organization=Organization.objects.get(id='e24f3b51-b037-49cd-b91e-04401b39434e'))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+
+        self.assertEqual([item['id'] for item in response.data], [str(project.id)])
+        queries = captured_sql(context)
+        # the conditional get validators, then the page
+        self.assertEqual(len(queries), 2)
+        self.assertIn('MAX(', queries[0])
+        self.assertIn('JOIN "organizations_management_organization"', queries[1])
+
+        response = self.client.get(reverse('projects-detail', kwargs={'organization_id': self.organization.id, 'pk': project.id}))
+        self.assertEqual(response.status_code, 200)
+
+
+class ProjectBulkTestCase(QueryBudgetTestMixin, TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.organization.owner)
+        self.url = reverse('projects-bulk-create', kwargs={'organization_id': self.organization.id})
+
+    def test_bulk_create(self):
+        with self.assertQueryBudget(ProjectViewSet, 'bulk_create'):
+            response = self.client.post(self.url, [{'name': f'project {index}'} for index in range(300)], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['name'] for item in response.data], [f'project {index}' for index in range(300)])
+        self.assertEqual(self.organization.projects.count(), 300)
+        self.assertEqual(str(self.organization.projects.get(name='project 0').id), response.data[0]['id'])
+
+    def test_bulk_create_validates_the_whole_list(self):
+        response = self.client.post(self.url, [{'name': 'ok'}, {}, {'name': 'x' * 300}], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('name', response.data[1])
+        self.assertIn('name', response.data[2])
+        self.assertFalse(self.organization.projects.exists())
+
+    def test_bulk_partial_update(self):
+        projects = Project.objects.bulk_create([Project(name=f'project {index}', organization=self.organization) for index in range(50)])
+        updated_at = projects[0].updated_at
+        payload = [{'id': str(project.id), 'name': f'renamed {index}'} for index, project in enumerate(projects)]
+
+        with self.assertQueryBudget(ProjectViewSet, 'bulk_partial_update'):
+            response = self.client.patch(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data], [f'renamed {index}' for index in range(50)])
+        project = Project.objects.get(id=projects[0].id)
+        self.assertEqual(project.name, 'renamed 0')
+        self.assertGreater(project.updated_at, updated_at)
+
+    def test_bulk_partial_update_rejects_foreign_and_repeated_projects(self):
+        project = Project.objects.create(name='project', organization=self.organization)
+        foreign = Project.objects.create(name='foreign', organization=Organization.objects.get(id='07857395-3c68-4e16-aaae-c45e3c9d1b7d'))
+        payload = [{'id': str(project.id), 'name': 'a'}, {'id': str(foreign.id), 'name': 'b'}, {'id': str(project.id), 'name': 'c'}]
+
+        response = self.client.patch(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        self.assertIn('id', response.data[2])
+        self.assertEqual(Project.objects.get(id=project.id).name, 'project')
+        self.assertEqual(Project.objects.get(id=foreign.id).name, 'foreign')
+
+    def test_bulk_endpoints_need_an_admin(self):
+        member = User.objects.exclude(id=self.organization.owner_id).first()
+        self.organization.members.add(member)
+        self.client.force_authenticate(member)
+
+        self.assertEqual(self.client.post(self.url, [{'name': 'project'}], format='json').status_code, 403)
+        self.assertEqual(self.client.patch(self.url, [], format='json').status_code, 403)
+
+    def test_bulk_size_is_limited(self):
+        response = self.client.post(self.url, [{'name': 'project'}] * (ProjectViewSet.bulk_max_size + 1), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.organization.projects.exists())
+
+
+class ConditionalGetTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        cache.clear()
+        self.organization = Organization.objects.get(id='760ff2f6-2691-4183-aae4-68c82f151c57')
+        self.project = Project.objects.create(name='project', organization=self.organization)
+        self.client = test.APIClient()
+        self.client.force_authenticate(self.organization.owner)
+        self.urls = [
+            reverse('organizations-list'),
+            reverse('organizations-detail', args=[self.organization.id]),
+            reverse('projects-list', kwargs={'organization_id': self.organization.id}),
+            reverse('projects-detail', kwargs={'organization_id': self.organization.id, 'pk': self.project.id}),
+        ]
+
+    def test_matching_etag_is_not_modified_without_loading_rows(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                with CaptureQueriesContext(connection) as context, \
+                        patch('rest_framework.serializers.ModelSerializer.to_representation') as mock_to_representation:
+                    not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+                mock_to_representation.assert_not_called()
+                queries = captured_sql(context)
+                self.assertEqual(len(queries), 1)
+                self.assertIn('MAX(', queries[0])
+
+    def test_changes_give_a_new_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+
+        Project.objects.filter(id=self.project.id).update(updated_at=timezone.now() + datetime.timedelta(seconds=1))
+        Organization.objects.filter(id=self.organization.id).update(updated_at=timezone.now() + datetime.timedelta(seconds=1))
+
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_project_changes_the_list_etag(self):
+        url = self.urls[2]
+        Project.objects.create(name='other', organization=self.organization, updated_at=self.project.updated_at)
+        etag = self.client.get(url)['ETag']
+
+        Project.objects.filter(name='other').delete()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.urls[1])
+
+        self.assertEqual(self.client.get(self.urls[1], HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_lists_have_no_last_modified(self):
+        url = self.urls[2]
+        other = Project.objects.create(name='other', organization=self.organization)
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+
+        # MAX(updated_at) goes back in time once the newest project is gone
+        other.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_list_pages_have_their_own_etag(self):
+        for index in range(2):
+            Organization.objects.create(name=f'organization {index}', owner=self.organization.owner)
+        url = self.urls[0]
+
+        etags = {
+            self.client.get(url, params)['ETag']
+            for params in [{}, {'page': 2, 'page_size': 1}, {'page': 3, 'page_size': 1}, {'page_size': 1000}]
+        }
+
+        self.assertEqual(len(etags), 4)
+
+    def test_missing_object_is_not_found(self):
+        url = reverse('projects-detail', kwargs={'organization_id': self.organization.id, 'pk': uuid.uuid4()})
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+class FakeExecutor:
+    """Runs what is submitted right away in this process, answering with futures like a process pool."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@override_settings(OUTBOX={**settings.OUTBOX, 'MAX_ATTEMPTS': 3})
+class OrganizationBucketProvisioningTestCase(TestCase):
+    fixtures = ['users', 'organizations']
+
+    def setUp(self):
+        self.client = test.APIClient()
+        self.client.force_authenticate(User.objects.get(username='admin'))
+
+    def _create_organization(self):
+        response = self.client.post(reverse('organizations-list'), {'name': 'new organization'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Organization.objects.get(id=response.data['id']), response
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_create_returns_before_bucket_is_created(self, mock_create_bucket):
+        organization, response = self._create_organization()
+
+        mock_create_bucket.assert_not_called()
+        self.assertEqual(response.data['bucket_status'], 'PENDING')
+        job = OutboxJob.objects.get()
+        self.assertEqual(job.task, OutboxJob.CREATE_ORGANIZATION_BUCKET)
+        self.assertEqual(job.payload, {'organization_id': str(organization.id)})
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_worker_creates_bucket(self, mock_create_bucket):
+        organization, _ = self._create_organization()
+
+        call_command('process_outbox', '--once', stdout=io.StringIO())
+
+        mock_create_bucket.assert_called_once_with(Bucket=f'organization-{organization.id}')
+        organization.refresh_from_db()
+        self.assertEqual(organization.bucket_status, 'READY')
+        self.assertEqual(OutboxJob.objects.get().status, 'DONE')
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_bucket_already_owned_counts_as_created(self, mock_create_bucket):
+        mock_create_bucket.side_effect = ClientError({'Error': {'Code': 'BucketAlreadyOwnedByYou'}}, 'CreateBucket')
+        organization, _ = self._create_organization()
+
+        outbox.process_outbox()
+
+        organization.refresh_from_db()
+        self.assertEqual(organization.bucket_status, 'READY')
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_failed_attempt_is_retried_after_backoff(self, mock_create_bucket):
+        mock_create_bucket.side_effect = [EndpointConnectionError(endpoint_url='http://s3'), None]
+        organization, _ = self._create_organization()
+
+        self.assertEqual(outbox.process_outbox(), 1)
+        job = OutboxJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('PENDING', 1))
+        self.assertGreater(job.available_at, timezone.now())
+        self.assertIn('EndpointConnectionError', job.last_error)
+
+        # not due yet
+        self.assertEqual(outbox.process_outbox(), 0)
+
+        OutboxJob.objects.update(available_at=timezone.now())
+        self.assertEqual(outbox.process_outbox(), 1)
+        organization.refresh_from_db()
+        self.assertEqual(organization.bucket_status, 'READY')
+        self.assertEqual(OutboxJob.objects.get().attempts, 2)
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_job_gives_up_after_max_attempts(self, mock_create_bucket):
+        mock_create_bucket.side_effect = EndpointConnectionError(endpoint_url='http://s3')
+        organization, _ = self._create_organization()
+
+        for _ in range(3):
+            OutboxJob.objects.update(available_at=timezone.now())
+            outbox.process_outbox()
+
+        organization.refresh_from_db()
+        self.assertEqual(organization.bucket_status, 'FAILED')
+        self.assertEqual(OutboxJob.objects.get().status, 'FAILED')
+        self.assertEqual(outbox.process_outbox(), 0)
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_expired_lease_is_claimed_again(self, mock_create_bucket):
+        self._create_organization()
+        self.assertEqual(len(outbox.claim_jobs(10)), 1)
+        self.assertEqual(outbox.claim_jobs(10), [])
+
+        OutboxJob.objects.update(available_at=timezone.now())
+        self.assertEqual(len(outbox.claim_jobs(10)), 1)
+
+    def test_backoff_grows_and_is_capped(self):
+        with self.settings(OUTBOX={**settings.OUTBOX, 'BACKOFF_BASE': 2, 'BACKOFF_MAX': 60}):
+            self.assertLessEqual(outbox.backoff_delay(1), 2)
+            self.assertGreaterEqual(outbox.backoff_delay(4), 8)
+            self.assertLessEqual(outbox.backoff_delay(20), 60)
+            self.assertGreaterEqual(outbox.backoff_delay(20), 30)
+
+    def _run_job_failing_for(self, organization, error):
+        run_job = outbox.run_job
+
+        def fake_run_job(job):
+            if job.payload['organization_id'] == str(organization.id):
+                raise error
+            return run_job(job)
+        return fake_run_job
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_batch_runs_through_an_executor(self, mock_create_bucket):
+        organizations = [self._create_organization()[0] for _ in range(3)]
+        executor = FakeExecutor()
+
+        with patch('organizations_management.outbox.run_job', side_effect=self._run_job_failing_for(organizations[0], RuntimeError('worker crashed'))), \
+                self.assertLogs('organizations_management.outbox', 'ERROR'):
+            self.assertEqual(outbox.process_outbox(executor=executor), 3)
+
+        self.assertEqual(executor.submitted, 3)
+        statuses = dict(OutboxJob.objects.values_list('payload__organization_id', 'status'))
+        # the job the worker couldn't run stays leased until its lease runs out
+        self.assertEqual(statuses, {
+            str(organizations[0].id): 'RUNNING', str(organizations[1].id): 'DONE', str(organizations[2].id): 'DONE',
+        })
+
+    @patch('django.conf.settings.S3_CLIENT.create_bucket')
+    def test_broken_pool_is_raised_after_the_batch(self, mock_create_bucket):
+        organizations = [self._create_organization()[0] for _ in range(2)]
+
+        with patch('organizations_management.outbox.run_job', side_effect=self._run_job_failing_for(organizations[0], BrokenProcessPool())), \
+                self.assertLogs('organizations_management.outbox', 'ERROR'), \
+                self.assertRaises(BrokenProcessPool):
+            outbox.process_outbox(executor=FakeExecutor())
+
+        self.assertEqual(OutboxJob.objects.filter(status='DONE').count(), 1)
+
+    def test_command_replaces_a_broken_pool(self):
+        executors = []
+
+        def create_executor(command, workers):
+            executors.append(FakeExecutor())
+            return executors[-1]
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with patch('organizations_management.management.commands.process_outbox.Command.create_executor', create_executor), \
+                patch('organizations_management.management.commands.process_outbox.process_outbox', side_effect=BrokenProcessPool()):
+            call_command('process_outbox', '--once', '--workers', '2', stdout=stdout, stderr=stderr)
+
+        self.assertEqual(len(executors), 2)
+        self.assertIn('starting a new one', stderr.getvalue())
+        self.assertIn('Processed 0 outbox jobs', stdout.getvalue())
+
+    def test_unknown_task_fails_without_retrying(self):
+        job = OutboxJob.objects.create(task='removed_task', payload={})
+
+        self.assertEqual(outbox.process_outbox(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+        self.assertIn('removed_task', job.last_error)
+        self.assertEqual(outbox.process_outbox(), 0)
@@ -1,98 +1,284 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import decorators, permissions as rest_framework_permissions, response, viewsets
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import decorators, exceptions, generics, pagination, permissions as rest_framework_permissions, response, status, viewsets
 
 from organizations_management import models
 from organizations_management import permissions
+from organizations_management import signals
 from organizations_management.v1 import serializers
 
 
-class OrganizationViewSet(viewsets.ModelViewSet):
+class OrganizationPagination(pagination.PageNumberPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class ConditionalGetMixin:
+    """
+    Validators for list and retrieve, built from one aggregate over updated_at (Max and
+    Count, plus the caller and query string for a list, the id for a detail). A request
+    whose If-None-Match (or If-Modified-Since, details only) still matches gets a 304
+    without the rows being loaded or serialized.
+    """
+
+    def get_validators(self):
+        """(etag, last_modified), (None, None) when there is nothing to validate against."""
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self.action == 'list':
+            # lists are scoped to the caller and paginated
+            key = [self.action, self.request.user.pk, self.request.get_full_path()]
+        else:
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            try:
+                queryset = queryset.filter(**{self.lookup_field: lookup})
+            except (TypeError, ValueError, ValidationError):
+                return None, None
+            key = [self.action, lookup]
+
+        aggregate = queryset.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        if self.action != 'list' and not aggregate['count']:
+            return None, None
+        last_modified = aggregate['last_modified']
+        key += [aggregate['count'], last_modified.isoformat() if last_modified else '']
+        etag = 'W/' + quote_etag(hashlib.md5(':'.join(map(str, key)).encode()).hexdigest())
+        if self.action == 'list':
+            # the newest row of a list can be deleted, moving MAX(updated_at) back, only the etag sees that
+            return etag, None
+        return etag, last_modified
+
+    def conditional_get(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        validators = HttpResponse()
+        validators['ETag'] = etag
+        if last_modified is not None:
+            validators['Last-Modified'] = http_date(last_modified.timestamp())
+        # pollers revalidate every time instead of trusting a heuristic freshness
+        patch_cache_control(validators, private=True, no_cache=True)
+        timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+        conditional_response = get_conditional_response(request, etag=etag, last_modified=timestamp, response=validators)
+        if conditional_response is not validators:
+            return conditional_response
+
+        response = handler(request, *args, **kwargs)
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            if header in validators:
+                response[header] = validators[header]
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(super().retrieve, request, *args, **kwargs)
+
+
+class OrganizationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = models.Organization.objects.all()
-    # permission_classes = [permissions.OrganizationAdminPermission, permissions.OrganizationOwnerPermission]
+    pagination_class = OrganizationPagination
+    # max queries per request, see root_project.middlewares.QueryBudgetMiddleware
+    query_budgets = {
+        'list': 5,
+        'create': 6,
+        'retrieve': 4,
+        'update': 14,
+        'partial_update': 14,
+        'destroy': 8,
+        'add_member': 8,
+        'remove_member': 6,
+    }
 
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return super().get_queryset()
-        # return super().get_queryset().filter(owner=self.request.user.id)
-        return super().get_queryset()
-    
-    def get_permissions(self):
+        queryset = super().get_queryset()
         if self.action == 'list':
-            permission_classes = [rest_framework_permissions.AllowAny]
-        elif self.action == 'update':
-            permission_classes = [permissions.OrganizationAdminPermission]
-        if self.action in ('add_member', 'remove_member'):
-            permission_classes = [permissions.OrganizationAdminPermission]
-        elif self.action == 'delete':
-            permission_classes = [permissions.OrganizationOwnerPermission]
-        else:
-            permission_classes = [rest_framework_permissions.IsAuthenticated]
+            # counts instead of the admins/members id lists, one query whatever the page size
+            if not self.request.user.is_staff:
+                queryset = queryset.visible_to(self.request.user)
+            return queryset.with_member_counts().order_by('created_at', 'id')
+        return queryset
+
+    def get_permissions(self):
+        permission_classes = [rest_framework_permissions.IsAuthenticated]
+        if self.action in ('update', 'partial_update', 'add_member', 'remove_member'):
+            permission_classes.append(permissions.OrganizationAdminPermission)
+        elif self.action == 'destroy':
+            permission_classes.append(permissions.OrganizationOwnerPermission)
         return [permission() for permission in permission_classes]
-    
+
     def get_serializer_class(self):
         if self.action == 'create':
             return serializers.OrganizationCreateSerializer
         if self.action == 'update':
             return serializers.OrganizationUpdateSerializer
-        if self.action in ('add_member', 'remove_member'):
-            return serializers.OrganizationAddRemoveMemberSerializer
+        if self.action == 'add_member':
+            return serializers.OrganizationAddMembersSerializer
+        if self.action == 'remove_member':
+            return serializers.OrganizationBulkMembersSerializer
+        if self.action == 'list':
+            return serializers.OrganizationListSerializer
         return serializers.OrganizationSerializer
 
     def perform_create(self, serializer):
         # validated_data inside serializer.save is directly extended with **kwargs
         serializer.save(owner=self.request.user) 
 
-    @decorators.action(detail=True, methods=['PUT'], name='Add organization user')
+    @decorators.action(detail=True, methods=['PUT'], name='Add organization users')
     def add_member(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
         instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.validated_data['members'].extend(instance.members.all())
-        self.perform_update(serializer)
+        user_ids = serializer.validated_data['members']
 
-        if getattr(instance, '_prefetched_objects_cache', None):
-            # If 'prefetch_related' has been applied to a queryset, we need to
-            # forcibly invalidate the prefetch cache on the instance.
-            instance._prefetched_objects_cache = {}
+        membership = models.Organization.members.through
+        with transaction.atomic():
+            already_members = membership.objects.filter(organization_id=instance.id, user_id__in=user_ids).count()
+            membership.objects.bulk_create(
+                [membership(organization_id=instance.id, user_id=user_id) for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+            added = len(user_ids) - already_members
+            if added:
+                self._touch(instance)
+                signals.organization_members_changed.send(sender=self.__class__, organization=instance, user_ids=user_ids)
 
-        return response.Response(serializer.data)
+        return response.Response({'added': added, 'already_members': already_members})
 
-    @decorators.action(detail=True, methods=['PUT'], name='Remove organization user')
+    @decorators.action(detail=True, methods=['PUT'], name='Remove organization users')
     def remove_member(self, request, *args, **kwargs):
-        partial = kwargs.pop('partial', False)
         instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.validated_data['members'] = [member for member in instance.members.all() if member not in serializer.validated_data['members']]
-        self.perform_update(serializer)
+        user_ids = serializer.validated_data['members']
+
+        with transaction.atomic():
+            removed, _ = models.Organization.members.through.objects.filter(
+                organization_id=instance.id, user_id__in=user_ids
+            ).delete()
+            if removed:
+                self._touch(instance)
+                signals.organization_members_changed.send(sender=self.__class__, organization=instance, user_ids=user_ids)
+
+        return response.Response({'removed': removed, 'not_members': len(user_ids) - removed})
+
+    @staticmethod
+    def _touch(instance):
+        # membership rows are written straight to the through table, keep updated_at honest
+        instance.updated_at = timezone.now()
+        models.Organization.objects.filter(id=instance.id).update(updated_at=instance.updated_at)
+
 
-        if getattr(instance, '_prefetched_objects_cache', None):
-            # If 'prefetch_related' has been applied to a queryset, we need to
-            # forcibly invalidate the prefetch cache on the instance.
-            instance._prefetched_objects_cache = {}
+class OrganizationNestedViewMixin:
+    """
+    For routes nested under organizations/<organization_id>/. The permission authorizes the
+    parent from the cached role map, get_organization loads its row at most once per request
+    and keeps it on the request.
+    """
 
-        return response.Response(serializer.data)
+    @property
+    def organization_id(self):
+        return self.kwargs['organization_id']
 
+    def get_organization(self):
+        if getattr(self.request, 'organization', None) is None:
+            self.request.organization = generics.get_object_or_404(models.Organization, id=self.organization_id)
+        return self.request.organization
 
-class ProjectViewSet(viewsets.ModelViewSet):
+
+class ProjectViewSet(OrganizationNestedViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = models.Project.objects.all()
-    permission_classes = [rest_framework_permissions.IsAuthenticatedOrReadOnly]
+    permission_classes = [permissions.ProjectPermission]
+    # max queries per request, see root_project.middlewares.QueryBudgetMiddleware
+    query_budgets = {
+        'list': 5,
+        'create': 4,
+        'retrieve': 4,
+        'update': 4,
+        'partial_update': 4,
+        'destroy': 4,
+        # SQLite splits bulk statements in batches of 999 parameters
+        'bulk_create': 10,
+        'bulk_partial_update': 10,
+    }
+    # max projects per bulk request
+    bulk_max_size = 1000
 
     def get_queryset(self):
-        organization_id = self.request.parser_context['kwargs']['organization_id']
-        if self.action == 'create':
-            organization = get_object_or_404(models.Organization.objects.get(id=organization_id, owner=self.request.user.id))
-            return super().get_queryset().filter(organization=organization.id)
-        return super().get_queryset().filter(organization=organization_id)
+        return super().get_queryset().filter(organization_id=self.organization_id).select_related('organization')
     
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action in ('create', 'bulk_create'):
             return serializers.ProjectCreateSerializer
         elif self.action == 'update':
             return serializers.ProjectUpdateSerializer
+        elif self.action == 'bulk_partial_update':
+            return serializers.ProjectBulkUpdateSerializer
         return serializers.ProjectSerializer
     
     def perform_create(self, serializer):
-        organization = models.Organization.objects.get(id=self.request.parser_context['kwargs']['organization_id'])
-        serializer.save(organization=organization)
+        # ProjectPermission already found the caller's role in this organization, so this is
+        # one read and the insert
+        serializer.save(organization=self.get_organization())
+
+    @decorators.action(detail=False, methods=['POST'], url_path='bulk', name='Bulk create projects')
+    def bulk_create(self, request, *args, **kwargs):
+        """
+        Create a list of projects in one transaction and one INSERT. The whole list is
+        validated first, errors come back per item in the order of the request.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=self.bulk_max_size)
+        serializer.is_valid(raise_exception=True)
+        organization = self.get_organization()
+        with transaction.atomic():
+            projects = models.Project.objects.bulk_create([
+                models.Project(organization=organization, **item) for item in serializer.validated_data
+            ])
+        return response.Response(serializers.ProjectSerializer(projects, many=True).data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_partial_update(self, request, *args, **kwargs):
+        """
+        Partially update a list of projects ({'id': ..., <fields>}) with one read and
+        one UPDATE. Nothing is written unless every item is valid.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=self.bulk_max_size)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+
+        with transaction.atomic():
+            projects = self.get_queryset().select_for_update(of=('self',)).in_bulk([item['id'] for item in items])
+            errors, seen = [], set()
+            for item in items:
+                if item['id'] in seen:
+                    errors.append({'id': ['Repeated project.']})
+                elif item['id'] not in projects:
+                    errors.append({'id': ['Project not found in this organization.']})
+                else:
+                    errors.append({})
+                seen.add(item['id'])
+            if any(errors):
+                raise exceptions.ValidationError(errors)
+
+            now = timezone.now()
+            fields = {'updated_at'}
+            for item in items:
+                project = projects[item['id']]
+                for field, value in item.items():
+                    if field != 'id':
+                        setattr(project, field, value)
+                        fields.add(field)
+                # bulk_update doesn't apply auto_now
+                project.updated_at = now
+            updated = [projects[item['id']] for item in items]
+            models.Project.objects.bulk_update(updated, sorted(fields))
+        return response.Response(serializers.ProjectSerializer(updated, many=True).data)
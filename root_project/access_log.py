@@ -0,0 +1,64 @@
+import atexit
+import json
+import logging
+import queue
+
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.module_loading import import_string
+
+
+class DrainingQueueListener(QueueListener):
+    """
+    QueueListener whose stop waits for room in a full queue and can be called twice
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler that owns its QueueListener. Request threads only enqueue the
+    record, formatting and I/O happen on the listener thread through `handler_class`.
+    When the bounded queue is full, records are dropped and counted instead of
+    blocking the request.
+    """
+
+    def __init__(self, handler_class='logging.StreamHandler', queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = import_string(handler_class)()
+        self.dropped = 0
+        self.listener = DrainingQueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def setFormatter(self, fmt):
+        # formatting is deferred to the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # records stay in process, so no need to pre-format or strip them for pickling
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessLogFormatter(logging.Formatter):
+    """
+    Renders the `access` record attached by AccessLogMiddleware as one JSON line.
+    """
+
+    def format(self, record):
+        access = getattr(record, 'access', None)
+        if access is None:
+            return super().format(record)
+        return json.dumps({'time': self.formatTime(record), 'level': record.levelname, **access}, default=str)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'root_project.settings')
+# login/refresh hash passwords on a bounded pool instead of blocking the event loop
+os.environ.setdefault('ASYNC_AUTH_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from collections import deque
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Small thread safe connection pool. Borrowers block up to `timeout` seconds
+    when `max_size` connections are already checked out instead of failing
+    straight away, and idle connections are health checked before being handed
+    out again once they have been idle for longer than `check_interval`.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=30, check_interval=30, check=None):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.check = check or self.check_connection
+        self.closed = False
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def open(self):
+        # warm up min_size connections so the first requests don't pay for them
+        connections = []
+        try:
+            for _ in range(self.min_size - self.idle_count):
+                connections.append(self.getconn())
+        finally:
+            for connection in connections:
+                self.putconn(connection)
+
+    @staticmethod
+    def check_connection(connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def getconn(self):
+        if self.closed:
+            raise PoolTimeout('connection pool is closed')
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f'could not get a connection within {self.timeout} seconds')
+        try:
+            return self._take_idle() or self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _take_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, returned_at = self._idle.pop()
+            if connection.closed:
+                continue
+            if time.monotonic() - returned_at > self.check_interval:
+                try:
+                    self.check(connection)
+                except Exception:
+                    self._discard(connection)
+                    continue
+            return connection
+
+    def putconn(self, connection, close=False):
+        try:
+            if close or self.closed or connection.closed:
+                self._discard(connection)
+                return
+            try:
+                # leave the connection the way a fresh one would be
+                if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                self._discard(connection)
+                return
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        self.closed = True
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    @property
+    def idle_count(self):
+        return len(self._idle)
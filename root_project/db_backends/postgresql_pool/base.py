@@ -0,0 +1,84 @@
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from root_project.db_backends.pool import ConnectionPool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that borrows psycopg2 connections from a process local
+    pool instead of opening a new one per request. Closing the Django connection
+    (end of request with CONN_MAX_AGE = 0) hands it back to the pool.
+    Pool settings live in OPTIONS['connection_pool'].
+    """
+
+    _process_pools = {}
+    _process_pools_lock = threading.Lock()
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('connection_pool', None)
+        return conn_params
+
+    def _pool_key(self):
+        # NAME is part of the key because the test runner swaps it for the test database
+        return os.getpid(), self.alias, self.settings_dict['NAME']
+
+    @property
+    def connection_pool(self):
+        key = self._pool_key()
+        pool = self._process_pools.get(key)
+        if pool is None:
+            with self._process_pools_lock:
+                pool = self._process_pools.get(key)
+                if pool is None:
+                    pool_options = dict(self.settings_dict['OPTIONS'].get('connection_pool') or {})
+                    conn_params = self.get_connection_params()
+                    if not self.settings_dict['CONN_HEALTH_CHECKS']:
+                        pool_options.setdefault('check', lambda connection: None)
+                    pool = ConnectionPool(lambda: self.Database.connect(**conn_params), **pool_options)
+                    pool.open()
+                    self._process_pools[key] = pool
+        return pool
+
+    def close_pool(self):
+        super().close_pool()
+        pool = self._process_pools.pop(self._pool_key(), None)
+        if pool is not None:
+            pool.close()
+
+    def get_new_connection(self, conn_params):
+        # mirrors the psycopg2 branch of the stock backend, only the connect call changes
+        options = self.settings_dict['OPTIONS']
+        set_isolation_level = False
+        try:
+            isolation_level_value = options['isolation_level']
+        except KeyError:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            try:
+                self.isolation_level = IsolationLevel(isolation_level_value)
+                set_isolation_level = True
+            except ValueError:
+                raise ImproperlyConfigured(
+                    f'Invalid transaction isolation level {isolation_level_value} specified.'
+                )
+        connection = self.connection_pool.getconn()
+        if set_isolation_level:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # the pool rolls back anything left open and drops broken connections
+                self.connection_pool.putconn(self.connection)
+                self.connection = None
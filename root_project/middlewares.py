@@ -1,23 +1,150 @@
 import logging
+import random
+import time
 
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.functional import empty
 
+from root_project.query_budget import QueryBudgetExceeded, describe, get_query_budget, record_queries
+
+
+class AccessLogMiddleware:
+    """
+    Emits one structured access record per sampled request to the `access` logger,
+    which is meant to be routed through root_project.access_log.QueueListenerHandler.
+
+    Routes are sampled by URL name with ACCESS_LOG['ROUTE_SAMPLE_RATES'], falling back to
+    ACCESS_LOG['SAMPLE_RATE']; server errors are always logged. Request bodies are only
+    read when ACCESS_LOG['LOG_BODY'] is enabled, and only when they fit in MAX_BODY_SIZE.
+    """
+    sync_capable = True
+    async_capable = True
 
-class RequestLoggingMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        self.logger = logging.getLogger('my_debugger')
+        self.logger = logging.getLogger('access')
+        self.sample_rate = settings.ACCESS_LOG['SAMPLE_RATE']
+        self.route_sample_rates = settings.ACCESS_LOG['ROUTE_SAMPLE_RATES']
+        self.log_body = settings.ACCESS_LOG['LOG_BODY']
+        self.max_body_size = settings.ACCESS_LOG['MAX_BODY_SIZE']
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Log request details
-        # TODO: Note that user here always comes as Annonymous. We must see DRF  
-        # DEFAULT_AUTHENTICATION_CLASSES to understand when user is appended to the request 
-        self.logger.info(f"Request: {request.user} {request.method} {request.path}")
-        if request.body:
-            self.logger.debug(f"Request Body: {request.body.decode('utf-8')}")
-
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started_at = time.perf_counter()
+        sampled, body = self.capture_body(request)
         response = self.get_response(request)
+        self.log(request, response, started_at, sampled, body)
+        return response
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+        sampled, body = self.capture_body(request)
+        response = await self.get_response(request)
+        self.log(request, response, started_at, sampled, body)
+        return response
+
+    def get_sample_rate(self, route):
+        return self.route_sample_rates.get(route, self.sample_rate)
+
+    def is_sampled(self, route):
+        sample_rate = self.get_sample_rate(route)
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def capture_body(self, request):
+        """
+        Returns (sampled, body). Without body logging nothing is read and the sampling
+        decision is left to the end of the request, when the route is already resolved.
+        """
+        if not self.log_body:
+            return None, None
+        # the body has to be read before the view consumes the stream, so the route is resolved here
+        try:
+            route = resolve(request.path_info).view_name
+        except Resolver404:
+            route = None
+        if not self.is_sampled(route):
+            return False, None
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return True, None
+        if content_length == 0:
+            return True, None
+        if content_length > self.max_body_size:
+            return True, f'<{content_length} bytes not captured>'
+        return True, request.body.decode('utf-8', errors='replace')
+
+    def log(self, request, response, started_at, sampled, body):
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.view_name if resolver_match else None
+        if sampled is None:
+            sampled = self.is_sampled(route)
+        if response.status_code < 500 and not sampled:
+            return
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        access = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started_at) * 1000, 3),
+            'user_id': self.get_user_id(request),
+            'sample_rate': self.get_sample_rate(route),
+        }
+        if body is not None:
+            access['body'] = body
+        self.logger.info('access', extra={'access': access})
+
+    @staticmethod
+    def get_user_id(request):
+        # DRF sets the authenticated user on the request; never evaluate the lazy session user here
+        user = request.__dict__.get('user')
+        if user is None or getattr(user, '_wrapped', None) is empty:
+            return None
+        return getattr(user, 'pk', None)
+
+
+class QueryBudgetMiddleware:
+    """
+    Development/test instrumentation, disabled unless QUERY_BUDGET['ENABLED']. Records the
+    queries of each request through connection.execute_wrapper, reports the count in the
+    X-Query-Count header and logs to the `query_budget` logger when the view goes over the
+    budget it declares in `query_budgets` or repeats one query shape N_PLUS_ONE_THRESHOLD
+    times. With QUERY_BUDGET['RAISE'] going over the budget raises QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.logger = logging.getLogger('query_budget')
+        self.threshold = settings.QUERY_BUDGET['N_PLUS_ONE_THRESHOLD']
+        self.raise_exceeded = settings.QUERY_BUDGET['RAISE']
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(recorder.count)
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return response
+        action, budget = get_query_budget(resolver_match.func, request.method)
+        route = f'{resolver_match.view_name} ({action})'
 
-        # Log response details
-        self.logger.info(f"Response: {request.user} {response.status_code}")        
+        if recorder.repeated(self.threshold):
+            self.logger.warning('Repeated queries in %s, possible N+1: %s', route, describe(recorder, self.threshold))
+        if budget is not None and recorder.count > budget:
+            message = f'{route} ran over its budget of {budget} queries: {describe(recorder, self.threshold)}'
+            if self.raise_exceeded:
+                raise QueryBudgetExceeded(message)
+            self.logger.warning(message)
         return response
@@ -0,0 +1,85 @@
+import re
+import time
+
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_REPEATED_LIST = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    The shape of a query: comments (the OpenTelemetry sql commenter) dropped, literals
+    and placeholders replaced by ?, IN lists and multi-row VALUES collapsed to (...).
+    """
+    sql = _COMMENT.sub('', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    sql = _REPEATED_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper counting the queries run, grouped by normalized sql.
+    A shape run `threshold` times or more in one request is most likely an N+1.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        return {shape: count for shape, count in self.shapes.most_common() if count >= threshold}
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record the queries of every database (or only `using`) while the block runs."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in [using] if using else connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_query_budget(view_func, method):
+    """
+    (action, budget) for a resolved view. Views declare `query_budgets`, a dict from
+    the DRF action (or the lowercase http method for plain views) to the maximum
+    number of queries a request may run, budget is None when nothing is declared.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    method = method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+    return action, (getattr(view_class, 'query_budgets', None) or {}).get(action)
+
+
+def describe(recorder, threshold):
+    lines = [f'{recorder.count} queries in {recorder.duration * 1000:.1f} ms']
+    lines += [f'  {count}x {shape}' for shape, count in recorder.repeated(threshold).items()]
+    return '\n'.join(lines)
@@ -16,6 +16,8 @@ from pathlib import Path
 
 import boto3
 
+from botocore.config import Config
+
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -85,7 +87,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'root_project.middlewares.RequestLoggingMiddleware'
+    'root_project.middlewares.AccessLogMiddleware',
+    'root_project.middlewares.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'root_project.urls'
@@ -111,12 +114,65 @@ WSGI_APPLICATION = 'root_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_PROFILE picks one of:
+#   sqlite      plain local file database (default)
+#   sqlite-wal  single node sqlite tuned with WAL, mmap and immediate write transactions
+#   postgresql  persistent connections with health checks, DB_POOL=True swaps them for a
+#               process local connection pool that connections go back to after each request
+DATABASE_PROFILE = config('DATABASE_PROFILE', 'sqlite')
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', 'django_tests'),
+            'USER': config('DB_USER', 'postgres'),
+            'PASSWORD': config('DB_PASSWORD', ''),
+            'HOST': config('DB_HOST', 'localhost'),
+            'PORT': config('DB_PORT', '5432'),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', 600, cast=int),
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', True, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', 5, cast=int),
+            },
+        }
+    }
+    if config('DB_POOL', False, cast=bool):
+        DATABASES['default']['ENGINE'] = 'root_project.db_backends.postgresql_pool'
+        # connections are handed back to the pool when django closes them at the end of the request
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['connection_pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', 2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', 10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', 30, cast=float),
+            'check_interval': config('DB_POOL_CHECK_INTERVAL', 30, cast=float),
+        }
+elif DATABASE_PROFILE == 'sqlite-wal':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', 600, cast=int),
+            'OPTIONS': {
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', 268435456, cast=int)};"
+                    'PRAGMA temp_store=MEMORY;'
+                    f"PRAGMA cache_size={config('SQLITE_CACHE_SIZE', -20000, cast=int)};"
+                ),
+                'timeout': config('SQLITE_BUSY_TIMEOUT', 5, cast=int),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
 
 
 # Password validation
@@ -165,9 +221,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
+    # reads both the Authorization header and the access_token cookie
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'users.authentication.cookie_jwt_authentication.CookieJWTAuthentication'
+        'users.authentication.cookie_jwt_authentication.CookieJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -180,6 +236,97 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.v1_serializers.TokenObtainPairWithClaimsSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.v1_serializers.TokenRefreshWithClaimsSerializer',
+}
+
+# Build request.user from the signed token claims (id, username, is_staff, is_active) and
+# only load the user row when another attribute is read. Claims can lag behind the
+# database by up to ACCESS_TOKEN_LIFETIME.
+JWT_STATELESS_USER = config('JWT_STATELESS_USER', False, cast=bool)
+
+# Users resolved from access tokens, keyed by (user_id, jti). TTL bounds how long other
+# processes may serve a user after an update when a shared CACHE_ALIAS is configured.
+JWT_USER_CACHE = {
+    'MAX_SIZE': config('JWT_USER_CACHE_MAX_SIZE', 10000, cast=int),
+    'TTL': config('JWT_USER_CACHE_TTL', 60, cast=int),
+    'CACHE_ALIAS': config('JWT_USER_CACHE_ALIAS', None),
+}
+
+# user -> {organization_id: role} maps used for organization and project authorization.
+# TIMEOUT 0 disables the cache and every request builds the map again. Invalidation only reaches
+# other processes through a shared cache backend, with a process local one (LocMemCache, the default
+# when CACHES is not configured) maps are kept for LOCAL_TIMEOUT seconds at most.
+ORGANIZATION_ROLE_CACHE = {
+    'CACHE_ALIAS': config('ORGANIZATION_ROLE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': config('ORGANIZATION_ROLE_CACHE_TIMEOUT', 300, cast=int),
+    'LOCAL_TIMEOUT': config('ORGANIZATION_ROLE_CACHE_LOCAL_TIMEOUT', 5, cast=int),
+}
+
+# Background jobs written to organizations_management.OutboxJob, run by manage.py process_outbox.
+# Failed attempts are retried after half to all of BACKOFF_BASE * 2 ** (attempt - 1) seconds (capped at BACKOFF_MAX),
+# a job is leased to a worker for LEASE_SECONDS.
+OUTBOX = {
+    'BATCH_SIZE': config('OUTBOX_BATCH_SIZE', 50, cast=int),
+    'MAX_ATTEMPTS': config('OUTBOX_MAX_ATTEMPTS', 8, cast=int),
+    'BACKOFF_BASE': config('OUTBOX_BACKOFF_BASE', 2, cast=float),
+    'BACKOFF_MAX': config('OUTBOX_BACKOFF_MAX', 300, cast=float),
+    'LEASE_SECONDS': config('OUTBOX_LEASE_SECONDS', 60, cast=int),
+    'POLL_INTERVAL': config('OUTBOX_POLL_INTERVAL', 1, cast=float),
+    'WORKERS': config('OUTBOX_WORKERS', 0, cast=int),
+}
+
+# Upload verification, see files.uploads. Each batch HEADs up to BATCH_SIZE pending or confirmed files
+# with CONCURRENCY threads (botocore keeps 10 connections per client by default), a file is checked
+# at most every RECHECK_INTERVAL seconds and orphaned when its object is still missing PENDING_TTL
+# seconds after the file was created.
+UPLOAD_RECONCILER = {
+    'BATCH_SIZE': config('UPLOAD_RECONCILER_BATCH_SIZE', 100, cast=int),
+    'CONCURRENCY': config('UPLOAD_RECONCILER_CONCURRENCY', 10, cast=int),
+    'RECHECK_INTERVAL': config('UPLOAD_RECONCILER_RECHECK_INTERVAL', 60, cast=int),
+    'PENDING_TTL': config('UPLOAD_RECONCILER_PENDING_TTL', 3600, cast=int),
+    'POLL_INTERVAL': config('UPLOAD_RECONCILER_POLL_INTERVAL', 5, cast=float),
+}
+
+# Text extraction of uploaded data sources (pdf, txt, md), run as outbox jobs. Objects are streamed
+# READ_CHUNK_SIZE bytes at a time and the text is stored in CHUNK_SIZE characters chunks overlapping
+# by CHUNK_OVERLAP, BATCH_SIZE chunks per insert.
+INGESTION = {
+    'READ_CHUNK_SIZE': config('INGESTION_READ_CHUNK_SIZE', 64 * 1024, cast=int),
+    'CHUNK_SIZE': config('INGESTION_CHUNK_SIZE', 1000, cast=int),
+    'CHUNK_OVERLAP': config('INGESTION_CHUNK_OVERLAP', 200, cast=int),
+    'BATCH_SIZE': config('INGESTION_BATCH_SIZE', 500, cast=int),
+    'PDF_SPOOL_MAX_MEMORY': config('INGESTION_PDF_SPOOL_MAX_MEMORY', 8 * 1024 * 1024, cast=int),
+}
+
+# Presigned download urls. LIST_EXPIRATION applies to urls embedded in file listings
+# (?download_urls=true). Signed urls are kept in a per-process LRU of CACHE_MAX_SIZE entries and reused
+# for at most CACHE_MAX_AGE_RATIO of their lifetime, CACHE_MAX_SIZE 0 disables it.
+PRESIGNED_URLS = {
+    'LIST_EXPIRATION': config('PRESIGNED_URLS_LIST_EXPIRATION', 900, cast=int),
+    'CACHE_MAX_SIZE': config('PRESIGNED_URLS_CACHE_MAX_SIZE', 10000, cast=int),
+    'CACHE_MAX_AGE_RATIO': config('PRESIGNED_URLS_CACHE_MAX_AGE_RATIO', 0.5, cast=float),
+}
+
+# Async login/refresh views, enabled by default when served through root_project.asgi
+ASYNC_AUTH_VIEWS = config('ASYNC_AUTH_VIEWS', False, cast=bool)
+
+# Bounded pool the async login view hashes passwords on. Requests beyond
+# MAX_WORKERS + MAX_QUEUE in flight are rejected with 503.
+PASSWORD_HASHING_POOL = {
+    'MAX_WORKERS': config('PASSWORD_HASHING_MAX_WORKERS', 4, cast=int),
+    'MAX_QUEUE': config('PASSWORD_HASHING_MAX_QUEUE', 64, cast=int),
+}
+
+# Where rotated and logged out refresh token jtis are kept until the token expires.
+# LocalRevocationStore only works for a single process, use CacheRevocationStore with a
+# Redis cache alias to share revocations. The bloom filter can only front the local store.
+REFRESH_TOKEN_REVOCATION = {
+    'STORE': config('REFRESH_TOKEN_REVOCATION_STORE', 'users.authentication.revocation.LocalRevocationStore'),
+    'CACHE_ALIAS': config('REFRESH_TOKEN_REVOCATION_CACHE_ALIAS', 'default'),
+    'BLOOM_FILTER': config('REFRESH_TOKEN_REVOCATION_BLOOM_FILTER', False, cast=bool),
+    'BLOOM_FILTER_CAPACITY': config('REFRESH_TOKEN_REVOCATION_BLOOM_FILTER_CAPACITY', 100000, cast=int),
+    'BLOOM_FILTER_ERROR_RATE': config('REFRESH_TOKEN_REVOCATION_BLOOM_FILTER_ERROR_RATE', 0.001, cast=float),
 }
 
 
@@ -199,13 +346,23 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {funcName} {lineno} {message}',
             'style': '{',
         },
+        'access': {
+            '()': 'root_project.access_log.AccessLogFormatter',
+        },
     },
     'handlers': {
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
             'formatter': 'verbose'
-        }
+        },
+        'access_queue': {
+            # request threads only enqueue, a listener thread formats and writes
+            '()': 'root_project.access_log.QueueListenerHandler',
+            'handler_class': 'logging.StreamHandler',
+            'queue_size': 10000,
+            'formatter': 'access',
+        },
     },
     'loggers': {
         'django.db.backends': {
@@ -213,6 +370,16 @@ LOGGING = {
             'level': 'DEBUG',
             'handlers': ['console'],
         },
+        'access': {
+            'level': 'INFO',
+            'handlers': ['access_queue'],
+            'propagate': False,
+        },
+        'query_budget': {
+            'level': 'WARNING',
+            'handlers': ['console'],
+            'propagate': False,
+        },
         'my_debugger': {
             # https://docs.python.org/3/howto/logging-cookbook.html#logging-cookbook
             'level': 'DEBUG',
@@ -221,18 +388,39 @@ LOGGING = {
     }
 }
 
+# Access log emitted by root_project.middlewares.AccessLogMiddleware.
+# ROUTE_SAMPLE_RATES maps URL names (e.g. 'users-list') to a sample rate in [0, 1].
+# Request bodies are never read unless LOG_BODY is enabled.
+ACCESS_LOG = {
+    'SAMPLE_RATE': config('ACCESS_LOG_SAMPLE_RATE', 1.0, cast=float),
+    'ROUTE_SAMPLE_RATES': {},
+    'LOG_BODY': config('ACCESS_LOG_BODY', False, cast=bool),
+    'MAX_BODY_SIZE': config('ACCESS_LOG_MAX_BODY_SIZE', 2048, cast=int),
+}
 
 
+# Query counting of root_project.middlewares.QueryBudgetMiddleware, meant for development and tests,
+# enabled by default only when ENVIRONMENT is local.
+# Views declare `query_budgets` ({action: max queries}); a query shape repeated N_PLUS_ONE_THRESHOLD
+# times in one request is reported as a possible N+1. RAISE turns budget overruns into errors.
+QUERY_BUDGET = {
+    'ENABLED': config('QUERY_BUDGET_ENABLED', ENVIRONMENT == 'local', cast=bool),
+    'N_PLUS_ONE_THRESHOLD': config('QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 5, cast=int),
+    'RAISE': config('QUERY_BUDGET_RAISE', False, cast=bool),
+}
 
 
 ### AWS ###
 AWS_REGION = config('AWS_REGION', 'us-east-1')
+# presigned urls are SigV4, organizations_management.presigner signs them without botocore
+S3_CLIENT_CONFIG = Config(signature_version='s3v4')
 if ENVIRONMENT == 'local':
     S3_CLIENT = boto3.client(
         's3',
         endpoint_url=config('S3_LOCAL_BUCKET_HOST'),
         aws_access_key_id=config('S3_LOCAL_KEYID'),
         aws_secret_access_key=config('S3_LOCAL_KEYSECRET'),
+        config=S3_CLIENT_CONFIG,
     )
 else:
-    S3_CLIENT = boto3.client('s3')
\ No newline at end of file
+    S3_CLIENT = boto3.client('s3', config=S3_CLIENT_CONFIG)
\ No newline at end of file
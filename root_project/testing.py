@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from root_project.query_budget import describe, record_queries
+
+
+def captured_sql(context):
+    """
+    The sql of the queries a CaptureQueriesContext saw. The OpenTelemetry sql commenter
+    also appends the raw commented sql strings to queries_log, those are left out.
+    """
+    return [query['sql'] for query in context.captured_queries if isinstance(query, dict)]
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin to hold requests to the `query_budgets` their views declare:
+
+        with self.assertQueryBudget(OrganizationViewSet, 'list'):
+            self.client.get(reverse('organizations-list'))
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, view_class, action, allow_repeated=False):
+        budget = view_class.query_budgets[action]
+        threshold = settings.QUERY_BUDGET['N_PLUS_ONE_THRESHOLD']
+        with record_queries() as recorder:
+            yield recorder
+        if recorder.count > budget:
+            self.fail(f'{view_class.__name__}.{action} ran over its budget of {budget} queries: {describe(recorder, threshold)}')
+        if not allow_repeated and recorder.repeated(threshold):
+            self.fail(f'{view_class.__name__}.{action} repeats queries, possible N+1: {describe(recorder, threshold)}')
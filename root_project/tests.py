@@ -0,0 +1,267 @@
+import json
+import logging
+import threading
+
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from organizations_management.v1.views import OrganizationViewSet
+from root_project.access_log import AccessLogFormatter, QueueListenerHandler
+from root_project.db_backends.pool import ConnectionPool, PoolTimeout
+from root_project.middlewares import AccessLogMiddleware
+from root_project.query_budget import QueryBudgetExceeded, get_query_budget, normalize_sql, record_queries
+from root_project.testing import QueryBudgetTestMixin
+from users.models import User
+from users.views.v1_views import UserViewset
+
+
+ACCESS_LOG = {
+    'SAMPLE_RATE': 1.0,
+    'ROUTE_SAMPLE_RATES': {},
+    'LOG_BODY': False,
+    'MAX_BODY_SIZE': 16,
+}
+
+
+class AccessLogMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _middleware(self, status=200):
+        return AccessLogMiddleware(lambda request: HttpResponse(status=status))
+
+    def test_request_is_logged_as_structured_record(self):
+        with self.assertLogs('access', level='INFO') as logs:
+            response = self.client.get(reverse('users-list'))
+
+        self.assertEqual(response.status_code, 200)
+        access = logs.records[0].access
+        self.assertEqual(access['method'], 'GET')
+        self.assertEqual(access['route'], 'users-list')
+        self.assertEqual(access['status'], 200)
+        self.assertIsNone(access['user_id'])
+        self.assertNotIn('body', access)
+
+    @override_settings(ACCESS_LOG=ACCESS_LOG)
+    def test_body_is_not_read_when_body_logging_is_disabled(self):
+        request = self.factory.post('/', {'password': 'secret'}, content_type='application/json')
+
+        with self.assertLogs('access', level='INFO'):
+            self._middleware()(request)
+
+        self.assertFalse(hasattr(request, '_body'))
+
+    @override_settings(ACCESS_LOG={**ACCESS_LOG, 'LOG_BODY': True})
+    def test_small_body_is_captured(self):
+        request = self.factory.post('/', {'a': 1}, content_type='application/json')
+
+        with self.assertLogs('access', level='INFO') as logs:
+            self._middleware()(request)
+
+        self.assertEqual(logs.records[0].access['body'], '{"a": 1}')
+
+    @override_settings(ACCESS_LOG={**ACCESS_LOG, 'LOG_BODY': True})
+    def test_large_body_is_not_captured(self):
+        request = self.factory.post('/', {'data': 'x' * 100}, content_type='application/json')
+
+        with self.assertLogs('access', level='INFO') as logs:
+            self._middleware()(request)
+
+        self.assertFalse(hasattr(request, '_body'))
+        self.assertEqual(logs.records[0].access['body'], '<112 bytes not captured>')
+
+    @override_settings(ACCESS_LOG={**ACCESS_LOG, 'ROUTE_SAMPLE_RATES': {'users-list': 0}})
+    def test_route_sample_rate(self):
+        logger = logging.getLogger('access')
+        with self.assertLogs('access', level='INFO') as logs:
+            self.client.get(reverse('users-list'))
+            # assertLogs fails on an empty capture
+            logger.info('marker')
+
+        self.assertEqual([record.getMessage() for record in logs.records], ['marker'])
+
+    @override_settings(ACCESS_LOG={**ACCESS_LOG, 'SAMPLE_RATE': 0})
+    def test_server_errors_are_always_logged(self):
+        with self.assertLogs('access', level='INFO') as logs:
+            self._middleware(status=500)(self.factory.get('/'))
+
+        self.assertEqual(logs.records[0].access['status'], 500)
+
+
+class AccessLogPipelineTestCase(TestCase):
+
+    def _record(self):
+        record = logging.LogRecord('access', logging.INFO, __file__, 1, 'access', None, None)
+        record.access = {'method': 'GET', 'status': 200}
+        return record
+
+    def test_formatter_renders_json(self):
+        line = json.loads(AccessLogFormatter().format(self._record()))
+
+        self.assertEqual(line['method'], 'GET')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['level'], 'INFO')
+
+    def test_full_queue_drops_records(self):
+        handler = QueueListenerHandler(handler_class='logging.NullHandler', queue_size=1)
+        handler.listener.stop()
+
+        handler.handle(self._record())
+        handler.handle(self._record())
+
+        self.assertEqual(handler.dropped, 1)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.rolled_back = False
+        self.info = type('Info', (), {'transaction_status': 0})()
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = 0
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.opened = []
+
+    def _connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+    def test_returned_connection_is_reused(self):
+        pool = ConnectionPool(self._connect, max_size=2)
+        connection = pool.getconn()
+        pool.putconn(connection)
+
+        self.assertIs(pool.getconn(), connection)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        pool = ConnectionPool(self._connect, max_size=1)
+        connection = pool.getconn()
+        connection.info.transaction_status = 2
+        pool.putconn(connection)
+
+        self.assertTrue(connection.rolled_back)
+
+    def test_closed_connection_is_replaced(self):
+        pool = ConnectionPool(self._connect, max_size=1)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        connection.closed = True
+
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertEqual(len(self.opened), 2)
+
+    def test_idle_connection_failing_health_check_is_replaced(self):
+        def check(connection):
+            raise Exception('server closed the connection')
+
+        pool = ConnectionPool(self._connect, max_size=1, check_interval=0, check=check)
+        connection = pool.getconn()
+        pool.putconn(connection)
+
+        self.assertIsNot(pool.getconn(), connection)
+        self.assertTrue(connection.closed)
+
+    def test_borrower_waits_for_a_free_connection(self):
+        pool = ConnectionPool(self._connect, max_size=1, timeout=5)
+        connection = pool.getconn()
+        threading.Timer(0.05, pool.putconn, [connection]).start()
+
+        self.assertIs(pool.getconn(), connection)
+
+    def test_borrower_times_out_when_pool_is_exhausted(self):
+        pool = ConnectionPool(self._connect, max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+    def test_open_warms_up_min_size_connections(self):
+        pool = ConnectionPool(self._connect, min_size=2, max_size=4)
+        pool.open()
+
+        self.assertEqual(pool.idle_count, 2)
+
+
+QUERY_BUDGET = {
+    'ENABLED': True,
+    'N_PLUS_ONE_THRESHOLD': 3,
+    'RAISE': False,
+}
+
+
+class QueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t0 WHERE id IN (%s, %s, %s) AND name = 'a''b' LIMIT 21 /*controller='x'*/"),
+            'SELECT * FROM t0 WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(
+            normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s)'),
+        )
+
+    def test_recorder_groups_repeated_shapes(self):
+        users = User.objects.bulk_create([User(username=f'user{index}') for index in range(4)])
+        with record_queries() as recorder:
+            for user in users:
+                User.objects.get(id=user.id)
+            User.objects.count()
+
+        self.assertEqual(recorder.count, 5)
+        self.assertEqual(list(recorder.repeated(3).values()), [4])
+
+    def test_viewset_action_budget(self):
+        match = resolve(reverse('organizations-list'))
+
+        self.assertEqual(get_query_budget(match.func, 'GET'), ('list', OrganizationViewSet.query_budgets['list']))
+        self.assertEqual(get_query_budget(match.func, 'POST'), ('create', OrganizationViewSet.query_budgets['create']))
+        self.assertEqual(get_query_budget(resolve(reverse('logout')).func, 'POST'), ('post', None))
+
+    @override_settings(QUERY_BUDGET=QUERY_BUDGET)
+    def test_middleware_reports_query_count(self):
+        response = self.client.get(reverse('users-list'))
+
+        self.assertGreater(int(response['X-Query-Count']), 0)
+
+    @override_settings(QUERY_BUDGET=QUERY_BUDGET)
+    def test_middleware_logs_budget_overrun(self):
+        with patch.dict(UserViewset.query_budgets, {'list': 0}), self.assertLogs('query_budget', level='WARNING') as logs:
+            self.client.get(reverse('users-list'))
+
+        self.assertIn('users-list (list) ran over its budget of 0 queries', logs.output[0])
+
+    @override_settings(QUERY_BUDGET={**QUERY_BUDGET, 'RAISE': True})
+    def test_middleware_raises_when_configured(self):
+        with patch.dict(UserViewset.query_budgets, {'list': 0}), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('users-list'))
+
+    def test_assert_query_budget_fails_over_budget(self):
+        with patch.dict(UserViewset.query_budgets, {'list': 0}), self.assertRaises(self.failureException):
+            with self.assertQueryBudget(UserViewset, 'list'):
+                self.client.get(reverse('users-list'))
+
+    def test_assert_query_budget_fails_on_repeated_queries(self):
+        users = User.objects.bulk_create([User(username=f'user{index}') for index in range(10)])
+        with self.assertRaises(self.failureException) as context:
+            with self.assertQueryBudget(UserViewset, 'destroy'):
+                for user in users:
+                    User.objects.filter(id=user.id).exists()
+
+        self.assertIn('possible N+1', str(context.exception))
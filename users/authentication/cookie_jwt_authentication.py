@@ -1,17 +1,63 @@
 # authentication.py
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.authentication.user_cache import token_user_cache
+from users.models import TokenClaimsUser
+
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
-    Custom authentication class that reads JWT from httpOnly cookie
+    Custom authentication class that reads JWT from the Authorization header or,
+    when it is absent, from the httpOnly cookie. Users resolved from a token are
+    cached per (user_id, jti) so repeated requests skip the user lookup.
+
+    With JWT_STATELESS_USER enabled, tokens carrying the user claims are turned into a
+    TokenClaimsUser without any query; the row is only loaded if another attribute is read.
     """
     def authenticate(self, request):
-        # Try to get token from cookie first
-        raw_token = request.COOKIES.get('access_token')
-        
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+
+        # Fall back to the cookie
+        if raw_token is None:
+            raw_token = request.COOKIES.get('access_token')
+
         if raw_token is None:
             return None
 
         validated_token = self.get_validated_token(raw_token)
-        return self.get_user(validated_token), validated_token
\ No newline at end of file
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        if settings.JWT_STATELESS_USER:
+            user = self.get_claims_user(validated_token)
+            if user is not None:
+                return user
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        # revocation checks compare the password hash, which is never cached
+        if user_id is None or jti is None or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        user = token_user_cache.get(user_id, jti)
+        if user is None:
+            user = super().get_user(validated_token)
+            token_user_cache.set(user_id, jti, user, token_exp=validated_token.get('exp'))
+        return user
+
+    def get_claims_user(self, validated_token):
+        claims = {field: validated_token.get(field) for field in TokenClaimsUser.claim_fields if field != 'id'}
+        claims['id'] = validated_token.get(api_settings.USER_ID_CLAIM)
+        if None in claims.values():
+            # tokens issued without the user claims go through the regular lookup
+            return None
+
+        user = TokenClaimsUser.from_claims(claims)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from opentelemetry import metrics
+
+
+meter = metrics.get_meter(__name__)
+
+
+class PasswordHashingPoolFull(Exception):
+    pass
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for password hashing. hashlib releases the GIL while
+    hashing, so workers run in parallel without blocking the event loop, and at most
+    max_workers + max_queue hashes are admitted at once; anything above that is
+    rejected instead of piling up behind the pool.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hashing')
+
+        self._pending_counter = meter.create_up_down_counter(
+            'auth.password_hashing.pending', description='Password hashes queued or running')
+        self._queue_wait = meter.create_histogram(
+            'auth.password_hashing.queue_wait', unit='ms', description='Time a password hash waited for a worker')
+        self._duration = meter.create_histogram(
+            'auth.password_hashing.duration', unit='ms', description='Time spent hashing a password')
+        self._rejected = meter.create_counter(
+            'auth.password_hashing.rejected', description='Password hashes rejected because the pool was full')
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self._rejected.add(1)
+                raise PasswordHashingPoolFull()
+            self.pending += 1
+        self._pending_counter.add(1)
+
+        submitted_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            self._queue_wait.record((started_at - submitted_at) * 1000)
+            try:
+                return func(*args)
+            finally:
+                self._duration.record((time.perf_counter() - started_at) * 1000)
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(task))
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._pending_counter.add(-1)
+
+    async def authenticate(self, username, password):
+        """
+        Async counterpart of ModelBackend.authenticate: the user lookup goes through
+        the async ORM and only the hash comparison runs on the pool.
+        """
+        user_model = get_user_model()
+        if username is None or password is None:
+            return None
+        try:
+            user = await user_model._default_manager.aget(**{user_model.USERNAME_FIELD: username})
+        except user_model.DoesNotExist:
+            # Run the default hasher once to reduce the timing difference between
+            # an existing and a nonexistent user (#20760), like ModelBackend does.
+            await self.run(hashers.make_password, password)
+            return None
+
+        is_valid = await self.run(hashers.check_password, password, user.password)
+        if not is_valid or not getattr(user, 'is_active', True):
+            return None
+
+        if hashers.identify_hasher(user.password).must_update(user.password):
+            user.password = await self.run(hashers.make_password, password)
+            await user.asave(update_fields=['password'])
+        return user
+
+
+password_hashing_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASHING_POOL['MAX_WORKERS'],
+    max_queue=settings.PASSWORD_HASHING_POOL['MAX_QUEUE'],
+)
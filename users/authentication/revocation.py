@@ -0,0 +1,149 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class BaseRevocationStore:
+    """
+    Set of revoked refresh token jtis. Entries only need to outlive the token they
+    revoke, so every revocation carries the seconds left until the token expires.
+    """
+    is_shared = False
+
+    def revoke(self, jti, ttl):
+        """
+        Revokes jti for ttl seconds. Returns False when it was already revoked, which
+        lets rotation detect a concurrent use of the same refresh token.
+        """
+        raise NotImplementedError
+
+    def is_revoked(self, jti):
+        raise NotImplementedError
+
+
+class LocalRevocationStore(BaseRevocationStore):
+    """
+    In-process store. Only suitable when a single process serves token refreshes.
+    """
+    purge_interval = 60
+
+    def __init__(self, **kwargs):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+    def revoke(self, jti, ttl):
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge > self.purge_interval:
+                self._entries = {key: expires_at for key, expires_at in self._entries.items() if expires_at > now}
+                self._last_purge = now
+            expires_at = self._entries.get(jti)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._entries[jti] = now + ttl
+            return True
+
+    def is_revoked(self, jti):
+        expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+class CacheRevocationStore(BaseRevocationStore):
+    """
+    Store backed by a Django cache alias. Pointing the alias at
+    django.core.cache.backends.redis.RedisCache shares revocations between
+    processes, each check is a single GET and each revocation a single SET NX.
+    """
+    is_shared = True
+    key_prefix = 'revoked-jti'
+
+    def __init__(self, cache_alias='default', **kwargs):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def revoke(self, jti, ttl):
+        return self.cache.add(f'{self.key_prefix}:{jti}', True, timeout=ttl)
+
+    def is_revoked(self, jti):
+        return self.cache.get(f'{self.key_prefix}:{jti}', False)
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, value):
+        # double hashing: the k positions are derived from two 64 bit halves of one digest
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, value):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(value))
+
+
+class BloomFilterRevocationStore(BaseRevocationStore):
+    """
+    Bloom filter in front of a process-local store. A jti that is not in the
+    filter was never revoked, which answers the common case without touching the
+    store. Bloom filters cannot forget, so two generations are kept and rotated every
+    `generation_ttl` seconds, which must be at least the refresh token lifetime.
+    """
+
+    def __init__(self, store, capacity=100000, error_rate=0.001, generation_ttl=86400):
+        if store.is_shared:
+            # a per-process filter never sees revocations made by other processes
+            raise ImproperlyConfigured('The revocation bloom filter can only front a process-local store.')
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.generation_ttl = generation_ttl
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotated_at = time.time()
+
+    def revoke(self, jti, ttl):
+        with self._lock:
+            if time.time() - self._rotated_at > self.generation_ttl:
+                self._previous, self._current = self._current, BloomFilter(self.capacity, self.error_rate)
+                self._rotated_at = time.time()
+            self._current.add(jti)
+        return self.store.revoke(jti, ttl)
+
+    def is_revoked(self, jti):
+        if jti not in self._current and jti not in self._previous:
+            return False
+        return self.store.is_revoked(jti)
+
+
+def build_revocation_store(config):
+    store = import_string(config['STORE'])(cache_alias=config['CACHE_ALIAS'])
+    if config['BLOOM_FILTER']:
+        store = BloomFilterRevocationStore(
+            store,
+            capacity=config['BLOOM_FILTER_CAPACITY'],
+            error_rate=config['BLOOM_FILTER_ERROR_RATE'],
+            generation_ttl=int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()),
+        )
+    return store
+
+
+revocation_store = build_revocation_store(settings.REFRESH_TOKEN_REVOCATION)
@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import TokenClaimsUser
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token that also carries the claims TokenClaimsUser is built from.
+    Access tokens minted from it copy the claims.
+    """
+    user_claims = [field for field in TokenClaimsUser.claim_fields if field != 'id']
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_user_claims(user)
+        return token
+
+    def set_user_claims(self, user):
+        for claim in self.user_claims:
+            self[claim] = getattr(user, claim)
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from users.models import User
+
+
+class TokenUserCache:
+    """
+    Maps (user_id, token jti) to the user an access token authenticated as, so
+    repeated requests with the same token skip the users_user SELECT.
+
+    Entries live in a bounded per-process LRU and, when a Django cache alias is
+    configured, in that shared backend as well. Invalidating a user bumps a
+    generation number in the shared backend, so other processes only keep serving
+    their local copy until its TTL runs out. Queryset .update() calls bypass the
+    model signals and are not seen here.
+    """
+    key_prefix = 'jwt-user'
+
+    # the password hash never leaves the database, it is loaded lazily if accessed
+    cached_fields = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+    def __init__(self, max_size=10000, ttl=60, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, user_id, jti):
+        if not self.enabled:
+            return None
+        key = (str(user_id), str(jti))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return self._build_user(payload)
+                self._pop(key)
+
+        if self.shared_cache is None:
+            return None
+        payload = self.shared_cache.get(self._shared_key(*key))
+        if payload is None:
+            return None
+        self._set_local(key, payload, self.ttl)
+        return self._build_user(payload)
+
+    def set(self, user_id, jti, user, token_exp=None):
+        if not self.enabled:
+            return
+        ttl = self.ttl
+        if token_exp is not None:
+            # never outlive the token that authenticated the user
+            ttl = min(ttl, int(token_exp - time.time()))
+        if ttl <= 0:
+            return
+        key = (str(user_id), str(jti))
+        payload = tuple(getattr(user, attname) for attname in self.cached_fields)
+        self._set_local(key, payload, ttl)
+        if self.shared_cache is not None:
+            self.shared_cache.set(self._shared_key(*key), payload, timeout=ttl)
+
+    def invalidate(self, user_id, jti=None):
+        user_id = str(user_id)
+        with self._lock:
+            if jti is None:
+                for key in list(self._user_keys.get(user_id, ())):
+                    self._pop(key)
+            else:
+                self._pop((user_id, str(jti)))
+
+        if self.shared_cache is not None:
+            if jti is None:
+                self.shared_cache.set(self._generation_key(user_id), time.time_ns(), timeout=None)
+            else:
+                self.shared_cache.delete(self._shared_key(user_id, str(jti)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _set_local(self, key, payload, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, payload)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        self._entries.pop(key, None)
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[key[0]]
+
+    def _generation_key(self, user_id):
+        return f'{self.key_prefix}-generation:{user_id}'
+
+    def _shared_key(self, user_id, jti):
+        generation = self.shared_cache.get(self._generation_key(user_id), 0)
+        return f'{self.key_prefix}:{user_id}:{generation}:{jti}'
+
+    def _build_user(self, payload):
+        return User.from_db(router.db_for_read(User), self.cached_fields, payload)
+
+
+token_user_cache = TokenUserCache(
+    max_size=settings.JWT_USER_CACHE['MAX_SIZE'],
+    ttl=settings.JWT_USER_CACHE['TTL'],
+    cache_alias=settings.JWT_USER_CACHE['CACHE_ALIAS'],
+)
@@ -0,0 +1,61 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+from django.test.utils import override_settings
+
+
+POOL_ENGINE = 'root_project.db_backends.postgresql_pool'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare opening a database connection per request with the configured '
+        'DATABASE_PROFILE (persistent connections or the connection pool)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+
+    # DEBUG would route every query through the debug cursor and its logging
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        requests = options['requests']
+
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict['CONN_MAX_AGE'] = 0
+        settings_dict['OPTIONS'].pop('connection_pool', None)
+        if settings_dict['ENGINE'] == POOL_ENGINE:
+            settings_dict['ENGINE'] = 'django.db.backends.postgresql'
+        per_request = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, connection.alias)
+
+        self.stdout.write(
+            f"{connection.settings_dict['ENGINE']} "
+            f"CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']} requests={requests}"
+        )
+        cases = [
+            ('connection per request', per_request),
+            ('configured profile', connection),
+        ]
+        for label, wrapper in cases:
+            # one warm up request so imports and pool start up are not measured
+            self._request(wrapper)
+            started = time.perf_counter()
+            for _ in range(requests):
+                self._request(wrapper)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{label:<25} {elapsed * 1000:10.2f} ms  {elapsed / requests * 1e6:10.1f} us/request')
+            wrapper.close()
+
+    @staticmethod
+    def _request(wrapper):
+        # what a request does with its connection: use it, then let request_finished
+        # decide whether to keep it around
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        wrapper.close_if_unusable_or_obsolete()
@@ -0,0 +1,53 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import User
+from users.serializers import v1_serializers
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-row cost of UserSerializer and UserReadSerializer on in-memory users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        now = timezone.now()
+        users = [
+            User(
+                id=uuid.uuid4(),
+                username=f'user{index}',
+                email=f'user{index}@example.com',
+                first_name='First',
+                last_name='Last',
+                date_joined=now,
+                last_login=now if index % 2 else None,
+            )
+            for index in range(rows)
+        ]
+        field_names = v1_serializers.UserReadSerializer().read_field_names
+        values = [{name: getattr(user, name) for name in field_names} for user in users]
+
+        expected = v1_serializers.UserSerializer(users, many=True).data
+        cases = [
+            ('UserSerializer (instances)', v1_serializers.UserSerializer, users),
+            ('UserReadSerializer (instances)', v1_serializers.UserReadSerializer, users),
+            ('UserReadSerializer (.values() rows)', v1_serializers.UserReadSerializer, values),
+        ]
+        for label, serializer_class, data in cases:
+            if [dict(row) for row in serializer_class(data, many=True).data] != [dict(row) for row in expected]:
+                self.stderr.write(f'{label} output differs from UserSerializer')
+                continue
+            best = min(self._time(serializer_class, data) for _ in range(options['repeat']))
+            self.stdout.write(f'{label:<40} {best * 1000:10.2f} ms  {best / rows * 1e6:8.2f} us/row')
+
+    @staticmethod
+    def _time(serializer_class, data):
+        start = time.perf_counter()
+        serializer_class(data, many=True).data
+        return time.perf_counter() - start
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_user_main_profile_image_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='users_user_date_joined_id_idx'),
+        ),
+    ]
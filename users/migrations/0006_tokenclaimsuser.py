@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 06:12
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_date_joined_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenClaimsUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('users.user',),
+            managers=[
+                ('objects', users.models.CustomUserManager()),
+            ],
+        ),
+    ]
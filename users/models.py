@@ -1,7 +1,7 @@
 import uuid
 
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.db import models, router
 
 
 class CustomUserManager(UserManager):
@@ -15,3 +15,43 @@ class User(AbstractUser):
     main_profile_image_url = models.TextField(blank=True)
 
     objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # backs keyset pagination over the default -date_joined ordering
+            models.Index(fields=['date_joined', 'id'], name='users_user_date_joined_id_idx'),
+        ]
+
+
+
+class TokenClaimsUser(User):
+    """
+    User built from signed access token claims. Only the claim fields are loaded,
+    the first read of any other attribute loads the remaining columns in one query.
+    """
+    claim_fields = ['id', 'username', 'is_staff', 'is_active']
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, claims):
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in claims]
+        values = [cls._meta.get_field(name).to_python(claims[name]) for name in field_names]
+        return cls.from_db(router.db_for_read(cls), field_names, values)
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # the claims are what the user was when the token was issued and can be stale
+        # (a demoted or deactivated user), they are never written back
+        if update_fields is None:
+            deferred_fields = self.get_deferred_fields()
+            update_fields = [field.attname for field in self._meta.concrete_fields if not field.primary_key and field.attname not in deferred_fields]
+        update_fields = [name for name in update_fields if name not in self.claim_fields]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields.issuperset(fields):
+            # deferred attribute access asks for one field at a time, load them all at once
+            fields = deferred_fields
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
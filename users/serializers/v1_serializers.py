@@ -1,6 +1,18 @@
-from rest_framework import serializers
+import time
+
+from operator import attrgetter, itemgetter
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt import serializers as simplejwt_serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings as simplejwt_settings
 
 from users import models 
+from users.authentication.revocation import revocation_store
+from users.authentication.tokens import UserClaimsRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,6 +22,58 @@ class UserSerializer(serializers.ModelSerializer):
         exclude = ['groups', 'is_staff', 'is_superuser', 'password', 'user_permissions']
 
 
+class UserReadSerializer(UserSerializer):
+    """
+    Read-only variant of UserSerializer with the same output shape. The per-field
+    to_representation calls are compiled once into plain getters and converters, and
+    rows can be either User instances or .values() dicts.
+    """
+
+    @property
+    def read_field_names(self):
+        return [field.source for field in self._readable_fields]
+
+    def to_representation(self, instance):
+        if not hasattr(self, '_compiled_fields'):
+            self._compiled_fields = [
+                (field.field_name, attrgetter(field.source), itemgetter(field.source), self._compile_field(field))
+                for field in self._readable_fields
+            ]
+        is_dict = isinstance(instance, dict)
+        ret = {}
+        for field_name, get_attribute, get_item, convert in self._compiled_fields:
+            value = get_item(instance) if is_dict else get_attribute(instance)
+            ret[field_name] = None if value is None else convert(value)
+        return ret
+
+    @staticmethod
+    def _compile_field(field):
+        if isinstance(field, (serializers.BooleanField, serializers.CharField)):
+            # model values are already of the output type
+            return _identity
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+            return str
+        if isinstance(field, serializers.DateTimeField) and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601:
+            # resolved once per serializer instead of once per value
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+            def to_iso_8601(value):
+                if field_timezone is not None and value.tzinfo is not None:
+                    value = value.astimezone(field_timezone)
+                else:
+                    value = field.enforce_timezone(value)
+                value = value.isoformat()
+                if value.endswith('+00:00'):
+                    value = value[:-6] + 'Z'
+                return value
+            return to_iso_8601
+        return field.to_representation
+
+
+def _identity(value):
+    return value
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
 
     password = serializers.CharField(write_only=True)
@@ -45,3 +109,44 @@ class ProfileImageUploadUrlSerializer(serializers.Serializer):
 class LoginCookieTokenSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField()
+
+
+class TokenObtainPairWithClaimsSerializer(simplejwt_serializers.TokenObtainPairSerializer):
+    token_class = UserClaimsRefreshToken
+
+
+class TokenRefreshWithClaimsSerializer(simplejwt_serializers.TokenRefreshSerializer):
+    """
+    Same flow as simplejwt's refresh serializer, but the user claims are re-read from
+    the user it already loads, so stateless access tokens never carry claims older
+    than one access token lifetime. Revocations go to the configured revocation
+    store instead of the token_blacklist tables.
+    """
+    token_class = UserClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[simplejwt_settings.JTI_CLAIM]
+        if revocation_store.is_revoked(jti):
+            raise TokenError(_('Token is blacklisted'))
+
+        try:
+            user = get_user_model().objects.get(**{simplejwt_settings.USER_ID_FIELD: refresh[simplejwt_settings.USER_ID_CLAIM]})
+        except (KeyError, get_user_model().DoesNotExist):
+            user = None
+        if not simplejwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        refresh.set_user_claims(user)
+        data = {'access': str(refresh.access_token)}
+
+        if simplejwt_settings.ROTATE_REFRESH_TOKENS:
+            # revoke is atomic, a concurrent refresh with the same token loses here
+            if simplejwt_settings.BLACKLIST_AFTER_ROTATION and not revocation_store.revoke(jti, max(1, refresh['exp'] - int(time.time()))):
+                raise TokenError(_('Token is blacklisted'))
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+
+        return data
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication.user_cache import token_user_cache
+from users.models import TokenClaimsUser, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TokenClaimsUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=TokenClaimsUser)
+def invalidate_token_user_cache(sender, instance, **kwargs):
+    # covers profile updates, deactivation and deletion
+    token_user_cache.invalidate(instance.pk)
@@ -0,0 +1,132 @@
+import json
+
+from unittest.mock import patch
+
+from django.test import AsyncRequestFactory, TestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication.password_hashing import PasswordHashingPool
+from users.authentication.tokens import UserClaimsRefreshToken
+from users.models import User
+from users.views import v1_views
+
+
+class AsyncLoginViewTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+        self.view = v1_views.AsyncLoginView.as_view()
+
+    async def test_login_success_sets_cookies(self):
+        request = self.factory.post('/', {'username': 'testuser', 'password': 'testpassword123'}, content_type='application/json')
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['user']['id'], str(self.user.id))
+        self.assertIn('access_token', response.cookies)
+        self.assertIn('refresh_token', response.cookies)
+        self.assertTrue(response.cookies['access_token']['httponly'])
+        self.assertEqual(AccessToken(response.cookies['access_token'].value)['user_id'], str(self.user.id))
+
+    async def test_login_with_form_data(self):
+        request = self.factory.post('/', {'username': 'testuser', 'password': 'testpassword123'})
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_login_invalid_password(self):
+        request = self.factory.post('/', {'username': 'testuser', 'password': 'wrong'}, content_type='application/json')
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn('access_token', response.cookies)
+
+    async def test_login_nonexistent_user(self):
+        request = self.factory.post('/', {'username': 'nobody', 'password': 'testpassword123'}, content_type='application/json')
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_login_inactive_user(self):
+        await User.objects.filter(id=self.user.id).aupdate(is_active=False)
+        request = self.factory.post('/', {'username': 'testuser', 'password': 'testpassword123'}, content_type='application/json')
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_login_invalid_body(self):
+        request = self.factory.post('/', '[1, 2]', content_type='application/json')
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_login_rejected_when_pool_is_full(self):
+        pool = PasswordHashingPool(max_workers=1, max_queue=0)
+        pool.pending = 1
+        request = self.factory.post('/', {'username': 'testuser', 'password': 'testpassword123'}, content_type='application/json')
+
+        with patch.object(v1_views, 'password_hashing_pool', pool):
+            response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class AsyncRefreshTokenViewTestCase(TestCase):
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+        self.refresh = UserClaimsRefreshToken.for_user(self.user)
+        self.view = v1_views.AsyncRefreshTokenView.as_view()
+
+    async def test_refresh_success(self):
+        request = self.factory.post('/')
+        request.COOKIES['refresh_token'] = str(self.refresh)
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access_token', response.cookies)
+        self.assertIn('refresh_token', response.cookies)
+        self.assertNotEqual(response.cookies['refresh_token'].value, str(self.refresh))
+
+    async def test_refresh_missing_cookie(self):
+        response = await self.view(self.factory.post('/'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_refresh_invalid_token(self):
+        request = self.factory.post('/')
+        request.COOKIES['refresh_token'] = 'invalid'
+
+        response = await self.view(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PasswordHashingPoolTestCase(TestCase):
+
+    async def test_run_returns_result_and_releases_slot(self):
+        pool = PasswordHashingPool(max_workers=2, max_queue=0)
+
+        result = await pool.run(sum, [1, 2, 3])
+
+        self.assertEqual(result, 6)
+        self.assertEqual(pool.pending, 0)
@@ -1,11 +1,20 @@
 import json
-from django.test import TestCase
+import time
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework import status
+from rest_framework import status, test
 from rest_framework.test import APIClient
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-from users.models import User
+from root_project.testing import captured_sql
+from users.authentication.cookie_jwt_authentication import CookieJWTAuthentication
+from users.authentication.tokens import UserClaimsRefreshToken
+from users.authentication.user_cache import TokenUserCache, token_user_cache
+from users.models import TokenClaimsUser, User
 
 
 class JWTAuthenticationTestCase(TestCase):
@@ -364,4 +373,225 @@ class PermissionTestCase(TestCase):
             'email': 'public@example.com'
         }
         response = self.client.post(list_url, user_data)
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+class TokenUserCacheTestCase(TestCase):
+
+    def setUp(self):
+        token_user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.access_token = refresh.access_token
+        self.self_url = reverse('users-retrieve-self')
+
+    def _user_queries(self, context):
+        return [sql for sql in captured_sql(context) if 'users_user' in sql]
+
+    def test_second_request_with_same_token_skips_user_lookup(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.client.get(self.self_url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.self_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], 'testuser')
+        self.assertEqual(self._user_queries(context), [])
+
+    def test_cookie_token_is_cached(self):
+        self.client.cookies['access_token'] = str(self.access_token)
+        self.client.get(self.self_url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.self_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._user_queries(context), [])
+
+    def test_user_update_invalidates_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.client.get(self.self_url)
+
+        self.user.first_name = 'Changed'
+        self.user.save()
+
+        response = self.client.get(self.self_url)
+        self.assertEqual(response.data['first_name'], 'Changed')
+
+    def test_user_deactivation_invalidates_cache(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.client.get(self.self_url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.self_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_token_entry(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.client.get(self.self_url)
+        self.assertIsNotNone(token_user_cache.get(self.user.id, self.access_token['jti']))
+
+        response = self.client.post(reverse('logout'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_user_cache.get(self.user.id, self.access_token['jti']))
+
+    def test_cached_user_loads_password_lazily(self):
+        token_user_cache.set(self.user.id, 'jti', self.user)
+
+        cached_user = token_user_cache.get(self.user.id, 'jti')
+
+        self.assertEqual(cached_user, self.user)
+        self.assertIn('password', cached_user.get_deferred_fields())
+        self.assertTrue(cached_user.check_password('testpassword123'))
+
+    def test_lru_eviction(self):
+        cache = TokenUserCache(max_size=2, ttl=60)
+        for jti in ('a', 'b', 'c'):
+            cache.set(self.user.id, jti, self.user)
+
+        self.assertIsNone(cache.get(self.user.id, 'a'))
+        self.assertIsNotNone(cache.get(self.user.id, 'b'))
+        self.assertIsNotNone(cache.get(self.user.id, 'c'))
+
+    def test_expired_token_is_not_cached(self):
+        cache = TokenUserCache(max_size=2, ttl=60)
+        cache.set(self.user.id, 'a', self.user, token_exp=time.time() - 1)
+
+        self.assertIsNone(cache.get(self.user.id, 'a'))
+
+    def test_shared_cache_backend(self):
+        cache = TokenUserCache(max_size=10, ttl=60, cache_alias='default')
+        cache.set(self.user.id, 'a', self.user)
+        cache.clear()
+
+        self.assertEqual(cache.get(self.user.id, 'a'), self.user)
+
+        cache.invalidate(self.user.id)
+        self.assertIsNone(cache.get(self.user.id, 'a'))
+
+
+@override_settings(JWT_STATELESS_USER=True)
+class StatelessTokenUserTestCase(TestCase):
+
+    def setUp(self):
+        token_user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123',
+            first_name='Test'
+        )
+        self.refresh = UserClaimsRefreshToken.for_user(self.user)
+        self.access_token = str(self.refresh.access_token)
+
+    def _authenticate(self, token):
+        request = test.APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CookieJWTAuthentication().authenticate(request)
+
+    def test_authentication_runs_no_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            user, _ = self._authenticate(self.access_token)
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(user.username, 'testuser')
+            self.assertFalse(user.is_staff)
+            self.assertTrue(user.is_active)
+
+        self.assertIsInstance(user, TokenClaimsUser)
+        self.assertEqual(captured_sql(context), [])
+
+    def test_other_attributes_are_loaded_once(self):
+        user, _ = self._authenticate(self.access_token)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(user.email, 'test@example.com')
+            self.assertEqual(user.first_name, 'Test')
+            self.assertTrue(user.check_password('testpassword123'))
+
+        self.assertEqual(len(captured_sql(context)), 1)
+
+    def test_inactive_claim_is_rejected(self):
+        self.user.is_active = False
+        token = str(UserClaimsRefreshToken.for_user(self.user).access_token)
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(token)
+
+    def test_token_without_claims_falls_back_to_user_lookup(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+
+        user, _ = self._authenticate(token)
+
+        self.assertNotIsInstance(user, TokenClaimsUser)
+        self.assertEqual(user, self.user)
+
+    def test_object_permission_and_update_self(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+
+        response = self.client.get(reverse('users-detail', kwargs={'pk': self.user.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(reverse('users-update-self'), {'last_name': 'Updated'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Test')
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_name, 'Updated')
+        self.assertEqual(self.user.email, 'test@example.com')
+
+    def test_update_self_does_not_write_back_stale_claims(self):
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        token = str(UserClaimsRefreshToken.for_user(User.objects.get(id=self.user.id)).access_token)
+        # demoted and deactivated while the token is still valid
+        User.objects.filter(id=self.user.id).update(is_staff=False, is_active=False, username='renamed')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post(reverse('users-update-self'), {'last_name': 'Updated'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_name, 'Updated')
+        self.assertEqual((self.user.is_staff, self.user.is_active, self.user.username), (False, False, 'renamed'))
+
+    def test_claims_user_save_leaves_claim_fields_alone(self):
+        user, _ = self._authenticate(self.access_token)
+        User.objects.filter(id=self.user.id).update(is_active=False)
+
+        user.first_name = 'Changed'
+        user.is_staff = True
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Changed')
+        self.assertEqual((self.user.is_staff, self.user.is_active), (False, False))
+
+    def test_obtained_tokens_carry_user_claims(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'testuser', 'password': 'testpassword123'})
+
+        access = AccessToken(response.data['access'])
+        self.assertEqual(access['username'], 'testuser')
+        self.assertFalse(access['is_staff'])
+        self.assertTrue(access['is_active'])
+
+    def test_refresh_updates_user_claims(self):
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken(response.data['access'])['is_staff'])
+
+    def test_refresh_rejects_inactive_user(self):
+        User.objects.filter(id=self.user.id).update(is_active=False)
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+
+
+class UserExportTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='adminpassword123',
+            is_staff=True
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+        User.objects.bulk_create([
+            User(username=f'user{index}', email=f'user{index}@example.com', is_active=index % 2 == 0)
+            for index in range(10)
+        ])
+
+        admin_refresh = RefreshToken.for_user(self.admin_user)
+        self.admin_token = str(admin_refresh.access_token)
+
+        user_refresh = RefreshToken.for_user(self.user)
+        self.user_token = str(user_refresh.access_token)
+
+        self.export_url = reverse('users-export')
+
+    def test_export_ndjson(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
+
+        response = self.client.get(self.export_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), User.objects.count())
+        self.assertNotIn('password', rows[0])
+
+        # same json shape as the list endpoint
+        list_response = self.client.get(reverse('users-list'), {'page_size': 100})
+        self.assertEqual(rows, json.loads(json.dumps(list_response.data['results'])))
+
+    def test_export_csv(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
+
+        response = self.client.get(self.export_url, {'export_format': 'csv'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), User.objects.count())
+        self.assertIn('username', rows[0])
+        self.assertNotIn('password', rows[0])
+
+    def test_export_honours_filters(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
+
+        response = self.client.get(self.export_url, {'is_active': 'false'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        usernames = {json.loads(line)['username'] for line in lines}
+        self.assertEqual(usernames, set(User.objects.filter(is_active=False).values_list('username', flat=True)))
+
+    def test_export_invalid_format(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.admin_token}')
+
+        response = self.client.get(self.export_url, {'export_format': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_staff_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.user_token}')
+
+        response = self.client.get(self.export_url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_unauthorized(self):
+        response = self.client.get(self.export_url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,4 +1,5 @@
 from unittest.mock import patch
+from django.conf import settings
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -7,6 +8,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from users.models import User
 from files.models import File
+from files.uploads import reconcile_uploads
 
 
 class UserImageUploadTestCase(TestCase):
@@ -25,7 +27,7 @@ class UserImageUploadTestCase(TestCase):
 
         self.upload_url = reverse('generate-upload-profile-image-presigned-url')
 
-    @patch('django.conf.settings.S3_CLIENT.generate_presigned_url')
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
     def test_generate_upload_url_success(self, mock_presigned_url):
         mock_presigned_url.return_value = 'https://test-bucket.s3.amazonaws.com/presigned-url'
 
@@ -90,7 +92,7 @@ class UserImageUploadTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('content_type', response.data)
 
-    @patch('django.conf.settings.S3_CLIENT.generate_presigned_url')
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
     def test_generate_upload_url_different_file_types(self, mock_presigned_url):
         mock_presigned_url.return_value = 'https://test-bucket.s3.amazonaws.com/presigned-url'
 
@@ -119,7 +121,7 @@ class UserImageUploadTestCase(TestCase):
                 self.assertEqual(file_obj.filename, filename)
                 self.assertEqual(file_obj.location, f'{self.user.id}/{filename}')
 
-    @patch('django.conf.settings.S3_CLIENT.generate_presigned_url')
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
     def test_file_location_includes_user_id(self, mock_presigned_url):
         mock_presigned_url.return_value = 'https://test-bucket.s3.amazonaws.com/presigned-url'
 
@@ -145,7 +147,7 @@ class UserImageUploadTestCase(TestCase):
         call_args = mock_presigned_url.call_args
         self.assertEqual(call_args[1]['Params']['Key'], expected_location)
 
-    @patch('django.conf.settings.S3_CLIENT.generate_presigned_url')
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
     def test_presigned_url_failure_handling(self, mock_presigned_url):
         # Mock the S3 client to return None (simulating an error)
         mock_presigned_url.return_value = None
@@ -164,7 +166,7 @@ class UserImageUploadTestCase(TestCase):
         self.assertIsNone(response.data['url'])
         self.assertIn('file_id', response.data)
 
-    @patch('django.conf.settings.S3_CLIENT.generate_presigned_url')
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
     def test_multiple_users_different_locations(self, mock_presigned_url):
         mock_presigned_url.return_value = 'https://test-bucket.s3.amazonaws.com/presigned-url'
 
@@ -204,4 +206,27 @@ class UserImageUploadTestCase(TestCase):
 
         self.assertEqual(file1.location, f'{self.user.id}/user1.jpg')
         self.assertEqual(file2.location, f'{other_user.id}/user2.jpg')
-        self.assertNotEqual(file1.location, file2.location)
\ No newline at end of file
+        self.assertNotEqual(file1.location, file2.location)
+
+    @patch('organizations_management.helpers.presigner.generate_presigned_url')
+    def test_confirmed_upload_becomes_the_profile_image(self, mock_presigned_url):
+        mock_presigned_url.return_value = 'https://test-bucket.s3.amazonaws.com/presigned-url'
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        response = self.client.post(self.upload_url, {'filename': 'profile.jpg', 'content_type': 'image/jpeg'})
+        file_id = response.data['file_id']
+
+        response = self.client.post(reverse('files-confirm', args=[file_id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.main_profile_image_url, '')
+
+        with patch('django.conf.settings.S3_CLIENT.head_object', return_value={'ContentLength': 1024, 'ContentType': 'image/jpeg'}):
+            reconcile_uploads()
+
+        self.user.refresh_from_db()
+        file = File.objects.get(id=file_id)
+        self.assertEqual(file.upload_status, 'COMPLETED')
+        self.assertEqual(
+            self.user.main_profile_image_url,
+            f'{settings.S3_CLIENT.meta.endpoint_url}/{file.bucket}/{self.user.id}/profile.jpg',
+        )
@@ -0,0 +1,98 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from root_project.testing import QueryBudgetTestMixin, captured_sql
+from users.models import User
+from users.views.v1_views import UserViewset
+
+
+class UserCursorPaginationTestCase(QueryBudgetTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.list_url = reverse('users-list')
+
+        # Several users share a date_joined so the id tie-breaker is exercised
+        base_date = timezone.now() - datetime.timedelta(days=1)
+        self.users = User.objects.bulk_create([
+            User(
+                username=f'user{index}',
+                email=f'user{index}@example.com',
+                is_active=index % 5 != 0,
+                date_joined=base_date + datetime.timedelta(minutes=index // 3)
+            )
+            for index in range(25)
+        ])
+
+    def _walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pagination_walks_every_user_once_in_order(self):
+        ids, _ = self._walk(self.list_url, {'pagination': 'cursor', 'page_size': 4})
+
+        expected_ids = [str(user.id) for user in User.objects.order_by('-date_joined', '-id')]
+        self.assertEqual(ids, expected_ids)
+
+    def test_cursor_pagination_response_has_no_count(self):
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_cursor_pagination_runs_a_single_query_per_page(self):
+        first_page = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 4})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(first_page.data['next'])
+
+        queries = captured_sql(context)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0].upper())
+
+    def test_cursor_pagination_previous_link_returns_previous_page(self):
+        first_page = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 4})
+        second_page = self.client.get(first_page.data['next'])
+        previous_page = self.client.get(second_page.data['previous'])
+
+        self.assertEqual(previous_page.status_code, status.HTTP_200_OK)
+        self.assertEqual(previous_page.data['results'], first_page.data['results'])
+
+    def test_cursor_pagination_with_filter_and_ordering(self):
+        ids, _ = self._walk(self.list_url, {'pagination': 'cursor', 'page_size': 4, 'is_active': 'true', 'ordering': 'date_joined'})
+
+        expected_ids = [str(user.id) for user in User.objects.filter(is_active=True).order_by('date_joined', 'id')]
+        self.assertEqual(ids, expected_ids)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        response = self.client.get(self.list_url, {'pagination': 'cursor', 'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_still_the_default(self):
+        response = self.client.get(self.list_url, {'page_size': 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], len(self.users))
+
+    def test_list_pages_stay_within_the_query_budget(self):
+        for params in ({'page_size': 25}, {'pagination': 'cursor', 'page_size': 25}):
+            with self.subTest(params=params), self.assertQueryBudget(UserViewset, 'list'):
+                response = self.client.get(self.list_url, params)
+            self.assertEqual(len(response.data['results']), 25)
@@ -0,0 +1,125 @@
+import time
+import uuid
+
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.authentication.revocation import (
+    BloomFilter, BloomFilterRevocationStore, CacheRevocationStore, LocalRevocationStore
+)
+from users.authentication.tokens import UserClaimsRefreshToken
+from users.models import User
+
+
+class RefreshTokenRevocationTestCase(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123'
+        )
+        self.refresh = str(UserClaimsRefreshToken.for_user(self.user))
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], self.refresh)
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotated_cookie_refresh_token_cannot_be_reused(self):
+        self.client.cookies['refresh_token'] = self.refresh
+        response = self.client.post(reverse('refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_refresh = response.cookies['refresh_token'].value
+
+        self.client.cookies['refresh_token'] = self.refresh
+        response = self.client.post(reverse('refresh'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.cookies['refresh_token'] = new_refresh
+        response = self.client.post(reverse('refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_revokes_refresh_token(self):
+        self.client.cookies['refresh_token'] = self.refresh
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.cookies['refresh_token'] = self.refresh
+        response = self.client.post(reverse('refresh'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RevocationStoreTestCase(TestCase):
+
+    def test_local_store(self):
+        store = LocalRevocationStore()
+        jti = uuid.uuid4().hex
+
+        self.assertFalse(store.is_revoked(jti))
+        self.assertTrue(store.revoke(jti, 60))
+        self.assertFalse(store.revoke(jti, 60))
+        self.assertTrue(store.is_revoked(jti))
+
+    def test_local_store_entries_expire(self):
+        store = LocalRevocationStore()
+        jti = uuid.uuid4().hex
+        store.revoke(jti, 60)
+
+        with patch('users.authentication.revocation.time.time', return_value=time.time() + 61):
+            self.assertFalse(store.is_revoked(jti))
+            self.assertTrue(store.revoke(jti, 60))
+
+    def test_cache_store(self):
+        store = CacheRevocationStore(cache_alias='default')
+        jti = uuid.uuid4().hex
+
+        self.assertFalse(store.is_revoked(jti))
+        self.assertTrue(store.revoke(jti, 60))
+        self.assertFalse(store.revoke(jti, 60))
+        self.assertTrue(store.is_revoked(jti))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        values = [uuid.uuid4().hex for _ in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_bloom_filter_store_skips_store_for_unknown_jti(self):
+        local_store = LocalRevocationStore()
+        store = BloomFilterRevocationStore(local_store, capacity=100, error_rate=0.01)
+        jti = uuid.uuid4().hex
+        store.revoke(jti, 60)
+
+        with patch.object(local_store, 'is_revoked', wraps=local_store.is_revoked) as is_revoked:
+            self.assertTrue(store.is_revoked(jti))
+            self.assertFalse(store.is_revoked(uuid.uuid4().hex))
+
+        self.assertLessEqual(is_revoked.call_count, 2)
+        self.assertEqual(is_revoked.call_args_list[0].args, (jti,))
+
+    def test_bloom_filter_keeps_previous_generation(self):
+        store = BloomFilterRevocationStore(LocalRevocationStore(), capacity=100, error_rate=0.01, generation_ttl=60)
+        jti = uuid.uuid4().hex
+        store.revoke(jti, 30)
+
+        with patch('users.authentication.revocation.time.time', return_value=time.time() + 61):
+            store.revoke(uuid.uuid4().hex, 30)
+        self.assertIn(jti, store._previous)
+
+    def test_bloom_filter_refuses_shared_store(self):
+        with self.assertRaises(ImproperlyConfigured):
+            BloomFilterRevocationStore(CacheRevocationStore())
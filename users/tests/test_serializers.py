@@ -0,0 +1,48 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from users.models import User
+from users.serializers import v1_serializers
+
+
+class UserReadSerializerTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123',
+            first_name='Test',
+            last_name='User'
+        )
+        self.logged_user = User.objects.create_user(
+            username='loggeduser',
+            email='logged@example.com',
+            password='testpassword123'
+        )
+        User.objects.filter(id=self.logged_user.id).update(last_login=timezone.now())
+        self.logged_user.refresh_from_db()
+
+    def test_instance_output_matches_user_serializer(self):
+        for user in (self.user, self.logged_user):
+            with self.subTest(username=user.username):
+                expected = v1_serializers.UserSerializer(user).data
+                data = v1_serializers.UserReadSerializer(user).data
+                self.assertEqual(data, expected)
+                self.assertEqual(list(data), list(expected))
+
+    def test_values_output_matches_user_serializer(self):
+        field_names = v1_serializers.UserReadSerializer().read_field_names
+        rows = User.objects.order_by('username').values(*field_names)
+        users = User.objects.order_by('username')
+
+        expected = v1_serializers.UserSerializer(users, many=True).data
+        data = v1_serializers.UserReadSerializer(rows, many=True).data
+
+        self.assertEqual([dict(row) for row in data], [dict(row) for row in expected])
+
+    def test_read_field_names_exclude_private_fields(self):
+        field_names = v1_serializers.UserReadSerializer().read_field_names
+
+        for excluded in ('password', 'is_staff', 'is_superuser', 'groups', 'user_permissions'):
+            self.assertNotIn(excluded, field_names)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
@@ -7,11 +8,19 @@ from users.views import v1_views
 router = routers.DefaultRouter()
 router.register(r'', v1_views.UserViewset, basename='users') 
 
+# ASGI deployments serve the async login/refresh views, see root_project.asgi
+if settings.ASYNC_AUTH_VIEWS:
+    login_view = v1_views.AsyncLoginView
+    refresh_view = v1_views.AsyncRefreshTokenView
+else:
+    login_view = v1_views.LoginView
+    refresh_view = v1_views.RefreshTokenView
+
 
 urlpatterns = [
     path('users/', include(router.urls)),
     path('users/generate-upload-profile-image-presigned-url', v1_views.UserImageUploadView.as_view(), name='generate-upload-profile-image-presigned-url'),
-    path('users/auth/login/', v1_views.LoginView.as_view(), name='login'),
+    path('users/auth/login/', login_view.as_view(), name='login'),
     path('users/auth/logout/', v1_views.LogoutView.as_view(), name='logout'),
-    path('users/auth/refresh/', v1_views.RefreshTokenView.as_view(), name='refresh')
+    path('users/auth/refresh/', refresh_view.as_view(), name='refresh')
 ]
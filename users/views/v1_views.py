@@ -1,15 +1,31 @@
+import csv
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from decouple import config
 from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
-from rest_framework import decorators, filters, generics, mixins, pagination, response, permissions as drf_permissions, status, views, viewsets
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework import decorators, exceptions, filters, generics, mixins, pagination, response, permissions as drf_permissions, status, views, viewsets
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 
 from files import models as files_models
 from organizations_management.helpers import generate_upload_presigned_url
 from users import models
+from users.authentication.password_hashing import PasswordHashingPoolFull, password_hashing_pool
+from users.authentication.revocation import revocation_store
+from users.authentication.tokens import UserClaimsRefreshToken
+from users.authentication.user_cache import token_user_cache
 from users import permissions
 from users.serializers import v1_serializers
 
@@ -23,6 +39,176 @@ class DefaultPageNumberPaginationClass(pagination.PageNumberPagination):
     max_page_size = 10000
 
 
+class KeysetCursorPaginationClass(pagination.CursorPagination):
+    """
+    Cursor pagination keyed on the full ordering tuple instead of its first field only.
+    The primary key is appended as a tie-breaker, so positions are unique, no offsets
+    or COUNT(*) are ever needed and every page is a single indexed range scan.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
+    ordering = ('-date_joined', '-id')
+    tie_breaker = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if self.tie_breaker not in (field.lstrip('-') for field in ordering):
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering = (*ordering, f'{prefix}{self.tie_breaker}')
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (reverse, current_position) = (False, None)
+        else:
+            (_, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*self._reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(queryset, current_position, reverse))
+
+        # One extra row tells whether there is a page after this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+        if self.page:
+            first_position = self._get_position_from_instance(self.page[0], self.ordering)
+            last_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if reverse:
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+
+        # Positions are unique, so the boundaries of the page are the next cursors
+        self.next_position = last_position if self.page else current_position
+        self.previous_position = first_position if self.page else current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(pagination.Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(pagination.Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is not None and cursor.position is not None:
+            try:
+                position = json.loads(cursor.position)
+            except ValueError:
+                raise exceptions.NotFound(self.invalid_cursor_message)
+            if not isinstance(position, list):
+                raise exceptions.NotFound(self.invalid_cursor_message)
+            cursor = cursor._replace(position=position)
+        return cursor
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            field_name = field.lstrip('-')
+            attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            position.append(str(attr))
+        return position
+
+    def _get_keyset_filter(self, queryset, position, reverse):
+        if len(position) != len(self.ordering):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+        # (a, b) < (x, y) is expanded as a < x OR (a = x AND b < y), which is index friendly
+        keyset_filter = Q()
+        equalities = {}
+        for field, raw_value in zip(self.ordering, position):
+            field_name = field.lstrip('-')
+            try:
+                value = queryset.model._meta.get_field(field_name).to_python(raw_value)
+            except Exception:
+                raise exceptions.NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            keyset_filter |= Q(**equalities, **{f'{field_name}__{lookup}': value})
+            equalities[field_name] = value
+        return keyset_filter
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def set_access_token_cookie(_response, access_token):
+    _response.set_cookie(
+        key='access_token',
+        value=access_token,
+        httponly=True,  # Prevents JavaScript access
+        secure=settings.SESSION_COOKIE_SECURE,  # HTTPS only in production
+        samesite='Lax',  # CSRF protection
+        max_age=60 * 15,  # 15 minutes
+    )
+
+
+def set_refresh_token_cookie(_response, refresh_token):
+    _response.set_cookie(
+        key='refresh_token',
+        value=refresh_token,
+        httponly=True,
+        secure=settings.SESSION_COOKIE_SECURE,
+        samesite='Lax',
+        max_age=60 * 60 * 24 * 7,  # 7 days
+    )
+
+
+def login_response_data(user):
+    return {
+        'message': 'Login successful',
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+        }
+    }
+
+
+class EchoBuffer:
+    """
+    File-like object whose write returns the value instead of buffering it,
+    so csv.writer can feed a StreamingHttpResponse row by row.
+    """
+    def write(self, value):
+        return value
+
+
 class UserViewset(viewsets.ModelViewSet):
     queryset = models.User.objects.all()
     # is_staff is not available on list serializer but keeps being available on filtering
@@ -31,6 +217,24 @@ class UserViewset(viewsets.ModelViewSet):
     ordering_fields = ['date_joined']
     ordering = ['-date_joined'] # overrides get_queryset ordering
     pagination_class = DefaultPageNumberPaginationClass
+    cursor_pagination_class = KeysetCursorPaginationClass
+    export_chunk_size = 2000
+    export_content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+    # max queries per request, see root_project.middlewares.QueryBudgetMiddleware
+    query_budgets = {
+        'list': 3,
+        'export': 3,
+        'create': 3,
+        'retrieve': 3,
+        'update': 4,
+        'partial_update': 4,
+        'destroy': 12,
+        'retrieve_self': 2,
+        'update_self': 3,
+    }
     
     # TODO: check if there are better ways of setting permissions by action
     # TODO: check if this approach breaks any internal logic
@@ -41,6 +245,8 @@ class UserViewset(viewsets.ModelViewSet):
             return [drf_permissions.AllowAny()]
         elif self.action in ('retrieve_self', 'update_self'):
             return [drf_permissions.IsAuthenticated()]
+        elif self.action == 'export':
+            return [drf_permissions.IsAdminUser()]
         return [permissions.IsAdminOrSelf()]
 
     def get_serializer_class(self):
@@ -50,10 +256,26 @@ class UserViewset(viewsets.ModelViewSet):
             return v1_serializers.UserUpdateSerializer
         elif self.action == 'update_self':
             return v1_serializers.UserUpdateSelfSerializer
+        elif self.action in ('list', 'retrieve', 'retrieve_self', 'export'):
+            return v1_serializers.UserReadSerializer
         return v1_serializers.UserSerializer
 
     def get_queryset(self):
-        return super().get_queryset().order_by('date_joined') # order is overriden by ordering but filter keep being properly applied
+        queryset = super().get_queryset().order_by('date_joined') # order is overriden by ordering but filter keep being properly applied
+        if self.action in ('list', 'export'):
+            # collection reads skip model instantiation, object permissions still need instances
+            queryset = queryset.values(*self.get_serializer().read_field_names)
+        return queryset
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor opts into keyset pagination, which skips the count query and stays flat at any depth
+        if not hasattr(self, '_paginator'):
+            if self.action == 'list' and self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
     @decorators.action(detail=False, methods=['GET'], name='Retrieve self user')
     def retrieve_self(self, request, *args, **kwargs):
@@ -65,6 +287,9 @@ class UserViewset(viewsets.ModelViewSet):
     def update_self(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.request.user
+        if isinstance(instance, models.TokenClaimsUser):
+            # token claims are only good for reads, write through the stored row
+            instance = models.User.objects.get(pk=instance.pk)
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
@@ -76,6 +301,43 @@ class UserViewset(viewsets.ModelViewSet):
 
         return response.Response(serializer.data)
 
+    @decorators.action(detail=False, methods=['GET'], name='Export users', pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        # Rows are pulled through a server-side cursor and written one at a time, so memory
+        # stays flat regardless of table size. Filters and ordering match the list action.
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in self.export_content_types:
+            return response.Response(
+                {'error': f'Unsupported export format, expected one of {", ".join(self.export_content_types)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(user) for user in queryset.iterator(chunk_size=self.export_chunk_size))
+
+        if export_format == 'csv':
+            content = self._stream_csv(rows, list(serializer.fields))
+        else:
+            content = self._stream_ndjson(rows)
+
+        _response = StreamingHttpResponse(content, content_type=self.export_content_types[export_format])
+        _response['Content-Disposition'] = f'attachment; filename="users.{export_format}"'
+        return _response
+
+    @staticmethod
+    def _stream_ndjson(rows):
+        encoder = JSONEncoder()
+        for row in rows:
+            yield encoder.encode(row) + '\n'
+
+    @staticmethod
+    def _stream_csv(rows, fieldnames):
+        writer = csv.DictWriter(EchoBuffer(), fieldnames=fieldnames)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
 
 class UserImageUploadView(views.APIView):
 
@@ -92,7 +354,15 @@ class UserImageUploadView(views.APIView):
         serializer = v1_serializers.GenerateProfileImageUploadUrlSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         key = f'{user.id}/{serializer.data["filename"]}'
-        file = files_models.File(filename=serializer.data["filename"], filetype='image', bucket=USER_PROFILE_IMAGES_BUCKET, location=key)
+        file = files_models.File(
+            filename=serializer.data["filename"],
+            filetype='image',
+            bucket=USER_PROFILE_IMAGES_BUCKET,
+            location=key,
+            content_type=serializer.data['content_type'],
+            owner=user,
+            purpose=files_models.FilePurposeChoices.PROFILE_IMAGE,
+        )
         file.save()
         presigned_url = generate_upload_presigned_url(bucket_name=USER_PROFILE_IMAGES_BUCKET, location=key, content_type=serializer.data['content_type'], expiration=900)
         response_serializer = v1_serializers.ProfileImageUploadUrlSerializer({'url': presigned_url, 'file_id': file.id})
@@ -112,39 +382,16 @@ class LoginView(generics.GenericAPIView):
         
         if user is not None:
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserClaimsRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
             # Create response
-            _response = response.Response({
-                'message': 'Login successful',
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                }
-            }, status=status.HTTP_200_OK)
+            _response = response.Response(login_response_data(user), status=status.HTTP_200_OK)
             
-            # Set access token in httpOnly cookie
-            _response.set_cookie(
-                key='access_token',
-                value=access_token,
-                httponly=True,  # Prevents JavaScript access
-                secure=settings.SESSION_COOKIE_SECURE,  # HTTPS only in production
-                samesite='Lax',  # CSRF protection
-                max_age=60 * 15,  # 15 minutes
-            )
-            
-            # Set refresh token in httpOnly cookie
-            _response.set_cookie(
-                key='refresh_token',
-                value=refresh_token,
-                httponly=True,
-                secure=settings.SESSION_COOKIE_SECURE,
-                samesite='Lax',
-                max_age=60 * 60 * 24 * 7,  # 7 days
-            )
+            # Set tokens in httpOnly cookies
+            set_access_token_cookie(_response, access_token)
+            set_refresh_token_cookie(_response, refresh_token)
             
             return _response
         
@@ -168,34 +415,21 @@ class RefreshTokenView(generics.GenericAPIView):
             )
         
         try:
-            refresh = RefreshToken(refresh_token)
-            access_token = str(refresh.access_token)
+            # validates the token, re-reads the user claims and rotates it when enabled
+            serializer = v1_serializers.TokenRefreshWithClaimsSerializer(data={'refresh': refresh_token})
+            serializer.is_valid(raise_exception=True)
+            access_token = serializer.validated_data['access']
             
             _response = response.Response({
                 'message': 'Token refreshed'
             }, status=status.HTTP_200_OK)
             
             # Set new access token
-            _response.set_cookie(
-                key='access_token',
-                value=access_token,
-                httponly=True,
-                secure=settings.SESSION_COOKIE_SECURE,
-                samesite='Lax',
-                max_age=60 * 15,
-            )
+            set_access_token_cookie(_response, access_token)
             
             # Optionally rotate refresh token
-            if settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS'):
-                new_refresh_token = str(refresh)
-                _response.set_cookie(
-                    key='refresh_token',
-                    value=new_refresh_token,
-                    httponly=True,
-                    secure=settings.SESSION_COOKIE_SECURE,
-                    samesite='Lax',
-                    max_age=60 * 60 * 24 * 7,
-                )
+            if 'refresh' in serializer.validated_data:
+                set_refresh_token_cookie(_response, serializer.validated_data['refresh'])
             
             return _response
             
@@ -206,12 +440,87 @@ class RefreshTokenView(generics.GenericAPIView):
             )
 
 
+def parse_request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    """
+    Async variant of LoginView for ASGI deployments. Password hashing runs on the
+    bounded password hashing pool, so login bursts cannot tie up request workers.
+    """
+    async def post(self, request):
+        data = parse_request_data(request)
+        if data is None:
+            return JsonResponse({'error': 'Invalid request body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await password_hashing_pool.authenticate(data.get('username'), data.get('password'))
+        except PasswordHashingPoolFull:
+            return JsonResponse(
+                {'error': 'Too many login attempts in progress, retry shortly'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
+
+        if user is None:
+            return JsonResponse({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        refresh = UserClaimsRefreshToken.for_user(user)
+        _response = JsonResponse(login_response_data(user), status=status.HTTP_200_OK)
+        set_access_token_cookie(_response, str(refresh.access_token))
+        set_refresh_token_cookie(_response, str(refresh))
+        return _response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRefreshTokenView(View):
+    """
+    Async variant of RefreshTokenView for ASGI deployments
+    """
+    async def post(self, request):
+        refresh_token = request.COOKIES.get('refresh_token')
+
+        if not refresh_token:
+            return JsonResponse({'error': 'Refresh token not found'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        serializer = v1_serializers.TokenRefreshWithClaimsSerializer(data={'refresh': refresh_token})
+        try:
+            await sync_to_async(serializer.is_valid)(raise_exception=True)
+        except (TokenError, exceptions.APIException):
+            return JsonResponse({'error': 'Invalid refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        _response = JsonResponse({'message': 'Token refreshed'}, status=status.HTTP_200_OK)
+        set_access_token_cookie(_response, serializer.validated_data['access'])
+        if 'refresh' in serializer.validated_data:
+            set_refresh_token_cookie(_response, serializer.validated_data['refresh'])
+        return _response
+
+
 class LogoutView(generics.GenericAPIView):
     """
-    Logout view that clears cookies
+    Logout view that revokes the refresh token and clears cookies
     """
     
     def post(self, request):
+        if request.auth is not None:
+            token_user_cache.invalidate(request.user.pk, request.auth.get(api_settings.JTI_CLAIM))
+
+        refresh_token = request.COOKIES.get('refresh_token')
+        if refresh_token:
+            try:
+                refresh = UserClaimsRefreshToken(refresh_token)
+                revocation_store.revoke(refresh[api_settings.JTI_CLAIM], max(1, refresh['exp'] - int(time.time())))
+            except (KeyError, TokenError):
+                pass
+
         _response = response.Response({
             'message': 'Logout successful'
         }, status=status.HTTP_200_OK)